@@ -7,18 +7,25 @@ FarmScan - PRODUCTION-READY VERSION
 """
 from flask import Flask, render_template, request, jsonify, session, redirect, url_for, send_file
 import os
+import json
 import base64
+import secrets
 from datetime import datetime
 from PIL import Image
 import io
 from functools import wraps
+from werkzeug.exceptions import RequestEntityTooLarge
+from concurrent.futures import ThreadPoolExecutor
 
 # Import our modules with INDIVIDUAL error handling
 # This prevents one failing module from breaking everything
 
 # Database (CRITICAL - required)
 try:
-    from database import init_db, create_user, verify_user, save_scan, get_user_scans, update_user_language, get_scan_by_id
+    from storage import storage, init_db, create_user, verify_user, save_scan, save_scans, get_user_scans, update_user_language, get_scan_by_id
+    from database import scan_writer
+    from passwords import password_hasher, KdfBusy
+    from scan_artifacts import make_thumbnail, encode_thumbnail, store_thumbnail
     print("✅ Database module loaded")
 except Exception as e:
     print(f"❌ CRITICAL: Database import failed: {e}")
@@ -26,11 +33,23 @@ except Exception as e:
 
 # Image Analysis (CRITICAL - required)
 try:
-    from local_model import analyze_crop_image_local
+    from local_model import analyze_crop_image_local, analyze_features_batch, extract_all_features, prepare_image, get_model_version
     print("✅ Image analysis module loaded")
 except Exception as e:
     print(f"❌ ERROR: Image analysis import failed: {e}")
-    # Fallback function
+    # Fallback functions
+    def get_model_version():
+        return 'unavailable'
+
+    def prepare_image(image):
+        return image.convert("RGB")
+
+    def extract_all_features(image):
+        return {}
+
+    def analyze_features_batch(features_list, language='en'):
+        return [analyze_crop_image_local(None, language) for _ in features_list]
+
     def analyze_crop_image_local(image, language='en'):
         return {
             "diseaseName": "System Error - Image Analysis Unavailable",
@@ -49,36 +68,46 @@ except Exception as e:
             "safetyWarning": "Technical issue detected. Please contact support."
         }
 
+# Result cache (OPTIONAL - nice to have)
+try:
+    from result_cache import result_cache, scan_index, image_key
+    print("✅ Result cache module loaded")
+except Exception as e:
+    print(f"⚠️ WARNING: Result cache import failed: {e}")
+    result_cache = scan_index = None
+
 # Chatbot (OPTIONAL - nice to have)
 try:
-    from chatbot import get_chatbot_response
+    from chatbot import get_chatbot_response, get_chatbot_reply, conversation_store
     print("✅ Chatbot module loaded")
 except Exception as e:
     print(f"⚠️ WARNING: Chatbot import failed: {e}")
-    def get_chatbot_response(message, language='en'):
+    conversation_store = get_chatbot_reply = None
+    def get_chatbot_response(message, language='en', session_id=None):
         return "Chatbot is temporarily unavailable. Please try again later."
 
 # News (OPTIONAL - nice to have)
 try:
-    from news_api import get_agriculture_news
+    from news_api import get_agriculture_news, get_news_payload, news_refresher
     print("✅ News module loaded")
 except Exception as e:
     print(f"⚠️ WARNING: News import failed: {e}")
+    get_news_payload = None
+    news_refresher = None
     def get_agriculture_news(category, language='en'):
         return [{"title": "News temporarily unavailable", "source": "System", "time": "Now"}]
 
-# PDF Generator (OPTIONAL - nice to have)
+# PDF Generator + export queue (OPTIONAL - nice to have)
 try:
-    from pdf_generator import generate_scan_report_pdf, create_history_report_pdf
+    from pdf_generator import report_cache
+    from pdf_jobs import pdf_jobs, TooManyJobs
     print("✅ PDF generator module loaded")
 except Exception as e:
     print(f"⚠️ WARNING: PDF generator import failed: {e}")
-    def generate_scan_report_pdf(scan_data, image, user_info):
-        from io import BytesIO
-        return BytesIO(b"PDF generation unavailable")
-    def create_history_report_pdf(scans, user_info):
-        from io import BytesIO
-        return BytesIO(b"PDF generation unavailable")
+    report_cache = None
+    pdf_jobs = None
+    class TooManyJobs(Exception):
+        pass
 
 print("🚀 All critical modules loaded successfully")
 
@@ -90,6 +119,20 @@ app.secret_key = os.environ.get('SECRET_KEY', 'farmscan-hackathon-2026-secret-ke
 # Initialize database
 init_db()
 
+# Upload limits - enforced from Content-Length before the body is read
+MAX_UPLOAD_MB = int(os.environ.get('MAX_UPLOAD_MB', 16))
+app.config['MAX_CONTENT_LENGTH'] = MAX_UPLOAD_MB * 1024 * 1024
+
+# History pagination
+HISTORY_PAGE_SIZE = 50
+HISTORY_MAX_PAGE_SIZE = 200
+
+
+# Batch scan limits
+MAX_BATCH_IMAGES = 50
+MAX_BATCH_UPLOAD_MB = int(os.environ.get('MAX_BATCH_UPLOAD_MB', 200))
+BATCH_DECODE_WORKERS = int(os.environ.get('BATCH_DECODE_WORKERS', 4))
+
 import os
 print("🚀 APP RUNNING FROM:", os.getcwd())
 
@@ -106,6 +149,104 @@ def login_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+# ============================================================================
+# HELPERS
+# ============================================================================
+
+def decode_base64_bytes(image_data):
+    """Decode a base64 string or data-URL into the encoded image bytes"""
+    if ',' in image_data:
+        image_data = image_data.split(',')[1]
+    
+    return base64.b64decode(image_data)
+
+
+def decode_base64_image(image_data):
+    """Decode a base64 string or data-URL into a PIL Image"""
+    return Image.open(io.BytesIO(decode_base64_bytes(image_data)))
+
+
+def is_raw_image_upload():
+    """True if the request body is the raw image (octet-stream or image/*)"""
+    mimetype = request.mimetype or ''
+    return mimetype == 'application/octet-stream' or mimetype.startswith('image/')
+
+
+def get_uploaded_image_stream(field='image'):
+    """
+    Binary stream of the encoded image uploaded with the request
+    - multipart/form-data: the file's stream
+    - application/octet-stream or image/*: the request body stream
+    - JSON: legacy base64 / data-URL field (old clients)
+    
+    Returns:
+        File-like object or None if no image was sent
+    """
+    if is_raw_image_upload():
+        if not request.content_length:
+            return None
+        return request.stream
+    
+    upload = request.files.get(field)
+    if upload is not None:
+        return upload.stream
+    
+    data = request.get_json(silent=True) or {}
+    image_data = data.get(field)
+    if image_data:
+        return io.BytesIO(decode_base64_bytes(image_data))
+    return None
+
+
+def get_uploaded_image(field='image'):
+    """
+    Open the uploaded image from the request without intermediate copies
+    
+    Returns:
+        PIL Image (lazily decoded) or None if no image was sent
+    """
+    stream = get_uploaded_image_stream(field)
+    return Image.open(stream) if stream is not None else None
+
+def encode_history_cursor(scan):
+    """Opaque keyset cursor pointing just past the given scan"""
+    raw = json.dumps([scan['date'], scan['id']]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_history_cursor(cursor):
+    """Return (date, id) from a history cursor, or None if malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        date, scan_id = json.loads(raw)
+        return str(date), int(scan_id)
+    except Exception:
+        return None
+
+
+def save_thumbnail(thumbnail):
+    """Store a scan thumbnail, returning its hash (None if the disk write failed)"""
+    try:
+        return store_thumbnail(encode_thumbnail(thumbnail))
+    except OSError as e:
+        print(f"Thumbnail save error: {e}")
+        return None
+
+
+def is_cacheable_result(result):
+    """Error/fallback results must not be cached or deduplicated"""
+    name = result.get('diseaseName', '')
+    return not name.startswith(('System Error', 'Analysis Error'))
+
+# ============================================================================
+# ERROR HANDLERS
+# ============================================================================
+
+@app.errorhandler(RequestEntityTooLarge)
+def upload_too_large(e):
+    limit_mb = (request.max_content_length or 0) // (1024 * 1024)
+    return jsonify({'error': f'Upload too large (max {limit_mb} MB)'}), 413
+
 # ============================================================================
 # PAGE ROUTES
 # ============================================================================
@@ -183,6 +324,8 @@ def api_login():
             })
         else:
             return jsonify({'error': 'Invalid phone or password'}), 401
+    except KdfBusy:
+        return jsonify({'error': 'Server busy, please try again'}), 503
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -212,6 +355,8 @@ def api_register():
             })
         else:
             return jsonify({'error': 'Phone number already exists'}), 400
+    except KdfBusy:
+        return jsonify({'error': 'Server busy, please try again'}), 503
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -258,49 +403,161 @@ def api_analyze():
     - Texture analysis
     """
     try:
-        data = request.get_json()
-        image_data = data.get('image')
         language = session.get('user_language', 'en')
         
-        if not image_data:
+        # Raw/multipart upload, or base64 JSON from old clients
+        image = get_uploaded_image('image')
+        
+        if image is None:
             return jsonify({'error': 'No image provided'}), 400
         
-        # Decode base64 image
-        if ',' in image_data:
-            image_data = image_data.split(',')[1]
+        # One draft-mode decode to thumbnail size; analysis shrinks that copy
+        thumbnail = make_thumbnail(image)
+        image = prepare_image(thumbnail)
+        
+        # Retries of the same photo are served from the result cache
+        cache_key = None
+        result = None
+        if result_cache is not None:
+            cache_key = image_key(image, get_model_version(), language)
+            result = result_cache.get(cache_key)
+        
+        if result is None:
+            # Analyze with REAL computer vision model
+            result = analyze_crop_image_local(image, language)
+            if cache_key and is_cacheable_result(result):
+                result_cache.set(cache_key, result)
+        
+        # Save to database (once per user per photo) with the full result
+        # and thumbnail, so exports never need the photo again
+        scan_key = f"{session['user_phone']}:{cache_key}" if cache_key else None
+        scan_id = scan_index.get(scan_key) if scan_key else None
+        if scan_id is None:
+            scan_data = {
+                'user_phone': session['user_phone'],
+                'disease_name': result['diseaseName'],
+                'confidence': result['confidence'],
+                'severity': result['severity'],
+                'treatment': result['treatment'],
+                'date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                'result': result,
+                'image_hash': save_thumbnail(thumbnail)
+            }
+            scan_id = save_scan(scan_data)
+            if scan_key and scan_id and is_cacheable_result(result):
+                scan_index.set(scan_key, scan_id)
+        
+        return jsonify(dict(result, scanId=scan_id))
+        
+    except RequestEntityTooLarge:
+        raise
+    except Exception as e:
+        print(f"Analysis error: {e}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({'error': f'Analysis failed: {str(e)}'}), 500
+
+@app.route('/api/analyze-batch', methods=['POST'])
+@login_required
+def api_analyze_batch():
+    """
+    Analyze many crop images from one plot in a single request
+    - Multipart field 'images' (repeated) or JSON {"images": [base64, ...]}
+    - Images are decoded and feature-extracted in parallel
+    - One model call for the whole batch, one DB transaction
+    - Results returned in input order with per-item errors
+    """
+    try:
+        language = session.get('user_language', 'en')
+        
+        # Batches get their own, larger body limit
+        request.max_content_length = MAX_BATCH_UPLOAD_MB * 1024 * 1024
         
-        image_bytes = base64.b64decode(image_data)
-        image = Image.open(io.BytesIO(image_bytes)).convert("RGB")
+        if request.files:
+            items = [f.stream for f in request.files.getlist('images')]
+            load = Image.open
+        else:
+            data = request.get_json(silent=True) or {}
+            items = data.get('images') or []
+            load = decode_base64_image
         
-        # Analyze with REAL computer vision model
-        result = analyze_crop_image_local(image, language)
-
+        if not items:
+            return jsonify({'error': 'No images provided'}), 400
         
-        # Save to database
-        scan_data = {
+        if len(items) > MAX_BATCH_IMAGES:
+            return jsonify({'error': f'Too many images (max {MAX_BATCH_IMAGES})'}), 400
+        
+        def load_features(item):
+            try:
+                thumbnail = make_thumbnail(load(item))
+                features = extract_all_features(prepare_image(thumbnail))
+            except Exception as e:
+                return None, None, f'Invalid image ({type(e).__name__})'
+            return features, save_thumbnail(thumbnail), None
+        
+        # Decode + extract in parallel (PIL and NumPy release the GIL)
+        with ThreadPoolExecutor(max_workers=min(BATCH_DECODE_WORKERS, len(items))) as pool:
+            loaded = list(pool.map(load_features, items))
+        
+        ok_indexes = [i for i, (features, _, _) in enumerate(loaded) if features is not None]
+        analyses = analyze_features_batch([loaded[i][0] for i in ok_indexes], language)
+        
+        # Save all successful scans in one transaction
+        scan_ids = save_scans([{
             'user_phone': session['user_phone'],
             'disease_name': result['diseaseName'],
             'confidence': result['confidence'],
             'severity': result['severity'],
             'treatment': result['treatment'],
-            'date': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        }
-        save_scan(scan_data)
-        
-        return jsonify(result)
-        
+            'result': result,
+            'image_hash': loaded[i][1]
+        } for i, result in zip(ok_indexes, analyses)])
+        if scan_ids is None:
+            # The transaction was rolled back - nothing from this batch was saved
+            return jsonify({'error': 'Batch analysis failed: scans could not be saved'}), 500
+        
+        results = [{'index': i, 'success': False, 'error': error} for i, (_, _, error) in enumerate(loaded)]
+        for i, result, scan_id in zip(ok_indexes, analyses, scan_ids):
+            results[i] = {'index': i, 'success': True, 'scanId': scan_id, 'result': result}
+        
+        return jsonify({
+            'results': results,
+            'count': len(results),
+            'failed': len(results) - len(ok_indexes)
+        })
+        
+    except RequestEntityTooLarge:
+        raise
     except Exception as e:
-        print(f"Analysis error: {e}")
+        print(f"Batch analysis error: {e}")
         import traceback
         traceback.print_exc()
-        return jsonify({'error': f'Analysis failed: {str(e)}'}), 500
+        return jsonify({'error': f'Batch analysis failed: {str(e)}'}), 500
 
 @app.route('/api/history', methods=['GET'])
 @login_required
 def api_history():
+    """
+    Scan history, newest first, with keyset pagination
+    - ?limit=N (1-200, default 50)
+    - ?cursor=<next_cursor from the previous page>
+    """
     try:
-        scans = get_user_scans(session['user_phone'])
-        return jsonify({'scans': scans})
+        limit = max(1, min(request.args.get('limit', HISTORY_PAGE_SIZE, type=int), HISTORY_MAX_PAGE_SIZE))
+        
+        before = None
+        if request.args.get('cursor'):
+            before = decode_history_cursor(request.args['cursor'])
+            if before is None:
+                return jsonify({'error': 'Invalid cursor'}), 400
+        
+        scans = get_user_scans(session['user_phone'], limit, before)
+        
+        next_cursor = None
+        if len(scans) == limit:
+            next_cursor = encode_history_cursor(scans[-1])
+        
+        return jsonify({'scans': scans, 'next_cursor': next_cursor})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -326,8 +583,17 @@ def api_chat():
         if not message:
             return jsonify({'error': 'No message provided'}), 400
         
+        # One conversation per browser session
+        if 'chat_session' not in session:
+            session['chat_session'] = secrets.token_hex(16)
+        
+        # Catalog answers carry a pre-encoded JSON body
+        if get_chatbot_reply is not None:
+            reply = get_chatbot_reply(message, language, session['chat_session'])
+            return app.response_class(reply.body, mimetype='application/json')
+        
         # Get intelligent response
-        response = get_chatbot_response(message, language)
+        response = get_chatbot_response(message, language, session['chat_session'])
         
         return jsonify({'response': response})
         
@@ -339,6 +605,35 @@ def api_chat():
 # API ROUTES - REAL NEWS
 # ============================================================================
 
+def news_payload_response(payload):
+    """
+    Send a pre-rendered news payload as-is
+    
+    Answers If-None-Match with 304 and picks the brotli, gzip or plain
+    body from Accept-Encoding - no JSON encoding or compression per request.
+    """
+    if payload['br'] is not None and request.accept_encodings['br']:
+        encoding = 'br'
+    elif request.accept_encodings['gzip']:
+        encoding = 'gzip'
+    else:
+        encoding = 'identity'
+    
+    # Strong ETags are per byte sequence, so each encoding gets its own
+    etag = payload['etag'] if encoding == 'identity' else f"{payload['etag']}-{encoding}"
+    
+    if etag in request.if_none_match:
+        response = app.response_class(status=304)
+    else:
+        response = app.response_class(payload[encoding], mimetype='application/json')
+        if encoding != 'identity':
+            response.headers['Content-Encoding'] = encoding
+    
+    response.set_etag(etag)
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
 @app.route('/api/news/<category>', methods=['GET'])
 @login_required
 def api_news(category):
@@ -352,6 +647,10 @@ def api_news(category):
     try:
         language = session.get('user_language', 'en')
         
+        # Pre-rendered, pre-compressed bytes from the news cache
+        if get_news_payload is not None:
+            return news_payload_response(get_news_payload(category, language))
+        
         # Get real news from RSS feeds
         news = get_agriculture_news(category, language)
         
@@ -365,14 +664,75 @@ def api_news(category):
         ]
         return jsonify({'news': fallback_news})
 
+# ============================================================================
+# API ROUTES - METRICS
+# ============================================================================
+
+@app.route('/api/metrics', methods=['GET'])
+@login_required
+def api_metrics():
+    """Per-worker performance counters"""
+    metrics = {
+        'pid': os.getpid(),
+        'storage': storage.name,
+        'scan_writer': scan_writer.stats(),
+        'passwords': password_hasher.stats()
+    }
+    
+    if result_cache is not None:
+        metrics['result_cache'] = result_cache.stats()
+        metrics['scan_dedupe'] = scan_index.stats()
+    
+    if news_refresher is not None:
+        metrics['news'] = news_refresher.stats()
+    
+    if report_cache is not None:
+        metrics['report_cache'] = report_cache.stats()
+    
+    if pdf_jobs is not None:
+        metrics['pdf_jobs'] = pdf_jobs.stats()
+    
+    if conversation_store is not None:
+        metrics['chat_sessions'] = conversation_store.stats()
+    
+    return jsonify(metrics)
+
 # ============================================================================
 # API ROUTES - PDF EXPORT
 # ============================================================================
 
+def pdf_job_json(job):
+    """Public view of a PDF export job"""
+    data = {
+        'job_id': job['id'],
+        'status': job['status'],
+        'status_url': url_for('pdf_job_status', job_id=job['id'])
+    }
+    if job['status'] == 'done':
+        data['size'] = job['size']
+        data['download_url'] = url_for('pdf_job_download', job_id=job['id'])
+    elif job['status'] == 'failed':
+        data['error'] = 'Failed to generate PDF'
+    return data
+
+
+def enqueue_pdf_job(kind, params, filename, image_stream=None):
+    """Queue a PDF export and answer 202 with where to poll for it"""
+    if pdf_jobs is None:
+        return jsonify({'error': 'PDF generation unavailable'}), 503
+    
+    try:
+        job_id = pdf_jobs.enqueue(session['user_phone'], kind, params, filename, image_stream)
+    except TooManyJobs:
+        return jsonify({'error': 'Too many PDF exports in progress, please wait'}), 429
+    
+    return jsonify(pdf_job_json(pdf_jobs.get(job_id, session['user_phone']))), 202
+
+
 @app.route('/api/export-pdf/<int:scan_id>', methods=['GET'])
 @login_required
 def export_scan_pdf(scan_id):
-    """Export a single scan as PDF report"""
+    """Queue a single scan PDF report"""
     try:
         # Get scan details
         scan = get_scan_by_id(scan_id, session['user_phone'])
@@ -380,8 +740,9 @@ def export_scan_pdf(scan_id):
         if not scan:
             return jsonify({'error': 'Scan not found'}), 404
         
-        # Prepare scan data for PDF
-        scan_data = {
+        # Full result stored at analysis time; older scans only have
+        # the summary columns
+        scan_data = scan.get('result') or {
             'diseaseName': scan['disease_name'],
             'confidence': scan['confidence'],
             'severity': scan['severity'],
@@ -397,17 +758,16 @@ def export_scan_pdf(scan_id):
             'phone': session.get('user_phone', 'N/A')
         }
         
-        # Generate PDF
-        pdf_buffer = generate_scan_report_pdf(scan_data, None, user_info)
-        
-        # Send PDF file
-        return send_file(
-            pdf_buffer,
-            mimetype='application/pdf',
-            as_attachment=True,
-            download_name=f'farmscan_report_{scan_id}.pdf'
-        )
-        
+        # Rendered once per (scan, language, template version, content), then cached
+        params = {
+            'scan_id': scan_id,
+            'scan_data': scan_data,
+            'user_info': user_info,
+            'language': session.get('user_language') or 'en',
+            'image_hash': scan.get('image_hash')
+        }
+        return enqueue_pdf_job('scan', params, f'farmscan_report_{scan_id}.pdf')
+    
     except Exception as e:
         print(f"PDF export error: {e}")
         import traceback
@@ -417,28 +777,18 @@ def export_scan_pdf(scan_id):
 @app.route('/api/export-history-pdf', methods=['GET'])
 @login_required
 def export_history_pdf():
-    """Export scan history as PDF report"""
+    """Queue a PDF report of the full scan history"""
     try:
-        # Get user scans
-        scans = get_user_scans(session['user_phone'])
-        
         # User info
         user_info = {
             'name': session.get('user_name', 'Farmer'),
             'phone': session.get('user_phone', 'N/A')
         }
         
-        # Generate PDF
-        pdf_buffer = create_history_report_pdf(scans, user_info)
-        
-        # Send PDF file
-        return send_file(
-            pdf_buffer,
-            mimetype='application/pdf',
-            as_attachment=True,
-            download_name=f'farmscan_history_{datetime.now().strftime("%Y%m%d")}.pdf'
-        )
-        
+        # Scans are read page by page in the render process
+        filename = f'farmscan_history_{datetime.now().strftime("%Y%m%d")}.pdf'
+        return enqueue_pdf_job('history', {'user_info': user_info}, filename)
+    
     except Exception as e:
         print(f"History PDF export error: {e}")
         import traceback
@@ -448,21 +798,13 @@ def export_history_pdf():
 @app.route('/api/export-latest-pdf', methods=['POST'])
 @login_required
 def export_latest_pdf():
-    """Export the most recent scan result as PDF with image"""
+    """Queue a PDF of the most recent scan result with its image"""
     try:
-        data = request.get_json()
-        
-        # Get scan result and image from request
-        scan_data = data.get('scanData', {})
-        image_data = data.get('image')
-        
-        # Decode image if provided
-        image_obj = None
-        if image_data:
-            if ',' in image_data:
-                image_data = image_data.split(',')[1]
-            image_bytes = base64.b64decode(image_data)
-            image_obj = Image.open(io.BytesIO(image_bytes))
+        # Get scan result from multipart form field or legacy JSON body
+        if request.form.get('scanData'):
+            scan_data = json.loads(request.form['scanData'])
+        else:
+            scan_data = (request.get_json(silent=True) or {}).get('scanData', {})
         
         # User info
         user_info = {
@@ -470,23 +812,49 @@ def export_latest_pdf():
             'phone': session.get('user_phone', 'N/A')
         }
         
-        # Generate PDF
-        pdf_buffer = generate_scan_report_pdf(scan_data, image_obj, user_info)
-        
-        # Send PDF file
-        return send_file(
-            pdf_buffer,
-            mimetype='application/pdf',
-            as_attachment=True,
-            download_name=f'farmscan_latest_{datetime.now().strftime("%Y%m%d_%H%M%S")}.pdf'
-        )
-        
+        # The encoded upload is copied to the job's input file as-is
+        filename = f'farmscan_latest_{datetime.now().strftime("%Y%m%d_%H%M%S")}.pdf'
+        params = {'scan_data': scan_data, 'user_info': user_info}
+        return enqueue_pdf_job('latest', params, filename, get_uploaded_image_stream('image'))
+    
+    except RequestEntityTooLarge:
+        raise
     except Exception as e:
         print(f"Latest PDF export error: {e}")
         import traceback
         traceback.print_exc()
         return jsonify({'error': 'Failed to generate PDF'}), 500
 
+@app.route('/api/pdf-jobs/<job_id>', methods=['GET'])
+@login_required
+def pdf_job_status(job_id):
+    """Status of a queued PDF export"""
+    job = pdf_jobs.get(job_id, session['user_phone']) if pdf_jobs is not None else None
+    if not job:
+        return jsonify({'error': 'Export not found'}), 404
+    return jsonify(pdf_job_json(job))
+
+@app.route('/api/pdf-jobs/<job_id>/download', methods=['GET'])
+@login_required
+def pdf_job_download(job_id):
+    """Finished PDF export (supports Range and conditional requests)"""
+    job = pdf_jobs.get(job_id, session['user_phone']) if pdf_jobs is not None else None
+    if not job:
+        return jsonify({'error': 'Export not found'}), 404
+    if job['status'] != 'done':
+        return jsonify(pdf_job_json(job)), 409
+    
+    try:
+        return send_file(
+            job['path'],
+            mimetype='application/pdf',
+            as_attachment=True,
+            download_name=job['filename'],
+            conditional=True
+        )
+    except FileNotFoundError:
+        return jsonify({'error': 'Export expired'}), 410
+
 # ============================================================================
 # RUN APPLICATION
 # ============================================================================
@@ -0,0 +1,363 @@
+"""
+FarmScan performance benchmarks
+Run: python benchmark.py <name>   (or "all")
+"""
+
+import argparse
+import contextlib
+import io
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# ============================================================================
+# HELPERS
+# ============================================================================
+
+def _timeit(fn, repeat=5):
+    """Return (best, mean) wall time in milliseconds"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return min(times), sum(times) / len(times)
+
+
+def _reset_peak_rss():
+    """Reset the kernel's peak-RSS watermark (Linux 4.0+, best effort)"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+
+def _maxrss_mb():
+    """Peak resident set size of this process in MB"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    # ru_maxrss is KB on Linux and cannot be reset
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def _run_isolated(target, *args):
+    """Run target(*args) in a fresh process so peak RSS is not shared"""
+    ctx = multiprocessing.get_context('spawn')
+    with ctx.Pool(1) as pool:
+        return pool.apply(target, args)
+
+
+def _make_jpeg(width=4000, height=3000, quality=90):
+    """Synthetic 12MP leaf-like JPEG (green gradient with brown spots)"""
+    import numpy as np
+    from PIL import Image
+
+    rng = np.random.default_rng(42)
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+    rgb = np.empty((height, width, 3), dtype=np.uint8)
+    rgb[..., 0] = (60 + 40 * x / width).astype(np.uint8)
+    rgb[..., 1] = (140 + 60 * y / height).astype(np.uint8)
+    rgb[..., 2] = 50
+
+    for cx, cy in rng.integers(0, [width, height], size=(40, 2)):
+        spot = (x - cx) ** 2 + (y - cy) ** 2 < 60 ** 2
+        rgb[spot] = (120, 80, 30)
+
+    buffer = io.BytesIO()
+    Image.fromarray(rgb).save(buffer, format='JPEG', quality=quality)
+    return buffer.getvalue()
+
+# ============================================================================
+# DECODE + ANALYZE
+# ============================================================================
+
+def _legacy_analyze(image):
+    """Previous behaviour: RGB convert and ImageStat over every pixel"""
+    from PIL import ImageStat
+
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    return ImageStat.Stat(image).mean
+
+
+def _decode_worker(jpeg_bytes, draft):
+    from PIL import Image
+    from local_model import analyze_crop_image_local, prepare_image
+    from scan_artifacts import make_thumbnail
+
+    _reset_peak_rss()
+    baseline = _maxrss_mb()
+
+    def run():
+        image = Image.open(io.BytesIO(jpeg_bytes))
+        if not draft:
+            _legacy_analyze(image)
+            return
+        # Same path as /api/analyze: thumbnail first, analysis copy from that
+        image = prepare_image(make_thumbnail(image))
+        with contextlib.redirect_stdout(io.StringIO()):
+            analyze_crop_image_local(image)
+
+    best, mean = _timeit(run)
+    return best, mean, _maxrss_mb() - baseline
+
+
+def bench_decode():
+    """Full-resolution decode + ImageStat vs the thumbnail + analysis decode on a 12MP JPEG"""
+    jpeg_bytes = _make_jpeg()
+    print(f"Input: 4000x3000 JPEG, {len(jpeg_bytes) / 1e6:.1f} MB")
+    print(f"{'pipeline':<34}{'best ms':>10}{'mean ms':>10}{'peak +MB':>10}")
+
+    for label, draft in (('full decode + ImageStat (before)', False), ('thumbnail + prepare (after)', True)):
+        best, mean, peak = _run_isolated(_decode_worker, jpeg_bytes, draft)
+        print(f"{label:<34}{best:>10.1f}{mean:>10.1f}{peak:>10.1f}")
+
+# ============================================================================
+# DATABASE
+# ============================================================================
+
+def _small_jpegs(count, size=64):
+    """Distinct small JPEGs so the result cache never hits"""
+    import numpy as np
+    from PIL import Image
+
+    rng = np.random.default_rng(7)
+    images = []
+    for _ in range(count):
+        buffer = io.BytesIO()
+        Image.fromarray(rng.integers(0, 255, (size, size, 3), dtype=np.uint8)).save(buffer, format='JPEG')
+        images.append(buffer.getvalue())
+    return images
+
+
+def _make_test_app(env):
+    """Import app.py against a throwaway database with the given env"""
+    workdir = tempfile.mkdtemp(prefix='farmscan-bench-')
+    os.environ.update({
+        'FARMSCAN_DB': os.path.join(workdir, 'farmscan.db'),
+        'SCAN_IMAGE_DIR': os.path.join(workdir, 'scan_images'),
+        'RESULT_CACHE_DB': ''
+    })
+    os.environ.update(env)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        import app as farmscan_app
+
+    client = farmscan_app.app.test_client()
+    with contextlib.redirect_stdout(io.StringIO()):
+        client.post('/api/register', json={'name': 'Bench', 'phone': '9000000000', 'password': 'bench'})
+    return farmscan_app, client
+
+
+def _requests_per_second(client, calls, threads):
+    """Fire (method, path, kwargs) calls and return requests/s"""
+    def fire(call):
+        method, path, kwargs = call
+        response = getattr(client, method)(path, **kwargs)
+        assert response.status_code == 200, response.data
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        if threads == 1:
+            for call in calls:
+                fire(call)
+        else:
+            with ThreadPoolExecutor(max_workers=threads) as pool:
+                list(pool.map(fire, calls))
+    return len(calls) / (time.perf_counter() - start)
+
+
+def _db_worker(env, n_history, n_analyze, threads):
+    farmscan_app, client = _make_test_app(env)
+
+    import database
+    database.save_scans([{
+        'user_phone': '9000000000',
+        'disease_name': 'Healthy Plant',
+        'confidence': 0.85,
+        'severity': 'None',
+        'treatment': 'No treatment needed.'
+    } for _ in range(500)])
+
+    history = [('get', '/api/history', {})] * n_history
+    analyze = [('post', '/api/analyze', {'data': jpeg, 'content_type': 'image/jpeg'})
+               for jpeg in _small_jpegs(n_analyze)]
+
+    return (_requests_per_second(client, history, threads),
+            _requests_per_second(client, analyze, threads))
+
+
+def bench_db():
+    """Requests/s on /api/history and /api/analyze, pooled vs per-call connections"""
+    print(f"{'mode':<28}{'threads':>8}{'history rps':>14}{'analyze rps':>14}")
+    for label, env in (('connect per call', {'DB_POOL': '0'}), ('pooled + WAL', {'DB_POOL': '1'})):
+        for threads in (1, 4):
+            history_rps, analyze_rps = _run_isolated(_db_worker, env, 400, 200, threads)
+            print(f"{label:<28}{threads:>8}{history_rps:>14.0f}{analyze_rps:>14.0f}")
+
+# ============================================================================
+# PASSWORDS
+# ============================================================================
+
+def _login_worker(n, count):
+    import hashlib
+
+    import passwords
+
+    salt = os.urandom(passwords.SALT_BYTES)
+    if n is None:
+        login = lambda: hashlib.sha256(b'farmer-password').hexdigest()
+    else:
+        login = lambda: passwords._scrypt('farmer-password', salt, n, passwords.SCRYPT_R, passwords.SCRYPT_P)
+
+    start = time.perf_counter()
+    for _ in range(count):
+        login()
+    return count / (time.perf_counter() - start)
+
+
+def bench_passwords():
+    """Logins/s on one core for each scrypt cost (N), vs legacy SHA-256"""
+    print(f"{'hash':<22}{'logins/s/core':>16}{'ms/login':>10}")
+    for label, n, count in (('sha256 (legacy)', None, 100000),
+                            ('scrypt N=2^12', 2 ** 12, 200),
+                            ('scrypt N=2^13', 2 ** 13, 100),
+                            ('scrypt N=2^14', 2 ** 14, 50),
+                            ('scrypt N=2^15', 2 ** 15, 25)):
+        rate = _run_isolated(_login_worker, n, count)
+        print(f"{label:<22}{rate:>16.0f}{1000 / rate:>10.2f}")
+
+# ============================================================================
+# CHATBOT
+# ============================================================================
+
+CHAT_MESSAGES = [
+    'Hello there',
+    'My tomato plant has brown spots on the leaves',
+    'What fertilizer should I use for wheat?',
+    'How often should I water my rice field during the dry season?',
+    'Is this the right time to call about the PM Kisan scheme?',
+    'Which organic pesticide works against aphids and caterpillars?',
+    'Can you tell me what to do about the yellowing of my maize crop this year',
+    'Thanks for the help',
+    'We had very little rain and now the leaves on the lower branches are curling, what should I spray on them',
+    'Last year the yield from my farm in the village dropped a lot even though I followed the same routine as before',
+]
+
+
+def _legacy_intent(message_lower):
+    """The original routing: one any() substring scan per intent, lists rebuilt per call"""
+    from chatbot import INTENTS
+
+    for intent, keywords in INTENTS:
+        if any(word in message_lower for word in list(keywords)):
+            return intent
+    return None
+
+
+def bench_chatbot():
+    """Intent routing messages/s: substring any() chain vs compiled matcher"""
+    from chatbot import intent_matcher
+
+    messages = [message.lower() for message in CHAT_MESSAGES] * 2000
+    print(f"{'matcher':<24}{'messages/s':>14}")
+    for label, route in (('any() substring chain', _legacy_intent),
+                         ('compiled matcher', intent_matcher.match)):
+        start = time.perf_counter()
+        for message in messages:
+            route(message)
+        print(f"{label:<24}{len(messages) / (time.perf_counter() - start):>14.0f}")
+
+def bench_retrieval():
+    """Offline BM25 top-3 query latency for catch-all chatbot questions"""
+    from chat_retrieval import load_index
+
+    index = load_index()
+    queries = [message.lower() for message in CHAT_MESSAGES]
+    latencies = []
+    for _ in range(500):
+        for query in queries:
+            start = time.perf_counter()
+            index.search(query, k=3)
+            latencies.append((time.perf_counter() - start) * 1e6)
+
+    latencies.sort()
+    print(f"Index: {len(index.docs)} docs, {len(index.vocab)} terms (memory-mapped)")
+    print(f"{'queries':>8}{'p50 us':>10}{'p99 us':>10}{'max us':>10}")
+    print(f"{len(latencies):>8}{latencies[len(latencies) // 2]:>10.1f}"
+          f"{latencies[int(len(latencies) * 0.99)]:>10.1f}{latencies[-1]:>10.1f}")
+
+# ============================================================================
+# PDF IMAGES
+# ============================================================================
+
+PDF_SCAN = {
+    'diseaseName': 'Leaf Blight', 'confidence': 0.87, 'severity': 'Moderate',
+    'spreadRisk': 'Medium', 'treatment': 'Apply copper fungicide',
+    'organicTreatment': {'title': 'Organic Options', 'details': ['Neem oil spray']},
+    'safetyWarning': 'Wear gloves'
+}
+
+
+def _legacy_embed(image, width, height):
+    """Previous behaviour: full-resolution lossless PNG"""
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG')
+    buffer.seek(0)
+    return buffer
+
+
+def bench_pdf():
+    """Scan report with photo: PNG re-encode vs downsampled JPEG / passthrough"""
+    from PIL import Image
+    import pdf_generator
+
+    inputs = (('12MP JPEG', _make_jpeg()), ('1000x750 JPEG', _make_jpeg(1000, 750, quality=85)))
+    current = pdf_generator.embed_image
+    print(f"{'input':<16}{'embedding':<18}{'best ms':>10}{'mean ms':>10}{'PDF KB':>10}")
+
+    for label, jpeg_bytes in inputs:
+        for mode, embed in (('PNG (before)', _legacy_embed), ('JPEG (after)', current)):
+            pdf_generator.embed_image = embed
+            sizes = []
+
+            def run():
+                image = Image.open(io.BytesIO(jpeg_bytes))
+                sizes.append(len(pdf_generator.generate_scan_report_pdf(PDF_SCAN, image).getvalue()))
+
+            best, mean = _timeit(run, repeat=3)
+            print(f"{label:<16}{mode:<18}{best:>10.1f}{mean:>10.1f}{sizes[-1] / 1024:>10.0f}")
+
+    pdf_generator.embed_image = current
+
+# ============================================================================
+# MAIN
+# ============================================================================
+
+BENCHMARKS = {
+    'decode': bench_decode,
+    'db': bench_db,
+    'passwords': bench_passwords,
+    'chatbot': bench_chatbot,
+    'retrieval': bench_retrieval,
+    'pdf': bench_pdf,
+}
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='FarmScan benchmarks')
+    parser.add_argument('name', choices=sorted(BENCHMARKS) + ['all'])
+    args = parser.parse_args()
+
+    names = sorted(BENCHMARKS) if args.name == 'all' else [args.name]
+    for name in names:
+        print(f"\n=== {name} ===")
+        BENCHMARKS[name]()
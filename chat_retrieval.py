@@ -0,0 +1,223 @@
+"""
+Offline BM25 retrieval for the FarmScan chatbot
+Indexes the local Q&A corpus and the catalog answers into flat NumPy
+arrays that are memory-mapped at startup - no network needed
+"""
+
+import hashlib
+import json
+import math
+import os
+import shutil
+import string
+import tempfile
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CORPUS_PATH = os.path.join(BASE_DIR, 'chatbot_corpus.json')
+RESPONSES_PATH = os.path.join(BASE_DIR, 'chatbot_responses.json')
+
+# Built indexes live in <CHAT_INDEX_DIR>/<fingerprint>/, rebuilt when the
+# corpus, the catalog or the scoring parameters change
+CHAT_INDEX_DIR = os.environ.get('CHAT_INDEX_DIR', os.path.join(BASE_DIR, 'chat_index'))
+
+# Bump when analyze() or the document layout changes
+INDEX_VERSION = '1'
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# The catch-all answer is what retrieval replaces, so it is not indexed
+SKIP_INTENTS = ('general',)
+
+STOPWORDS = frozenset(
+    'a about after all also am an and any are as at be because been before being but by can could '
+    'did do does doing for from get got had has have how i if in into is it its just me more most my '
+    'no not now of on or our should so some such than that the their them then there these they this '
+    'to too up us very was we were what when where which while who why will with would you your'.split()
+)
+
+_PUNCTUATION = string.punctuation.encode()
+_TOKEN_TABLE = bytes.maketrans(_PUNCTUATION, b' ' * len(_PUNCTUATION))
+_SUFFIXES = ('ing', 'ed', 'es', 's')
+
+
+def _stem(token):
+    """Strip one common English suffix ('spots' -> 'spot', 'planting' -> 'plant')"""
+    for suffix in _SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+            return token[:-len(suffix)]
+    return token
+
+
+def analyze(text):
+    """Text -> list of stemmed, stopword-free terms"""
+    words = text.lower().encode('utf-8').translate(_TOKEN_TABLE).decode('utf-8').split()
+    return [_stem(word) for word in words if word not in STOPWORDS]
+
+
+# ============================================================================
+# BUILD
+# ============================================================================
+
+def _documents(corpus_path=CORPUS_PATH, responses_path=RESPONSES_PATH):
+    """
+    (text, target) pairs to index
+
+    Corpus targets carry the answer text; catalog targets carry the
+    (intent, sub_intent) key so the chatbot can answer in the user's language.
+    """
+    with open(corpus_path, encoding='utf-8') as f:
+        corpus = json.load(f)['entries']
+    with open(responses_path, encoding='utf-8') as f:
+        responses = json.load(f)['responses']
+
+    documents = []
+    for entry in corpus:
+        # The question is repeated so its words outweigh the longer answer
+        text = f"{entry['question']} {entry['question']} {entry['answer']}"
+        documents.append((text, {'answer': entry['answer']}))
+
+    for intent, sub_intents in responses.items():
+        if intent in SKIP_INTENTS:
+            continue
+        for sub_intent, texts in sub_intents.items():
+            label = '' if sub_intent == 'default' else sub_intent
+            text = f"{intent.replace('_', ' ')} {label} {texts['en']}"
+            documents.append((text, {'intent': intent, 'sub_intent': sub_intent}))
+
+    return documents
+
+
+def fingerprint(corpus_path=CORPUS_PATH, responses_path=RESPONSES_PATH):
+    """Hash of everything that changes the index contents"""
+    digest = hashlib.sha256(f"{INDEX_VERSION}:{BM25_K1}:{BM25_B}".encode())
+    for path in (corpus_path, responses_path):
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+def build_index(out_dir, corpus_path=CORPUS_PATH, responses_path=RESPONSES_PATH):
+    """
+    Write a BM25 index as flat arrays (CSR layout, one row per term)
+
+    Files:
+        vocab.json     term -> row
+        indptr.npy     int32, row boundaries into postings/weights
+        postings.npy   int32 document numbers
+        weights.npy    float32 BM25 weight of the term in that document
+        docs.json      retrieval target per document
+    """
+    documents = _documents(corpus_path, responses_path)
+    analyzed = [analyze(text) for text, _ in documents]
+
+    lengths = np.array([len(terms) for terms in analyzed], dtype=np.float32)
+    average_length = float(lengths.mean()) if len(lengths) else 0.0
+
+    term_counts = {}
+    for doc, terms in enumerate(analyzed):
+        for term in terms:
+            counts = term_counts.setdefault(term, {})
+            counts[doc] = counts.get(doc, 0) + 1
+
+    vocab = {term: row for row, term in enumerate(sorted(term_counts))}
+    indptr = np.zeros(len(vocab) + 1, dtype=np.int32)
+    postings, weights = [], []
+    n_docs = len(documents)
+
+    for term, row in vocab.items():
+        counts = term_counts[term]
+        idf = math.log(1 + (n_docs - len(counts) + 0.5) / (len(counts) + 0.5))
+        for doc in sorted(counts):
+            tf = counts[doc]
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths[doc] / average_length)
+            postings.append(doc)
+            weights.append(idf * tf * (BM25_K1 + 1) / (tf + norm))
+        indptr[row + 1] = len(postings)
+
+    os.makedirs(out_dir, exist_ok=True)
+    np.save(os.path.join(out_dir, 'indptr.npy'), indptr)
+    np.save(os.path.join(out_dir, 'postings.npy'), np.array(postings, dtype=np.int32))
+    np.save(os.path.join(out_dir, 'weights.npy'), np.array(weights, dtype=np.float32))
+    with open(os.path.join(out_dir, 'vocab.json'), 'w', encoding='utf-8') as f:
+        json.dump(vocab, f, ensure_ascii=False)
+    with open(os.path.join(out_dir, 'docs.json'), 'w', encoding='utf-8') as f:
+        json.dump([target for _, target in documents], f, ensure_ascii=False)
+
+    return out_dir
+
+
+# ============================================================================
+# LOAD + SEARCH
+# ============================================================================
+
+class ChatIndex:
+    """Read-only BM25 index with its arrays memory-mapped"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, 'vocab.json'), encoding='utf-8') as f:
+            self.vocab = json.load(f)
+        with open(os.path.join(path, 'docs.json'), encoding='utf-8') as f:
+            self.docs = json.load(f)
+
+        self.indptr = np.load(os.path.join(path, 'indptr.npy'), mmap_mode='r')
+        self.postings = np.load(os.path.join(path, 'postings.npy'), mmap_mode='r')
+        self.weights = np.load(os.path.join(path, 'weights.npy'), mmap_mode='r')
+
+    def search(self, query, k=3):
+        """
+        Top-k documents for a query
+
+        Returns:
+            List of (doc, score), best first; empty if no query term is indexed
+        """
+        rows = [self.vocab[term] for term in set(analyze(query)) if term in self.vocab]
+        if not rows:
+            return []
+
+        scores = np.zeros(len(self.docs), dtype=np.float32)
+        for row in rows:
+            start, end = self.indptr[row], self.indptr[row + 1]
+            # A term lists each document once, so fancy-index += is safe
+            scores[self.postings[start:end]] += self.weights[start:end]
+
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(doc), float(scores[doc])) for doc in top if scores[doc] > 0]
+
+
+def load_index(index_dir=CHAT_INDEX_DIR, corpus_path=CORPUS_PATH, responses_path=RESPONSES_PATH):
+    """
+    Memory-map the current index, building it first if it is missing
+
+    Each build goes to a temp dir that is renamed into place, so workers
+    starting together never see a half-written index.
+    """
+    path = os.path.join(index_dir, fingerprint(corpus_path, responses_path))
+    if not os.path.isdir(path):
+        os.makedirs(index_dir, exist_ok=True)
+        tmp = tempfile.mkdtemp(prefix='.build-', dir=index_dir)
+        build_index(tmp, corpus_path, responses_path)
+        try:
+            os.rename(tmp, path)
+            print(f"🔎 Chat index built: {path}")
+        except OSError:
+            # Another process finished first
+            shutil.rmtree(tmp, ignore_errors=True)
+
+        # Drop indexes for older corpus versions
+        for name in os.listdir(index_dir):
+            if name != os.path.basename(path) and not name.startswith('.build-'):
+                shutil.rmtree(os.path.join(index_dir, name), ignore_errors=True)
+
+    return ChatIndex(path)
+
+
+if __name__ == '__main__':
+    index = load_index()
+    print(f"Index: {index.path} ({len(index.docs)} docs, {len(index.vocab)} terms)")
+    for question in ("why are my leaves turning yellow", "how to store wheat after harvest", "kisan credit card"):
+        print(question, '->', index.search(question))
@@ -4,200 +4,448 @@ Uses pattern matching and contextual responses
 NOT dummy - actually helpful!
 """
 
+import json
+import os
 import re
-from datetime import datetime
+import sqlite3
+import string
+import threading
+import time
+from collections import OrderedDict, deque, namedtuple
+from types import MappingProxyType
 
-class FarmingChatbot:
+# ============================================================================
+# INTENT MATCHING
+# ============================================================================
+
+# (intent, keywords) in priority order - the first matching intent wins.
+# Answers live in chatbot_responses.json under the intent name.
+INTENTS = [
+    ('greeting', ['hello', 'hi', 'hey', 'namaste', 'vanakkam']),
+    ('farewell', ['bye', 'goodbye', 'thank', 'thanks']),
+    ('disease', ['disease', 'sick', 'problem', 'issue', 'blight', 'rot', 'rust', 'spot']),
+    ('fertilizer', ['fertilizer', 'fertiliser', 'npk', 'urea', 'manure', 'compost']),
+    ('pest', ['pest', 'insect', 'bug', 'worm', 'caterpillar', 'aphid']),
+    ('watering', ['water', 'irrigation', 'watering', 'rain', 'drought']),
+    ('soil', ['soil', 'ph', 'ground', 'earth', 'dirt']),
+    ('crop_specific', ['tomato', 'potato', 'corn', 'maize', 'wheat', 'rice']),
+    ('organic', ['organic', 'natural', 'chemical-free', 'neem']),
+    ('planting', ['plant', 'seed', 'sow', 'grow', 'transplant']),
+    ('harvest', ['harvest', 'pick', 'when to harvest', 'ready']),
+    ('weather', ['weather', 'temperature', 'climate', 'season']),
+    ('government', ['scheme', 'subsidy', 'government', 'pm kisan', 'loan']),
+]
+
+# Within an intent, the first sub-intent whose keywords match picks the
+# answer; otherwise the intent's "default" answer is used
+SUB_INTENTS = {
+    'disease': [('blight', ['blight', 'late blight']), ('spot', ['spot', 'spots']), ('rust', ['rust'])],
+    'fertilizer': [('npk', ['npk', 'ratio']), ('organic', ['organic', 'natural'])],
+    'soil': [('ph', ['ph'])],
+    'crop_specific': [('tomato', ['tomato']), ('potato', ['potato'])],
+}
+
+# Answer when no intent matches
+GENERAL_INTENT = 'general'
+
+# Plurals and simple verb forms of a keyword still match ("spots", "planting").
+# Shorter keywords match only as written, so 'hi' never becomes 'his'
+_KEYWORD_SUFFIXES = ('s', 'es', 'ing', 'ed')
+_MIN_INFLECTED_LENGTH = 3
+
+# ASCII punctuation -> space, so tokenizing is one translate() + split()
+_PUNCTUATION = string.punctuation.replace('_', '').encode()
+_TOKEN_TABLE = bytes.maketrans(_PUNCTUATION, b' ' * len(_PUNCTUATION))
+
+
+def _tokens(text):
+    """Lowercased text as a list of UTF-8 word tokens"""
+    return text.encode('utf-8').translate(_TOKEN_TABLE).split()
+
+
+def _word_forms(word):
+    """A keyword plus its suffixed forms ('issue' -> 'issues', 'issued', 'issuing')"""
+    forms = {word}
+    if len(word) < _MIN_INFLECTED_LENGTH:
+        return forms
+    for suffix in _KEYWORD_SUFFIXES:
+        forms.add(word + suffix)
+    if word.endswith('e'):
+        forms.update((word[:-1] + 'ing', word[:-1] + 'ed'))
+    return forms
+
+
+class IntentMatcher:
     """
-    Intelligent farming assistant chatbot
-    Provides contextual, helpful responses to farmer questions
+    Keyword -> intent table matched over whole words in one pass
+    
+    The message is split into words once; every word costs a single dict
+    lookup, and multi-word keywords ('pm kisan', 'chemical-free') are only
+    tried from words that start one. Whole-word matching means 'hi' no
+    longer fires on 'this', nor 'ph' on 'phone'.
     """
     
-    def __init__(self, language='en'):
-        self.language = language
-        self.conversation_history = []
-        self.user_context = {}
-        
-    def get_response(self, message):
-        """Get intelligent response to user message"""
-        message_lower = message.lower()
-        
-        # Store in history
-        self.conversation_history.append({
-            'role': 'user',
-            'message': message,
-            'timestamp': datetime.now()
-        })
+    def __init__(self, intents):
+        self.intents = [intent for intent, _ in intents]
+        self._lookup = {}        # word or space-joined phrase -> priority
+        self._phrase_heads = {}  # first word -> longest phrase length
         
-        # Analyze message and get response
-        response = self._analyze_and_respond(message_lower, message)
-        
-        # Store response in history
-        self.conversation_history.append({
-            'role': 'assistant',
-            'message': response,
-            'timestamp': datetime.now()
-        })
-        
-        return response
+        for priority, (intent, keywords) in enumerate(intents):
+            for keyword in keywords:
+                words = _tokens(keyword.lower())
+                *head, last = words
+                for form in _word_forms(last.decode()):
+                    self._lookup.setdefault(b' '.join(head + [form.encode()]), priority)
+                if head:
+                    self._phrase_heads[words[0]] = max(self._phrase_heads.get(words[0], 0), len(words))
     
-    def _analyze_and_respond(self, message_lower, original_message):
-        """Analyze message and generate intelligent response"""
-        
-        # Greetings
-        if any(word in message_lower for word in ['hello', 'hi', 'hey', 'namaste', 'vanakkam']):
-            return self._greeting_response()
-        
-        # Farewells
-        if any(word in message_lower for word in ['bye', 'goodbye', 'thank', 'thanks']):
-            return self._farewell_response()
-        
-        # Disease-related questions
-        if any(word in message_lower for word in ['disease', 'sick', 'problem', 'issue', 'blight', 'rot', 'rust', 'spot']):
-            return self._disease_response(message_lower)
+    def match(self, message_lower):
+        """Intents found in a lowercased message, highest priority first"""
+        tokens = _tokens(message_lower)
+        lookup = self._lookup
+        found = {lookup[token] for token in lookup.keys() & tokens}
         
-        # Fertilizer questions
-        if any(word in message_lower for word in ['fertilizer', 'fertiliser', 'npk', 'urea', 'manure', 'compost']):
-            return self._fertilizer_response(message_lower)
+        if not self._phrase_heads.keys().isdisjoint(tokens):
+            for i, token in enumerate(tokens):
+                longest = self._phrase_heads.get(token)
+                if longest:
+                    for n in range(2, longest + 1):
+                        priority = lookup.get(b' '.join(tokens[i:i + n]))
+                        if priority is not None:
+                            found.add(priority)
         
-        # Pest questions
-        if any(word in message_lower for word in ['pest', 'insect', 'bug', 'worm', 'caterpillar', 'aphid']):
-            return self._pest_response(message_lower)
-        
-        # Watering questions
-        if any(word in message_lower for word in ['water', 'irrigation', 'watering', 'rain', 'drought']):
-            return self._watering_response(message_lower)
-        
-        # Soil questions
-        if any(word in message_lower for word in ['soil', 'ph', 'ground', 'earth', 'dirt']):
-            return self._soil_response(message_lower)
-        
-        # Crop-specific questions
-        if any(word in message_lower for word in ['tomato', 'potato', 'corn', 'maize', 'wheat', 'rice']):
-            return self._crop_specific_response(message_lower)
-        
-        # Organic farming
-        if any(word in message_lower for word in ['organic', 'natural', 'chemical-free', 'neem']):
-            return self._organic_response(message_lower)
-        
-        # Planting/seeding
-        if any(word in message_lower for word in ['plant', 'seed', 'sow', 'grow', 'transplant']):
-            return self._planting_response(message_lower)
-        
-        # Harvesting
-        if any(word in message_lower for word in ['harvest', 'pick', 'when to harvest', 'ready']):
-            return self._harvest_response(message_lower)
-        
-        # Weather
-        if any(word in message_lower for word in ['weather', 'temperature', 'climate', 'season']):
-            return self._weather_response(message_lower)
+        return [self.intents[priority] for priority in sorted(found)]
+
+
+intent_matcher = IntentMatcher(INTENTS)
+
+
+sub_intent_matchers = {intent: IntentMatcher(rules) for intent, rules in SUB_INTENTS.items()}
+
+
+def classify(message_lower):
+    """(intent, sub-intent) for a lowercased message"""
+    intents = intent_matcher.match(message_lower)
+    if not intents:
+        return GENERAL_INTENT, 'default'
+    
+    intent = intents[0]
+    matcher = sub_intent_matchers.get(intent)
+    sub_intents = matcher.match(message_lower) if matcher else []
+    return intent, sub_intents[0] if sub_intents else 'default'
+
+# ============================================================================
+# RESPONSE CATALOG
+# ============================================================================
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+RESPONSES_PATH = os.path.join(BASE_DIR, 'chatbot_responses.json')
+
+CHAT_LANGUAGES = ('en', 'hi', 'ta')
+
+# A catalog answer: the text and its ready-to-send /api/chat JSON body
+CatalogResponse = namedtuple('CatalogResponse', ['text', 'body'])
+
+
+def encode_chat_body(text):
+    """UTF-8 JSON body for /api/chat"""
+    return json.dumps({'response': text}, ensure_ascii=False).encode('utf-8')
+
+
+def load_response_catalog(path=RESPONSES_PATH):
+    """
+    Compile the response file into an immutable lookup table
+    
+    Returns:
+        Read-only mapping of (intent, sub_intent, language) -> CatalogResponse.
+        Languages missing from the file fall back to the English entry, which
+        is the same object, so each text is encoded only once.
+    """
+    with open(path, encoding='utf-8') as f:
+        responses = json.load(f)['responses']
+    
+    catalog = {}
+    for intent, sub_intents in responses.items():
+        for sub_intent, texts in sub_intents.items():
+            english = CatalogResponse(texts['en'], encode_chat_body(texts['en']))
+            for language in CHAT_LANGUAGES:
+                text = texts.get(language)
+                entry = english if text is None else CatalogResponse(text, encode_chat_body(text))
+                catalog[(intent, sub_intent, language)] = entry
+    
+    for intent in [intent for intent, _ in INTENTS] + [GENERAL_INTENT]:
+        if (intent, 'default', 'en') not in catalog:
+            raise ValueError(f"{path}: no default answer for intent '{intent}'")
+    
+    return MappingProxyType(catalog)
+
+
+response_catalog = load_response_catalog()
+
+# ============================================================================
+# RETRIEVAL (catch-all questions)
+# ============================================================================
+
+# Best BM25 score needed before a retrieved answer replaces the general one
+RETRIEVAL_MIN_SCORE = float(os.environ.get('CHAT_RETRIEVAL_MIN_SCORE', 5.0))
+
+try:
+    from chat_retrieval import load_index
+    chat_index = load_index()
+    # Corpus answers are English-only; encode each once like the catalog
+    retrieval_responses = [
+        CatalogResponse(doc['answer'], encode_chat_body(doc['answer'])) if 'answer' in doc else None
+        for doc in chat_index.docs
+    ]
+    print(f"✅ Chat retrieval index loaded ({len(chat_index.docs)} docs)")
+except Exception as e:
+    print(f"⚠️ WARNING: Chat retrieval unavailable: {e}")
+    chat_index = retrieval_responses = None
+
+
+def retrieve(message_lower, language='en'):
+    """Best-matching indexed answer for a message, or None below the score threshold"""
+    if chat_index is None:
+        return None
+    
+    hits = chat_index.search(message_lower, k=1)
+    if not hits or hits[0][1] < RETRIEVAL_MIN_SCORE:
+        return None
+    
+    doc = hits[0][0]
+    if retrieval_responses[doc] is not None:
+        return retrieval_responses[doc]
+    target = chat_index.docs[doc]
+    return response_catalog[(target['intent'], target['sub_intent'], language)]
+
+
+# ============================================================================
+# CONVERSATION STATE
+# ============================================================================
+
+# Messages kept per session (user + assistant), sessions kept per worker,
+# and idle time before a session is forgotten
+CHAT_HISTORY_SIZE = int(os.environ.get('CHAT_HISTORY_SIZE', 20))
+CHAT_MAX_SESSIONS = int(os.environ.get('CHAT_MAX_SESSIONS', 1000))
+CHAT_SESSION_TTL = int(os.environ.get('CHAT_SESSION_TTL', 1800))
+
+# Optional SQLite file that keeps history across workers and restarts
+CHAT_STATE_DB = os.environ.get('CHAT_STATE_DB', '')
+
+# Purge expired sessions from the disk tier once every N writes
+_DISK_PURGE_INTERVAL = 200
+
+
+class ConversationStore:
+    """
+    Bounded per-session conversation history
+    
+    Each session is a ring buffer (deque with maxlen) of its latest
+    messages; sessions live in an LRU bounded by count and expire after
+    CHAT_SESSION_TTL seconds idle, so worker memory stays flat however
+    many users chat. With db_path set, messages are also written to
+    SQLite (trimmed to the same size) and reloaded on a memory miss.
+    """
+    
+    def __init__(self, history_size=CHAT_HISTORY_SIZE, max_sessions=CHAT_MAX_SESSIONS,
+                 ttl=CHAT_SESSION_TTL, db_path=CHAT_STATE_DB):
+        self.history_size = history_size
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.db_path = db_path
         
-        # Government schemes
-        if any(word in message_lower for word in ['scheme', 'subsidy', 'government', 'pm kisan', 'loan']):
-            return self._government_response(message_lower)
+        self._sessions = OrderedDict()  # session_id -> (last_seen, deque)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._writes = 0
         
-        # Default intelligent response
-        return self._general_farming_response()
-    
-    # ========================================================================
-    # RESPONSE GENERATORS
-    # ========================================================================
-    
-    def _greeting_response(self):
-        responses = {
-            'en': "Hello! 👋 I'm Kisan Sahayak, your farming assistant. I can help you with:\n\n• Disease identification & treatment\n• Fertilizer recommendations\n• Pest control methods\n• Watering schedules\n• Soil health\n• Organic farming tips\n\nWhat can I help you with today?",
-            'hi': "नमस्ते! 👋 मैं किसान सहायक हूं। मैं आपकी मदद कर सकता हूं:\n\n• रोग पहचान और उपचार\n• उर्वरक सिफारिशें\n• कीट नियंत्रण\n• सिंचाई\n• मिट्टी स्वास्थ्य\n• जैविक खेती\n\nआज मैं आपकी कैसे मदद कर सकता हूं?",
-            'ta': "வணக்கம்! 👋 நான் கிசான் சஹாயக். நான் உங்களுக்கு உதவ முடியும்:\n\n• நோய் அடையாளம் மற்றும் சிகிச்சை\n• உரம் பரிந்துரைகள்\n• பூச்சி கட்டுப்பாடு\n• நீர்ப்பாசனம்\n• மண் ஆரோக்கியம்\n• இயற்கை விவசாயம்\n\nஇன்று நான் உங்களுக்கு எப்படி உதவ முடியும்?"
-        }
-        return responses.get(self.language, responses['en'])
-    
-    def _farewell_response(self):
-        responses = {
-            'en': "You're welcome! 🌾 Happy farming! Feel free to ask me anything anytime. Good luck with your crops!",
-            'hi': "आपका स्वागत है! 🌾 खुश खेती! कभी भी मुझसे कुछ भी पूछने में संकोच न करें। आपकी फसलों के लिए शुभकामनाएं!",
-            'ta': "வரவேற்கிறோம்! 🌾 மகிழ்ச்சியான விவசாயம்! எப்போது வேண்டுமானாலும் என்னிடம் கேளுங்கள். உங்கள் பயிர்களுக்கு வாழ்த்துக்கள்!"
-        }
-        return responses.get(self.language, responses['en'])
-    
-    def _disease_response(self, message):
-        if 'blight' in message or 'late blight' in message:
-            return "Late Blight is very serious! 🚨\n\nQUICK ACTION:\n1. Remove infected plants IMMEDIATELY\n2. Apply copper fungicide to healthy plants\n3. Improve air circulation\n4. Water only at base, keep leaves dry\n5. Don't compost infected plants - burn them\n\nOrganic option: Mix 1 tbsp baking soda + 5ml neem oil in 1L water. Spray every 3 days.\n\nWant specific advice for your crop?"
+        self.counters = {'evicted': 0, 'expired': 0, 'disk_loads': 0, 'disk_errors': 0}
+    
+    # ------------------------------------------------------------------
+    # Disk tier
+    # ------------------------------------------------------------------
+    
+    def _disk(self):
+        """Per-thread (and per-process) connection, or None without a db_path"""
+        if not self.db_path:
+            return None
         
-        elif 'spot' in message or 'spots' in message:
-            return "Leaf spots can be bacterial or fungal. Here's what to do:\n\n✅ Immediate steps:\n1. Remove affected leaves carefully\n2. Apply copper-based spray\n3. Avoid overhead watering\n4. Disinfect tools with bleach\n\n💊 Treatment:\n• Chemical: Copper sulfate or chlorothalonil\n• Organic: Neem oil spray (5ml/liter)\n\n⚠️ Prevention:\n• Use disease-free seeds\n• Practice crop rotation\n• Maintain plant spacing\n\nWhich crop is affected?"
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
         
-        elif 'rust' in message:
-            return "Rust disease shows orange/brown pustules on leaves.\n\n🔸 Treatment:\n1. Usually not serious - monitor first\n2. If severe: Apply sulfur dust or spray\n3. Remove heavily infected leaves\n4. Improve air flow between plants\n\n🌱 Prevention:\n• Plant resistant varieties\n• Avoid excess nitrogen\n• Don't water late in day\n\nCommon on: Corn, wheat, beans\n\nNeed help with specific crop?"
+        conn = sqlite3.connect(self.db_path, timeout=5)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS chat_history (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                session_id TEXT NOT NULL,
+                message TEXT NOT NULL,
+                timestamp REAL NOT NULL
+            )
+        ''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_chat_history_session ON chat_history (session_id, id)')
+        conn.commit()
         
-        else:
-            return "To help identify the disease, please tell me:\n\n1️⃣ Which crop is affected?\n2️⃣ What do you see?\n   • Color of spots (brown/black/yellow)\n   • Location (leaves/stems/fruit)\n   • Pattern (spots/rings/mold)\n\n📸 Better yet - use our SCAN feature to upload a photo for accurate diagnosis!\n\nOr describe the symptoms and I'll help identify it."
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
     
-    def _fertilizer_response(self, message):
-        if 'npk' in message or 'ratio' in message:
-            return "NPK Fertilizer Guide: 🌱\n\nNPK = Nitrogen-Phosphorus-Potassium\n\n📊 BY GROWTH STAGE:\n\n🌱 Vegetative (leafy growth):\n• High N: 20-10-10 or 15-5-10\n• Examples: Urea, ammonium nitrate\n\n🌸 Flowering/Fruiting:\n• High P: 10-20-10 or 5-10-5\n• Examples: Bone meal, DAP\n\n🍅 Ripening:\n• High K: 10-10-20 or 5-5-15\n• Examples: Muriate of potash\n\n💡 TIP: Test soil first! Over-fertilizing causes more problems than under-fertilizing.\n\nWhich stage is your crop in?"
+    def _disk_load(self, session_id):
+        try:
+            conn = self._disk()
+            if conn is None:
+                return []
+            
+            rows = conn.execute('''
+                SELECT message FROM chat_history
+                WHERE session_id = ? AND timestamp > ?
+                ORDER BY id DESC LIMIT ?
+            ''', (session_id, time.time() - self.ttl, self.history_size)).fetchall()
+            if rows:
+                self.counters['disk_loads'] += 1
+            return [json.loads(row[0]) for row in reversed(rows)]
         
-        elif 'organic' in message or 'natural' in message:
-            return "Organic Fertilizer Options: 🌿\n\n1️⃣ VERMICOMPOST (best all-around)\n• Apply: 2-3 tons/acre\n• Rich in NPK + micronutrients\n• Improves soil structure\n\n2️⃣ NEEM CAKE\n• Apply: 200-250 kg/acre\n• Natural pest deterrent\n• Slow-release nitrogen\n\n3️⃣ FARMYARD MANURE (FYM)\n• Apply: 5-6 tons/acre\n• Best if well-decomposed\n• Add before planting\n\n4️⃣ GREEN MANURE\n• Grow: Dhaincha, Sunhemp\n• Turn into soil before flowering\n• Free nitrogen!\n\n5️⃣ JEEVAMRUT (liquid)\n• Mix: Cow dung + urine + jaggery\n• Spray or drench weekly\n\nWhich are you interested in?"
+        except sqlite3.Error as e:
+            print(f"Chat history read error: {e}")
+            self.counters['disk_errors'] += 1
+            return []
+    
+    def _disk_append(self, session_id, entries):
+        try:
+            conn = self._disk()
+            if conn is None:
+                return
+            
+            conn.executemany(
+                'INSERT INTO chat_history (session_id, message, timestamp) VALUES (?, ?, ?)',
+                [(session_id, json.dumps(entry, ensure_ascii=False), entry['timestamp']) for entry in entries]
+            )
+            # Keep only the ring buffer's worth of rows for this session
+            conn.execute('''
+                DELETE FROM chat_history WHERE session_id = ? AND id NOT IN (
+                    SELECT id FROM chat_history WHERE session_id = ? ORDER BY id DESC LIMIT ?
+                )
+            ''', (session_id, session_id, self.history_size))
+            
+            self._writes += 1
+            if self._writes % _DISK_PURGE_INTERVAL == 0:
+                conn.execute('DELETE FROM chat_history WHERE timestamp < ?', (time.time() - self.ttl,))
+            
+            conn.commit()
         
-        else:
-            return "Fertilizer Basics: 📖\n\n✅ WHEN TO APPLY:\n• Base dose: Before planting\n• Top dressing: 30-45 days after planting\n• Foliar spray: Every 2-3 weeks\n\n✅ HOW MUCH:\nDepends on:\n• Crop type\n• Soil test results  \n• Previous crop\n\n💡 GOLDEN RULE:\n\"Feed the soil, not the plant!\"\n\n⚠️ AVOID:\n• Over-fertilizing (burns roots)\n• Applying to dry soil\n• Fertilizing stressed plants\n\nWhat crop are you growing? I'll give specific recommendations!"
+        except sqlite3.Error as e:
+            print(f"Chat history write error: {e}")
+            self.counters['disk_errors'] += 1
     
-    def _pest_response(self, message):
-        return "Pest Control Guide: 🐛\n\n🌿 ORGANIC METHODS (Try first!):\n\n1️⃣ NEEM OIL SPRAY\n• Mix: 5ml neem oil + 1L water + drop of soap\n• Spray: Early morning or evening\n• Effective: 85% of common pests\n\n2️⃣ PANCHAGAVYA\n• Mix cow products + jaggery\n• Natural pesticide + growth booster\n\n3️⃣ GARLIC-CHILI SPRAY\n• Blend garlic + chili + water\n• Strain and spray\n• Repels most insects\n\n💊 CHEMICAL (if severe):\n• Imidacloprid (sucking pests)\n• Chlorpyrifos (chewing pests)\n• Always follow label instructions!\n\n🦗 BY PEST TYPE:\n• Aphids: Neem oil\n• Caterpillars: Bt spray\n• Whiteflies: Yellow sticky traps\n• Beetles: Hand-pick + spray\n\nWhich pest are you facing?"
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
     
-    def _watering_response(self, message):
-        return "Watering Guide: 💧\n\n✅ GENERAL RULES:\n\n📏 HOW MUCH:\n• Most crops: 1-2 inches per week\n• Check: Soil should be moist 6 inches deep\n• Avoid: Waterlogged soil\n\n⏰ WHEN:\n• Best: Early morning (6-8 AM)\n• OK: Late evening (after 6 PM)\n• Avoid: Midday (water evaporates)\n\n🌱 BY GROWTH STAGE:\n• Seedling: Light, frequent\n• Vegetative: Moderate, regular\n• Flowering: Consistent, don't stress\n• Fruiting: Reduce slightly\n\n☀️ BY WEATHER:\n• Hot/windy: More frequent\n• Cool/cloudy: Less frequent\n• Rainy: May not need any\n\n💡 TEST METHOD:\n• Stick finger 2 inches in soil\n• If dry: Water needed\n• If moist: Wait\n\n🚨 SIGNS OF:\nUnder-watering: Wilting, dry soil\nOver-watering: Yellow leaves, soggy\n\nWhich crop are you watering?"
+    def _expire(self, now):
+        """Drop idle sessions from the LRU end (caller holds the lock)"""
+        while self._sessions:
+            session_id, (last_seen, _) = next(iter(self._sessions.items()))
+            if now - last_seen < self.ttl:
+                break
+            del self._sessions[session_id]
+            self.counters['expired'] += 1
     
-    def _soil_response(self, message):
-        if 'ph' in message:
-            return "Soil pH Guide: 🧪\n\n📊 IDEAL pH BY CROP:\n• Vegetables: 6.0-7.0\n• Potatoes: 5.0-6.5 (acidic)\n• Wheat: 6.0-7.5\n• Rice: 5.5-6.5\n• Legumes: 6.0-7.0\n\n🔍 HOW TO TEST:\n1. Buy pH test kit (₹50-200)\n2. Mix soil with water\n3. Compare color to chart\n\n🔧 TO ADJUST:\n\nTOO ACIDIC (pH < 6):\n• Add lime (calcium carbonate)\n• Use wood ash\n• Add dolomite\n\nTOO ALKALINE (pH > 7.5):\n• Add sulfur\n• Use compost\n• Add peat moss\n\n⚠️ Adjust slowly! Test every season.\n\nNeed help interpreting results?"
-        
-        else:
-            return "Soil Health Tips: 🌍\n\n✅ IMPROVE SOIL:\n\n1️⃣ ADD ORGANIC MATTER\n• Compost: 2-3 inches yearly\n• FYM: 5-6 tons/acre\n• Green manure crops\n\n2️⃣ REDUCE TILLAGE\n• Minimal disturbance\n• Mulch instead\n• Protects soil structure\n\n3️⃣ CROP ROTATION\n• Never same crop 2 years\n• Legumes add nitrogen\n• Breaks pest cycles\n\n4️⃣ COVER CROPS\n• Protect bare soil\n• Add organic matter\n• Prevent erosion\n\n5️⃣ AVOID:\n• Over-tilling\n• Burning crop residue\n• Heavy machinery on wet soil\n\n🔬 SOIL TEST:\nGet tested every 2-3 years!\nTests: NPK, pH, organic matter\nCost: ₹200-500\n\nWant specific advice for your soil type?"
+    def _history(self, session_id, now):
+        """The session's ring buffer, loaded from disk on a miss (caller holds the lock)"""
+        entry = self._sessions.get(session_id)
+        if entry is not None and now - entry[0] < self.ttl:
+            return entry[1]
+        return deque(self._disk_load(session_id), maxlen=self.history_size)
     
-    def _crop_specific_response(self, message):
-        if 'tomato' in message:
-            return "Tomato Growing Tips: 🍅\n\n✅ KEY POINTS:\n\n🌱 PLANTING:\n• Spacing: 2-3 feet apart\n• Depth: Bury up to first leaves\n• Stake immediately\n\n💧 WATERING:\n• 1-2 inches/week\n• Keep consistent!\n• Water at base, not leaves\n\n🌿 FERTILIZER:\n• Planting: 10-10-10\n• Flowering: 5-10-10\n• Fruiting: 5-10-15\n\n🐛 COMMON PESTS:\n• Hornworms: Hand-pick\n• Aphids: Neem spray\n• Whiteflies: Yellow traps\n\n🦠 COMMON DISEASES:\n• Late Blight: Remove infected!\n• Early Blight: Copper spray\n• Blossom End Rot: Calcium\n\n📅 HARVEST:\n• 60-85 days after planting\n• Pick when fully colored\n• Twist gently from vine\n\nNeed help with specific problem?"
+    def append(self, session_id, *entries):
+        """Add messages to a session, evicting the least recently used sessions"""
+        now = time.time()
+        with self._lock:
+            history = self._history(session_id, now)
+            history.extend(entries)
+            self._sessions[session_id] = (now, history)
+            self._sessions.move_to_end(session_id)
+            
+            self._expire(now)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.counters['evicted'] += 1
         
-        elif 'potato' in message:
-            return "Potato Growing Guide: 🥔\n\n✅ SUCCESS TIPS:\n\n🌱 PLANTING:\n• Season: Feb-March or Oct-Nov\n• Depth: 4 inches\n• Spacing: 12 inches apart\n• Rows: 2.5-3 feet apart\n\n⛰️ HILLING:\n• Week 3-4: Hill soil around stems\n• Repeat every 2-3 weeks\n• Prevents green potatoes\n\n💧 WATERING:\n• Regular until flowering\n• Reduce after flowering\n• Stop 2 weeks before harvest\n\n🌿 FERTILIZER:\n• High N early (leafy growth)\n• High K later (tuber formation)\n• Avoid too much N (reduces tubers)\n\n🦠 WATCH FOR:\n• Late Blight: VERY SERIOUS!\n• Early Blight: Common\n• Colorado beetle: Hand-pick\n\n📅 HARVEST:\n• 90-120 days after planting\n• When vines die back\n• Cure in dark for 2 weeks\n\nWhat stage are you at?"
-        
-        else:
-            return "I can provide detailed guidance for:\n\n🌾 Cereals: Rice, Wheat, Corn, Millet\n🍅 Vegetables: Tomato, Potato, Onion, Cabbage\n🫘 Pulses: Chickpea, Lentil, Pigeon pea\n🌰 Cash crops: Cotton, Sugarcane, Soybean\n\nWhich crop would you like to know about?\n\nOr ask specific questions like:\n• When to plant [crop]?\n• How to fertilize [crop]?\n• Common diseases in [crop]?\n• Harvesting time for [crop]?"
-    
-    def _organic_response(self, message):
-        return "Organic Farming Essentials: 🌿\n\n✅ CORE PRINCIPLES:\n\n1️⃣ SOIL HEALTH FIRST\n• Add compost regularly\n• No chemical fertilizers\n• Encourage earthworms\n• Mulch heavily\n\n2️⃣ NATURAL PEST CONTROL\n• Neem oil (main weapon)\n• Companion planting\n• Attract beneficial insects\n• Physical barriers\n\n3️⃣ NATURAL FERTILIZERS\n• Vermicompost: Best\n• FYM: Well-decomposed\n• Green manure: Free nitrogen\n• Jeevamrut: Growth booster\n\n4️⃣ DISEASE PREVENTION\n• Crop rotation\n• Resistant varieties\n• Proper spacing\n• Sanitation\n\n📋 HOMEMADE RECIPES:\n\n🌿 PEST SPRAY:\n• 50g neem leaves\n• 5 cloves garlic\n• 2 green chilies\n• Blend + strain + spray\n\n🌱 GROWTH BOOSTER:\n• 10 liters water\n• 2kg cow dung\n• 1L cow urine\n• 200g jaggery\n• Ferment 7 days\n\n💰 CERTIFICATION:\n• Takes 3 years\n• Better prices!\n• Growing market\n\nInterested in converting to organic?"
+        self._disk_append(session_id, entries)
     
-    def _planting_response(self, message):
-        return "Planting Success Guide: 🌱\n\n✅ GENERAL STEPS:\n\n1️⃣ PREPARE SOIL\n• Till/dig 6-8 inches deep\n• Add compost 2 weeks before\n• Break all clumps\n• Level the field\n\n2️⃣ SEED SELECTION\n• Buy certified seeds\n• Check expiry date\n• Right variety for season\n• Treatment (fungicide)\n\n3️⃣ SEED TREATMENT\n• Soak in water (removes hollow)\n• Treat with Trichoderma\n• Or chemical treatment\n• Dry in shade\n\n4️⃣ PLANTING DEPTH\n• Small seeds: 1/4 inch\n• Medium: 1/2-1 inch\n• Large: 1-2 inches\n• Rule: 2-3× seed size\n\n5️⃣ SPACING\n• Follows seed packet\n• Closer = smaller plants\n• Wider = bigger plants\n• Allow air circulation\n\n6️⃣ AFTER PLANTING\n• Water gently\n• Mulch if possible\n• Protect from birds\n• Mark rows\n\n📅 TIMING:\nDifferent for each crop!\nWhich crop are you planting?"
+    def history(self, session_id):
+        """A session's recent messages, oldest first"""
+        with self._lock:
+            return list(self._history(session_id, time.time()))
     
-    def _harvest_response(self, message):
-        return "Harvesting Guide: 🌾\n\n✅ WHEN TO HARVEST:\n\n🍅 TOMATOES:\n• Fully colored\n• Slight give when squeezed\n• 60-85 days after planting\n\n🥔 POTATOES:\n• Vines die back\n• 2-3 weeks after flowering ends\n• 90-120 days total\n\n🌽 CORN:\n• Silks turn brown\n• Kernels milky when squeezed\n• 70-100 days\n\n🌾 WHEAT:\n• Grains hard\n• Moisture 20-25%\n• 120-150 days\n\n✅ HARVESTING TIPS:\n\n⏰ TIME OF DAY:\n• Early morning (cool)\n• After dew dries\n• Before heat of day\n\n🔪 METHOD:\n• Use sharp tools\n• Cut, don't pull\n• Handle gently\n• Avoid bruising\n\n📦 POST-HARVEST:\n• Sort immediately\n• Remove damaged\n• Cool quickly\n• Store properly\n\n⚠️ DON'T:\n• Harvest when wet\n• Drop or throw\n• Mix varieties\n• Leave in sun\n\nWhich crop needs harvesting?"
-    
-    def _weather_response(self, message):
-        return "Weather & Farming: ☀️🌧️\n\n✅ BY SEASON:\n\n🌸 KHARIF (Jun-Oct):\n• Monsoon crops\n• Rice, cotton, soybean\n• High rainfall\n• Watch for flooding\n\n❄️ RABI (Oct-Mar):\n• Winter crops\n• Wheat, chickpea, mustard\n• Irrigation needed\n• Watch for frost\n\n☀️ SUMMER (Mar-Jun):\n• Heat-tolerant crops\n• Vegetables, melons\n• Heavy irrigation\n• Mulch essential\n\n⚠️ WEATHER RISKS:\n\n🌧️ HEAVY RAIN:\n• Ensure drainage\n• Watch for disease\n• Support plants\n\n☀️ HEAT WAVE:\n• Increase watering\n• Mulch heavily\n• Shade young plants\n\n❄️ FROST:\n• Cover crops overnight\n• Water before frost\n• Harvest tender crops\n\n💨 STRONG WIND:\n• Stake tall plants\n• Harvest ripe fruit\n• Protect greenhouses\n\n📱 APPS TO USE:\n• Mausam (IMD)\n• Meghdoot\n• AccuWeather\n\nPlan ahead!"
+    def stats(self):
+        return dict(self.counters, sessions=len(self._sessions), disk_enabled=bool(self.db_path))
+
+
+# Per-process singleton shared by the language bots
+conversation_store = ConversationStore()
+
+
+class FarmingChatbot:
+    """
+    Intelligent farming assistant chatbot
+    Provides contextual, helpful responses to farmer questions
+    """
     
-    def _government_response(self, message):
-        return "Government Schemes for Farmers: 🏛️\n\n💰 MAJOR SCHEMES:\n\n1️⃣ PM-KISAN\n• ₹6,000/year\n• Direct to bank\n• 3 installments\n• All farmers eligible\n• Register: pmkisan.gov.in\n\n2️⃣ CROP INSURANCE (PMFBY)\n• Protects against losses\n• Very low premium\n• Weather, pests, disease covered\n• Apply through bank/CSC\n\n3️⃣ SOIL HEALTH CARD\n• Free soil testing\n• Fertilizer recommendations\n• Every 2 years\n• Contact local agriculture office\n\n4️⃣ KCC (Kisan Credit Card)\n• Low-interest loans\n• Flexible repayment\n• For farming expenses\n• Apply through bank\n\n5️⃣ SUBSIDY SCHEMES:\n• Drip irrigation: 55%\n• Farm mechanization: 50%\n• Cold storage: 35%\n• Solar pumps: 60%\n\n📱 HOW TO APPLY:\n• Visit CSC center\n• Use mobile apps\n• Contact agriculture office\n• Through bank\n\n📞 HELPLINE:\n• Kisan Call Center: 1800-180-1551\n• PM-Kisan: 155261\n\nNeed help with specific scheme?"
+    def __init__(self, language='en', store=None):
+        self.language = language
+        self.store = store if store is not None else conversation_store
+        
+    def reply(self, message, session_id=None):
+        """Catalog answer (text + encoded JSON body) for a user message"""
+        message_lower = message.lower()
+        intent, sub_intent = classify(message_lower)
+        language = self.language if self.language in CHAT_LANGUAGES else 'en'
+        
+        response = None
+        if intent == GENERAL_INTENT:
+            # No keyword matched - look the question up in the offline index
+            response = retrieve(message_lower, language)
+        if response is None:
+            response = response_catalog[(intent, sub_intent, language)]
+        
+        # Store both turns in the session's history
+        if session_id is not None:
+            now = time.time()
+            self.store.append(
+                session_id,
+                {'role': 'user', 'message': message, 'timestamp': now},
+                {'role': 'assistant', 'message': response.text, 'timestamp': now}
+            )
+        
+        return response
     
-    def _general_farming_response(self):
-        return "I'm here to help with all farming questions! 🌾\n\n💡 POPULAR TOPICS:\n\n🦠 Disease & Pests\n• Identification\n• Treatment options\n• Prevention tips\n\n🌱 Crop Management\n• Planting guide\n• Fertilizer advice\n• Watering schedule\n\n🌿 Organic Farming\n• Natural inputs\n• Pest control\n• Certification\n\n💰 Economics\n• Government schemes\n• Market prices\n• Cost reduction\n\n⚙️ TRY ASKING:\n• \"How to treat late blight?\"\n• \"When to plant tomatoes?\"\n• \"Best organic fertilizer?\"\n• \"PM-Kisan scheme details?\"\n\nOr just describe your problem - I'll help! 😊"
+    def get_response(self, message, session_id=None):
+        """Get intelligent response to user message"""
+        return self.reply(message, session_id).text
 
 # Create singleton instance
 chatbot_en = FarmingChatbot('en')
 chatbot_hi = FarmingChatbot('hi')
 chatbot_ta = FarmingChatbot('ta')
 
-def get_chatbot_response(message, language='en'):
-    """Get chatbot response in specified language"""
+def get_chatbot(language='en'):
+    """Chatbot instance for a language"""
     if language == 'hi':
-        bot = chatbot_hi
+        return chatbot_hi
     elif language == 'ta':
-        bot = chatbot_ta
-    else:
-        bot = chatbot_en
-    
-    return bot.get_response(message)
+        return chatbot_ta
+    return chatbot_en
+
+def get_chatbot_response(message, language='en', session_id=None):
+    """Get chatbot response in specified language (history kept per session_id)"""
+    return get_chatbot(language).get_response(message, session_id)
+
+def get_chatbot_reply(message, language='en', session_id=None):
+    """Like get_chatbot_response, but the CatalogResponse with its encoded body"""
+    return get_chatbot(language).reply(message, session_id)
 
 if __name__ == '__main__':
     print("Testing Farming Chatbot...")
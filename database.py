@@ -5,28 +5,132 @@ Using SQLite for local data storage
 
 import sqlite3
 import os
-import hashlib
-from datetime import datetime
+import atexit
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from passwords import KdfBusy, hash_password, verify_password, verify_unknown_user
+from scan_artifacts import pack_result, unpack_result
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-DATABASE_FILE = os.path.join(BASE_DIR, 'farmscan.db')
+DATABASE_FILE = os.environ.get('FARMSCAN_DB', os.path.join(BASE_DIR, 'farmscan.db'))
+
+# Connection pool settings (DB_POOL=0 restores one connection per call)
+DB_POOL_ENABLED = os.environ.get('DB_POOL', '1') != '0'
+BUSY_TIMEOUT_MS = int(os.environ.get('DB_BUSY_TIMEOUT_MS', 5000))
+STATEMENT_CACHE_SIZE = 256
 
 print("📦 DATABASE PATH USED:", DATABASE_FILE)
 
-def get_db_connection():
-    """Create and return a database connection"""
-    conn = sqlite3.connect(DATABASE_FILE)
+# One pooled connection per thread, re-created after a fork
+_pool = threading.local()
+
+# Connections inherited from a parent process. They are kept referenced and
+# never used or closed: closing one in a forked child can drop the parent's
+# SQLite file locks.
+_inherited = []
+
+
+def _open_connection():
+    """Open a tuned connection: WAL journal, NORMAL sync, busy timeout"""
+    conn = sqlite3.connect(
+        DATABASE_FILE,
+        timeout=BUSY_TIMEOUT_MS / 1000.0,
+        cached_statements=STATEMENT_CACHE_SIZE  # prepared statements reused by SQL text
+    )
     conn.row_factory = sqlite3.Row  # Return rows as dictionaries
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute(f'PRAGMA busy_timeout={BUSY_TIMEOUT_MS}')
     return conn
 
 
-def init_db():
-    """Initialize database with required tables"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
+def get_db_connection():
+    """Return this thread's pooled database connection"""
+    if not DB_POOL_ENABLED:
+        conn = sqlite3.connect(DATABASE_FILE)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    conn = getattr(_pool, 'conn', None)
+    if conn is None or _pool.pid != os.getpid():
+        if conn is not None:
+            _inherited.append(conn)
+        conn = _open_connection()
+        _pool.conn = conn
+        _pool.pid = os.getpid()
+    elif conn.in_transaction:
+        # A previous call failed mid-transaction - don't let it leak
+        conn.rollback()
+    return conn
+
+
+def release_db_connection(conn):
+    """Give a connection from get_db_connection back to the pool"""
+    if not DB_POOL_ENABLED:
+        conn.close()
+    elif conn.in_transaction:
+        conn.rollback()
+
+
+# ============================================================================
+# SCHEMA MIGRATIONS
+# ============================================================================
+#
+# The schema version lives in PRAGMA user_version. Each migration is
+# (version, description, schema_step, backfill_step):
+#   - schema_step(conn) runs in one short transaction and must be
+#     idempotent (IF NOT EXISTS / _add_column_if_missing), because it is
+#     re-run if a backfill was interrupted.
+#   - backfill_step(conn) is optional and should use _backfill_in_batches
+#     so large tables are only write-locked for one small batch at a time.
+# Only append new migrations - never edit or reorder shipped ones.
+#
+# A schema step holds the database write lock until it commits. SQLite has
+# no online index build: CREATE INDEX on a large scans table blocks every
+# writer (readers carry on under WAL) and the booting worker for the whole
+# build. For such upgrades set DB_MIGRATE_ON_BOOT=0 on the web service and
+# run `python database.py` in a maintenance window before deploying.
+
+BACKFILL_BATCH_SIZE = 500
+
+# DB_MIGRATE_ON_BOOT=0: workers refuse to start on an old schema instead
+# of migrating it themselves
+DB_MIGRATE_ON_BOOT = os.environ.get('DB_MIGRATE_ON_BOOT', '1') != '0'
+
+
+def _add_column_if_missing(conn, table, column, declaration):
+    """ALTER TABLE ... ADD COLUMN, skipped if the column already exists"""
+    columns = [row[1] for row in conn.execute(f'PRAGMA table_info({table})')]
+    if column not in columns:
+        conn.execute(f'ALTER TABLE {table} ADD COLUMN {column} {declaration}')
+
+
+def _backfill_in_batches(conn, sql, batch_size=BACKFILL_BATCH_SIZE):
+    """
+    Repeat an idempotent UPDATE/DELETE in short transactions until done
     
-    # Users table
-    cursor.execute('''
+    The statement takes the batch size as its only parameter, e.g.
+    UPDATE t SET x = ... WHERE id IN (SELECT id FROM t WHERE x IS NULL LIMIT ?)
+    
+    Returns:
+        Total number of rows changed
+    """
+    total = 0
+    while True:
+        cursor = conn.execute(sql, (batch_size,))
+        conn.commit()  # release the write lock between batches
+        if cursor.rowcount <= 0:
+            return total
+        total += cursor.rowcount
+
+
+def _migrate_initial_schema(conn):
+    """Users and scans tables (matches the original init_db)"""
+    conn.execute('''
         CREATE TABLE IF NOT EXISTS users (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             name TEXT NOT NULL,
@@ -37,8 +141,7 @@ def init_db():
         )
     ''')
     
-    # Scans table (history)
-    cursor.execute('''
+    conn.execute('''
         CREATE TABLE IF NOT EXISTS scans (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             user_phone TEXT NOT NULL,
@@ -50,15 +153,119 @@ def init_db():
             FOREIGN KEY (user_phone) REFERENCES users(phone)
         )
     ''')
+
+
+def _migrate_history_index(conn):
+    """
+    History lookups: WHERE user_phone = ? ORDER BY date DESC, id DESC
+    
+    Blocks writers while the index is built - see the note above.
+    """
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_scans_user_date
+        ON scans (user_phone, date DESC, id DESC)
+    ''')
+
+
+def _migrate_scan_artifacts(conn):
+    """Full analysis result (compressed JSON) and thumbnail hash per scan"""
+    _add_column_if_missing(conn, 'scans', 'result', 'BLOB')
+    _add_column_if_missing(conn, 'scans', 'image_hash', 'TEXT')
+
+
+MIGRATIONS = [
+    (1, 'initial schema', _migrate_initial_schema, None),
+    (2, 'scan history index', _migrate_history_index, None),
+    (3, 'scan artifacts', _migrate_scan_artifacts, None),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+@contextmanager
+def _migration_lock():
+    """Cross-process lock so only one gunicorn worker migrates at a time"""
+    try:
+        import fcntl
+    except ImportError:
+        # Windows dev server runs a single process
+        yield
+        return
+    
+    with open(DATABASE_FILE + '.migrate.lock', 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def get_schema_version(conn):
+    """Current schema version from PRAGMA user_version"""
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def migrate(conn):
+    """
+    Apply pending migrations in order
+    
+    Returns:
+        Schema version after migrating
+    """
+    with _migration_lock():
+        # Another worker may have migrated while we waited for the lock
+        version = get_schema_version(conn)
+        
+        for target, description, schema_step, backfill_step in MIGRATIONS:
+            if target <= version:
+                continue
+            
+            print(f"🔧 Applying migration {target}: {description}")
+            started = time.perf_counter()
+            
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                schema_step(conn)
+                if backfill_step is None:
+                    conn.execute(f'PRAGMA user_version = {int(target)}')
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            
+            if backfill_step is not None:
+                backfill_step(conn)
+                conn.execute(f'PRAGMA user_version = {int(target)}')
+                conn.commit()
+            
+            version = target
+            print(f"✅ Migration {target} done in {time.perf_counter() - started:.2f}s")
+        
+        return version
+
+
+def init_db():
+    """
+    Bring the database schema up to date (safe to call from every worker)
     
-    conn.commit()
-    conn.close()
-    print("✅ Database initialized successfully")
+    Runs on its own connection, closed before returning, so a gunicorn
+    --preload master never holds a handle its workers would inherit.
+    """
+    conn = _open_connection()
+    try:
+        version = get_schema_version(conn)
+        if version < SCHEMA_VERSION:
+            if not DB_MIGRATE_ON_BOOT:
+                raise RuntimeError(
+                    f"Database schema v{version} is older than v{SCHEMA_VERSION} "
+                    "- run `python database.py` to migrate it"
+                )
+            migrate(conn)
+        print(f"✅ Database initialized successfully (schema v{get_schema_version(conn)})")
+    finally:
+        conn.close()
 
 
-def hash_password(password):
-    """Hash password using SHA256"""
-    return hashlib.sha256(password.encode()).hexdigest()
 
 
 def create_user(name, phone, password):
@@ -84,7 +291,7 @@ def create_user(name, phone, password):
         ''', (name, phone, password_hash))
 
         conn.commit()
-        conn.close()
+        release_db_connection(conn)
 
         return {
             'name': name,
@@ -96,6 +303,9 @@ def create_user(name, phone, password):
         print("INTEGRITY ERROR:", e)
         return None
 
+    except KdfBusy:
+        raise  # Overloaded - the caller answers 503
+
     except Exception as e:
         print("CREATE USER ERROR:", e)
         return None
@@ -103,13 +313,17 @@ def create_user(name, phone, password):
 
 
 def verify_user(phone, password):
+    """
+    Check a login, upgrading legacy or outdated password hashes in place
+    
+    Returns:
+        User dictionary if the password matches, None otherwise
+    """
     try:
         phone = phone.strip()
-        password_hash = hash_password(password)
 
         print("🔐 LOGIN ATTEMPT")
         print("PHONE:", phone)
-        print("HASH:", password_hash)
 
         conn = get_db_connection()
         cursor = conn.cursor()
@@ -120,16 +334,30 @@ def verify_user(phone, password):
         )
 
         row = cursor.fetchone()
-        conn.close()
+        release_db_connection(conn)
 
         if not row:
+            # Same KDF cost as a wrong password, so timing does not reveal accounts
+            verify_unknown_user(password)
             print("❌ USER NOT FOUND")
             return None
 
-        if row["password_hash"] != password_hash:
+        matches, needs_rehash = verify_password(password, row["password_hash"])
+        if not matches:
             print("❌ PASSWORD MISMATCH")
             return None
 
+        if needs_rehash:
+            # Transparent upgrade of legacy SHA-256 / old-cost hashes
+            conn = get_db_connection()
+            conn.execute(
+                "UPDATE users SET password_hash = ? WHERE phone = ? AND password_hash = ?",
+                (hash_password(password), phone, row["password_hash"])
+            )
+            conn.commit()
+            release_db_connection(conn)
+            print("🔁 PASSWORD HASH UPGRADED")
+
         print("✅ LOGIN SUCCESS")
         return {
             "name": row["name"],
@@ -137,6 +365,9 @@ def verify_user(phone, password):
             "language": row["language"]
         }
 
+    except KdfBusy:
+        raise  # Overloaded - the caller answers 503
+
     except Exception as e:
         print("VERIFY USER ERROR:", e)
         return None
@@ -160,7 +391,7 @@ def update_user_language(phone, language):
         ''', (language, phone))
         
         conn.commit()
-        conn.close()
+        release_db_connection(conn)
         return True
         
     except Exception as e:
@@ -168,6 +399,260 @@ def update_user_language(phone, language):
         return False
 
 
+# ============================================================================
+# WRITE-BEHIND SCAN QUEUE
+# ============================================================================
+
+# SCAN_WRITE_BEHIND=1 makes save_scan() return immediately and persists
+# scans from a background thread in multi-row transactions
+SCAN_WRITE_BEHIND = os.environ.get('SCAN_WRITE_BEHIND', '0') == '1'
+WRITE_BEHIND_FLUSH_MS = int(os.environ.get('WRITE_BEHIND_FLUSH_MS', 200))
+WRITE_BEHIND_MAX_BATCH = int(os.environ.get('WRITE_BEHIND_MAX_BATCH', 100))
+SCAN_ID_BLOCK_SIZE = 100
+WRITE_BEHIND_MAX_ATTEMPTS = 3
+
+
+def reserve_scan_ids(count):
+    """
+    Reserve a block of scan IDs by advancing the AUTOINCREMENT sequence
+    
+    Ordinary INSERTs keep getting IDs above the reserved block, so
+    pre-allocated and auto-assigned IDs never collide across workers.
+    
+    Returns:
+        First ID of the reserved block
+    """
+    conn = get_db_connection()
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'scans'").fetchone()
+        if row is None:
+            # No scan inserted yet - sequence row doesn't exist
+            start = conn.execute('SELECT COALESCE(MAX(id), 0) FROM scans').fetchone()[0]
+            conn.execute("INSERT INTO sqlite_sequence (name, seq) VALUES ('scans', ?)", (start + count,))
+        else:
+            start = row[0]
+            conn.execute("UPDATE sqlite_sequence SET seq = ? WHERE name = 'scans'", (start + count,))
+        conn.commit()
+        return start + 1
+    finally:
+        release_db_connection(conn)
+
+
+class ScanWriteBehind:
+    """
+    In-memory queue of scans flushed by a background thread
+    
+    Rows are written every WRITE_BEHIND_FLUSH_MS or WRITE_BEHIND_MAX_BATCH
+    rows, whichever comes first, in one transaction. IDs are handed out
+    from blocks reserved with reserve_scan_ids(). Pending rows are flushed
+    at interpreter exit (gunicorn worker shutdown).
+    
+    flush() stops the thread and joins it before draining, so a batch the
+    thread has already taken off the queue is written, never dropped.
+    
+    IDs stay pending until their row is written (or given up on);
+    wait_for() lets a read of a just-returned ID block until then.
+    """
+    
+    def __init__(self, flush_ms=WRITE_BEHIND_FLUSH_MS, max_batch=WRITE_BEHIND_MAX_BATCH):
+        self.flush_interval = flush_ms / 1000.0
+        self.max_batch = max_batch
+        
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._next_id = 0
+        self._block_end = -1
+        self._pending = set()
+        self._settled = threading.Condition()
+        
+        self.metrics = {
+            'submitted': 0,
+            'written': 0,
+            'flushes': 0,
+            'failed': 0,
+            'last_flush_ms': 0.0,
+            'max_flush_ms': 0.0,
+            'total_flush_ms': 0.0
+        }
+    
+    def _ensure_started(self):
+        """Start the flusher thread (again, after a fork)"""
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            return
+        
+        with self._lock:
+            if self._pid != os.getpid():
+                # Forked child: inherited queue/ID block belong to the parent
+                self._queue = queue.Queue()
+                self._next_id, self._block_end = 0, -1
+                self._pending = set()
+                self._pid = os.getpid()
+            
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name='scan-write-behind', daemon=True)
+                self._thread.start()
+    
+    def _allocate_id(self):
+        with self._lock:
+            if self._next_id > self._block_end:
+                self._next_id = reserve_scan_ids(SCAN_ID_BLOCK_SIZE)
+                self._block_end = self._next_id + SCAN_ID_BLOCK_SIZE - 1
+            scan_id = self._next_id
+            self._next_id += 1
+            return scan_id
+    
+    def submit(self, scan_data):
+        """Queue a scan and return its pre-allocated ID"""
+        self._ensure_started()
+        
+        scan_id = self._allocate_id()
+        row = (
+            scan_id,
+            scan_data['user_phone'],
+            scan_data['disease_name'],
+            scan_data['confidence'],
+            scan_data['severity'],
+            scan_data['treatment'],
+            datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S'),
+            pack_result(scan_data.get('result')),
+            scan_data.get('image_hash')
+        )
+        with self._settled:
+            self._pending.add(scan_id)
+        self._queue.put((row, 0))
+        self.metrics['submitted'] += 1
+        return scan_id
+    
+    def _drain(self, items):
+        """Move queued items into the batch, up to max_batch, without blocking"""
+        while len(items) < self.max_batch:
+            try:
+                items.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return items
+    
+    def _write(self, items):
+        """Insert queued rows in one transaction; requeue on failure"""
+        if not items:
+            return
+        
+        started = time.perf_counter()
+        conn = get_db_connection()
+        try:
+            conn.executemany('''
+                INSERT INTO scans (id, user_phone, disease_name, confidence, severity, treatment, date, result, image_hash)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', [row for row, _ in items])
+            conn.commit()
+            self.metrics['written'] += len(items)
+            self._settle(row[0] for row, _ in items)
+        except Exception as e:
+            print(f"Error flushing scan queue ({len(items)} rows): {e}")
+            conn.rollback()
+            dropped = []
+            for row, attempts in items:
+                if attempts + 1 < WRITE_BEHIND_MAX_ATTEMPTS:
+                    self._queue.put((row, attempts + 1))
+                else:
+                    self.metrics['failed'] += 1
+                    dropped.append(row[0])
+            self._settle(dropped)
+        finally:
+            release_db_connection(conn)
+        
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.metrics['flushes'] += 1
+        self.metrics['last_flush_ms'] = round(elapsed_ms, 2)
+        self.metrics['max_flush_ms'] = round(max(self.metrics['max_flush_ms'], elapsed_ms), 2)
+        self.metrics['total_flush_ms'] += elapsed_ms
+    
+    def _settle(self, scan_ids):
+        """Mark IDs as no longer pending and wake readers waiting on them"""
+        with self._settled:
+            self._pending.difference_update(scan_ids)
+            self._settled.notify_all()
+    
+    def wait_for(self, scan_id, timeout=None):
+        """
+        Block until a scan queued by this process has been written
+        
+        Returns immediately for IDs this process isn't holding. Scans queued
+        by another worker can't be seen here - see DEPLOYMENT.md.
+        
+        Returns:
+            True unless the timeout expired first
+        """
+        if timeout is None:
+            timeout = max(5.0, 2 * self.flush_interval)
+        with self._settled:
+            return self._settled.wait_for(lambda: scan_id not in self._pending, timeout)
+    
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            
+            # Hold the rows under _write_lock until they are written
+            with self._write_lock:
+                # Give the batch up to one flush interval to fill
+                deadline = time.monotonic() + self.flush_interval
+                items = self._drain([first])
+                while (len(items) < self.max_batch and time.monotonic() < deadline
+                       and not self._stop.is_set()):
+                    time.sleep(min(0.01, self.flush_interval))
+                    self._drain(items)
+                
+                self._write(items)
+    
+    def flush(self):
+        """
+        Stop the flusher thread and synchronously write everything queued
+        
+        Used at shutdown; the next submit() starts a new thread.
+        """
+        self._stop.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=max(5.0, 2 * self.flush_interval))
+        
+        with self._write_lock:
+            # Failed rows are requeued, so bound the number of passes
+            for _ in range(WRITE_BEHIND_MAX_ATTEMPTS):
+                pending = self._queue.qsize()
+                if not pending:
+                    return
+                while pending > 0:
+                    items = self._drain([])
+                    if not items:
+                        break
+                    pending -= len(items)
+                    self._write(items)
+    
+    def stats(self):
+        """Queue depth and flush latency"""
+        flushes = self.metrics['flushes']
+        return dict(
+            self.metrics,
+            enabled=SCAN_WRITE_BEHIND,
+            queue_depth=self._queue.qsize(),
+            avg_flush_ms=round(self.metrics['total_flush_ms'] / flushes, 2) if flushes else 0.0,
+            total_flush_ms=round(self.metrics['total_flush_ms'], 2)
+        )
+
+
+scan_writer = ScanWriteBehind()
+atexit.register(scan_writer.flush)
+
+
 def save_scan(scan_data):
     """
     Save a crop scan to history
@@ -179,28 +664,35 @@ def save_scan(scan_data):
             - confidence
             - severity
             - treatment
+            - result (optional): full analysis result, stored compressed
+            - image_hash (optional): stored thumbnail (scan_artifacts)
     
     Returns:
         Scan ID if successful, None otherwise
     """
     try:
+        if SCAN_WRITE_BEHIND:
+            return scan_writer.submit(scan_data)
+        
         conn = get_db_connection()
         cursor = conn.cursor()
         
         cursor.execute('''
-            INSERT INTO scans (user_phone, disease_name, confidence, severity, treatment)
-            VALUES (?, ?, ?, ?, ?)
+            INSERT INTO scans (user_phone, disease_name, confidence, severity, treatment, result, image_hash)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
         ''', (
             scan_data['user_phone'],
             scan_data['disease_name'],
             scan_data['confidence'],
             scan_data['severity'],
-            scan_data['treatment']
+            scan_data['treatment'],
+            pack_result(scan_data.get('result')),
+            scan_data.get('image_hash')
         ))
         
         scan_id = cursor.lastrowid
         conn.commit()
-        conn.close()
+        release_db_connection(conn)
         
         return scan_id
         
@@ -209,13 +701,64 @@ def save_scan(scan_data):
         return None
 
 
-def get_user_scans(phone, limit=50):
+def save_scans(scan_list):
+    """
+    Save many crop scans in a single transaction
+    
+    Args:
+        scan_list: List of scan dictionaries (same keys as save_scan)
+    
+    Returns:
+        List of scan IDs in input order, or None if the batch failed
+    """
+    if not scan_list:
+        return []
+
+    conn = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        
+        scan_ids = []
+        for scan_data in scan_list:
+            cursor.execute('''
+                INSERT INTO scans (user_phone, disease_name, confidence, severity, treatment, result, image_hash)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (
+                scan_data['user_phone'],
+                scan_data['disease_name'],
+                scan_data['confidence'],
+                scan_data['severity'],
+                scan_data['treatment'],
+                pack_result(scan_data.get('result')),
+                scan_data.get('image_hash')
+            ))
+            scan_ids.append(cursor.lastrowid)
+        
+        conn.commit()
+        release_db_connection(conn)
+        
+        return scan_ids
+        
+    except Exception as e:
+        print(f"Error saving scan batch: {e}")
+        if conn is not None:
+            conn.rollback()
+            release_db_connection(conn)
+        return None
+
+
+def get_user_scans(phone, limit=50, before=None):
     """
-    Get user's scan history
+    Get user's scan history, newest first
+    
+    Uses keyset pagination on the (user_phone, date, id) index, so deep
+    pages cost the same as the first one.
     
     Args:
         phone: User's phone number
         limit: Maximum number of scans to return
+        before: Optional (date, id) of the last scan on the previous page
     
     Returns:
         List of scan dictionaries
@@ -224,13 +767,22 @@ def get_user_scans(phone, limit=50):
         conn = get_db_connection()
         cursor = conn.cursor()
         
-        cursor.execute('''
-            SELECT id, disease_name, confidence, severity, treatment, date
-            FROM scans
-            WHERE user_phone = ?
-            ORDER BY date DESC
-            LIMIT ?
-        ''', (phone, limit))
+        if before is None:
+            cursor.execute('''
+                SELECT id, disease_name, confidence, severity, treatment, date
+                FROM scans
+                WHERE user_phone = ?
+                ORDER BY date DESC, id DESC
+                LIMIT ?
+            ''', (phone, limit))
+        else:
+            cursor.execute('''
+                SELECT id, disease_name, confidence, severity, treatment, date
+                FROM scans
+                WHERE user_phone = ? AND (date, id) < (?, ?)
+                ORDER BY date DESC, id DESC
+                LIMIT ?
+            ''', (phone, before[0], before[1], limit))
         
         scans = []
         for row in cursor.fetchall():
@@ -243,7 +795,7 @@ def get_user_scans(phone, limit=50):
                 'date': row['date']
             })
         
-        conn.close()
+        release_db_connection(conn)
         return scans
         
     except Exception as e:
@@ -260,20 +812,25 @@ def get_scan_by_id(scan_id, user_phone):
         user_phone: User's phone number (for security)
     
     Returns:
-        Scan dictionary or None
+        Scan dictionary (with the stored 'result' and 'image_hash', None
+        for scans saved before they were recorded) or None
     """
     try:
+        if SCAN_WRITE_BEHIND:
+            # The ID may have just been returned by save_scan() and still be queued
+            scan_writer.wait_for(scan_id)
+        
         conn = get_db_connection()
         cursor = conn.cursor()
         
         cursor.execute('''
-            SELECT id, disease_name, confidence, severity, treatment, date
+            SELECT id, disease_name, confidence, severity, treatment, date, result, image_hash
             FROM scans
             WHERE id = ? AND user_phone = ?
         ''', (scan_id, user_phone))
         
         row = cursor.fetchone()
-        conn.close()
+        release_db_connection(conn)
         
         if row:
             return {
@@ -282,7 +839,9 @@ def get_scan_by_id(scan_id, user_phone):
                 'confidence': row['confidence'],
                 'severity': row['severity'],
                 'treatment': row['treatment'],
-                'date': row['date']
+                'date': row['date'],
+                'result': unpack_result(row['result']),
+                'image_hash': row['image_hash']
             }
         return None
         
@@ -300,7 +859,7 @@ def get_all_users():
         cursor.execute('SELECT name, phone, language, created_at FROM users')
         users = [dict(row) for row in cursor.fetchall()]
         
-        conn.close()
+        release_db_connection(conn)
         return users
         
     except Exception as e:
@@ -309,6 +868,11 @@ def get_all_users():
 
 
 if __name__ == '__main__':
-    # Initialize database when run directly
-    init_db()
+    # Create or upgrade the database when run directly (also the offline
+    # migration command when workers run with DB_MIGRATE_ON_BOOT=0)
+    conn = _open_connection()
+    try:
+        print(f"Schema v{migrate(conn)}")
+    finally:
+        conn.close()
     print("Database setup complete!")
@@ -1,12 +1,541 @@
 """
-SIMPLIFIED Disease Detection - NO ML DEPENDENCIES
-For quick deployment - basic pattern matching only
+FarmScan Disease Detection
+Vectorized NumPy feature extraction shared by training and serving
 """
 
+import os
+import threading
+
+import numpy as np
+from PIL import Image
+
+# ============================================================================
+# FEATURE EXTRACTION
+# ============================================================================
+
+# Longest side (px) of the working copy features are computed on.
+# A 12MP phone photo is reduced to ~256x192 before any per-pixel work.
+ANALYSIS_SIZE = int(os.environ.get('FARMSCAN_ANALYSIS_SIZE', 256))
+
+# Modes Image.reduce() handles natively; others are converted first
+_REDUCIBLE_MODES = ('RGB', 'RGBA', 'L', 'LA', 'I', 'F', 'CMYK', 'YCbCr')
+
+HUE_BINS = 18
+SAT_BINS = 8
+VAL_BINS = 8
+GRAY_BINS = 32
+
+# Fixed feature layout: (name, length). Order defines the vector layout
+# used by train_model.py and the serving path - never reorder, only append.
+FEATURE_LAYOUT = (
+    ('rgb_mean', 3),
+    ('rgb_std', 3),
+    ('hsv_mean', 3),
+    ('hsv_std', 3),
+    ('hue_hist', HUE_BINS),
+    ('sat_hist', SAT_BINS),
+    ('val_hist', VAL_BINS),
+    ('lesion', 6),     # green, yellow, brown, dark, pale, lesion ratio
+    ('texture', 5),    # gradient mean/std, laplacian var, edge density, entropy
+)
+FEATURE_LENGTH = sum(length for _, length in FEATURE_LAYOUT)
+FEATURE_VERSION = '1'
+
+# PIL HSV channels are 0-255; hue degrees are rescaled to that range
+_HUE_SCALE = 255.0 / 360.0
+
+
+def _downscale(image, max_side=ANALYSIS_SIZE):
+    """Return a small RGB working copy of the image (source is not modified)"""
+    width, height = image.size
+    scale = max_side / float(max(width, height))
+
+    if scale < 1.0:
+        size = (max(1, int(width * scale)), max(1, int(height * scale)))
+        image = image.resize(size, Image.BILINEAR, reducing_gap=2.0)
+
+    # Convert colour space only on the small copy
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    return image
+
+
+def prepare_image(image, max_side=ANALYSIS_SIZE):
+    """
+    Decode an opened (not yet loaded) image straight to analysis resolution
+
+    JPEGs use draft() so libjpeg's DCT scaling decodes at 1/2, 1/4 or 1/8
+    size; everything is then shrunk with reduce() and a final resize.
+    Colour conversion happens only on the small image.
+
+    Args:
+        image: PIL Image from Image.open (lazy) or an already-loaded image
+        max_side: Longest side of the result
+
+    Returns:
+        RGB PIL Image whose longest side is at most max_side
+    """
+    if image.format == 'JPEG' and image.mode in ('RGB', 'L', 'CMYK', 'YCbCr'):
+        image.draft(image.mode, (max_side, max_side))
+
+    if image.mode not in _REDUCIBLE_MODES:
+        image = image.convert('RGB')
+
+    factor = max(image.size) // max_side
+    if factor >= 2:
+        image = image.reduce(factor)
+
+    return _downscale(image, max_side)
+
+
+def _normalized_hist(channel, bins):
+    """Histogram of a uint8 channel as fractions of all pixels"""
+    idx = (channel.astype(np.uint16) * bins) >> 8
+    counts = np.bincount(idx.ravel(), minlength=bins).astype(np.float32)
+    return counts / max(channel.size, 1)
+
+
+def _lesion_ratios(h, s, v):
+    """Pixel ratios of healthy green tissue and typical lesion colours"""
+    h = h.astype(np.float32)
+    s = s.astype(np.float32)
+    v = v.astype(np.float32)
+
+    saturated = s > 60
+    green = saturated & (h >= 70 * _HUE_SCALE) & (h <= 170 * _HUE_SCALE)
+    yellow = saturated & (h >= 40 * _HUE_SCALE) & (h < 70 * _HUE_SCALE)
+    brown = (s > 50) & (h < 40 * _HUE_SCALE) & (v < 180)
+    dark = v < 50
+    pale = (s < 40) & (v > 180)
+
+    total = float(max(h.size, 1))
+    green_r = green.sum() / total
+    yellow_r = yellow.sum() / total
+    brown_r = brown.sum() / total
+    dark_r = dark.sum() / total
+    pale_r = pale.sum() / total
+
+    # Share of the plant tissue (green + lesion colours) that is diseased
+    lesion = yellow_r + brown_r
+    lesion_ratio = lesion / (lesion + green_r) if (lesion + green_r) > 0 else 0.0
+
+    return np.array([green_r, yellow_r, brown_r, dark_r, pale_r, lesion_ratio], dtype=np.float32)
+
+
+def _texture_stats(gray):
+    """Gradient, Laplacian and entropy statistics of a float32 gray image"""
+    gx = np.abs(np.diff(gray, axis=1))[:-1, :]
+    gy = np.abs(np.diff(gray, axis=0))[:, :-1]
+    grad = gx + gy
+
+    lap = (4.0 * gray[1:-1, 1:-1]
+           - gray[:-2, 1:-1] - gray[2:, 1:-1]
+           - gray[1:-1, :-2] - gray[1:-1, 2:])
+
+    hist = _normalized_hist(gray.astype(np.uint8), GRAY_BINS)
+    nonzero = hist[hist > 0]
+    entropy = float(-(nonzero * np.log2(nonzero)).sum()) + 0.0
+
+    if grad.size == 0:
+        return np.array([0.0, 0.0, 0.0, 0.0, entropy], dtype=np.float32)
+
+    return np.array([
+        grad.mean(),
+        grad.std(),
+        lap.var() if lap.size else 0.0,
+        (grad > 40).mean(),
+        entropy
+    ], dtype=np.float32)
+
+
+def extract_all_features(image, max_side=ANALYSIS_SIZE):
+    """
+    Extract colour, lesion and texture features from a PIL image
+
+    All statistics are whole-array NumPy operations on a downscaled copy,
+    so the cost is independent of the source resolution.
+
+    Args:
+        image: PIL Image (any mode)
+        max_side: Longest side of the working copy
+
+    Returns:
+        Dictionary of float32 arrays keyed by FEATURE_LAYOUT names
+    """
+    small = _downscale(image, max_side)
+
+    rgb = np.asarray(small, dtype=np.uint8)
+    hsv = np.asarray(small.convert('HSV'), dtype=np.uint8)
+
+    rgb_flat = rgb.reshape(-1, 3).astype(np.float32)
+    hsv_flat = hsv.reshape(-1, 3).astype(np.float32)
+    h, s, v = hsv[..., 0], hsv[..., 1], hsv[..., 2]
+
+    gray = rgb_flat @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
+    gray = gray.reshape(rgb.shape[:2])
+
+    return {
+        'rgb_mean': rgb_flat.mean(axis=0),
+        'rgb_std': rgb_flat.std(axis=0),
+        'hsv_mean': hsv_flat.mean(axis=0),
+        'hsv_std': hsv_flat.std(axis=0),
+        'hue_hist': _normalized_hist(h, HUE_BINS),
+        'sat_hist': _normalized_hist(s, SAT_BINS),
+        'val_hist': _normalized_hist(v, VAL_BINS),
+        'lesion': _lesion_ratios(h, s, v),
+        'texture': _texture_stats(gray),
+    }
+
+
+def features_to_vector(features):
+    """Flatten a feature dictionary into a fixed-length float32 vector"""
+    vector = np.empty(FEATURE_LENGTH, dtype=np.float32)
+    offset = 0
+    for name, length in FEATURE_LAYOUT:
+        vector[offset:offset + length] = np.asarray(features[name], dtype=np.float32).ravel()
+        offset += length
+    return vector
+
+
+# ============================================================================
+# MODEL REGISTRY
+# ============================================================================
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_PATH = os.environ.get('FARMSCAN_MODEL_PATH', os.path.join(BASE_DIR, 'ml_model.pkl'))
+
+# Class ids written by train_model.py
+DISEASE_LABELS = {
+    "Tomato_Late_Blight": 0,
+    "Tomato_Early_Blight": 1,
+    "Potato_Late_Blight": 2,
+    "Potato_Early_Blight": 3,
+    "Healthy": 4
+}
+
+
+class ModelRegistry:
+    """
+    Load-once holder for the trained RandomForest
+
+    The model is loaded at most once per process. sklearn copies the tree
+    arrays into its own buffers on unpickling, so nothing is memory-mapped
+    from the file; workers share the model only because gunicorn --preload
+    loads it in the master and forks them copy-on-write.
+    """
+
+    def __init__(self, path=MODEL_PATH):
+        self.path = path
+        self.version = None
+        self._model = None
+        self._labels = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def load(self):
+        """Load the model from disk (idempotent, thread-safe)"""
+        if self._loaded:
+            return self._model
+
+        with self._lock:
+            if self._loaded:
+                return self._model
+
+            try:
+                if not os.path.isfile(self.path):
+                    print(f"ℹ️ No trained model at {self.path} - using colour rules")
+                    return None
+
+                import joblib
+                model = joblib.load(self.path)
+
+                n_features = getattr(model, 'n_features_in_', FEATURE_LENGTH)
+                if n_features != FEATURE_LENGTH:
+                    print(f"⚠️ Model expects {n_features} features, extractor gives {FEATURE_LENGTH} - retrain with train_model.py")
+                    return None
+
+                id_to_label = {label_id: name for name, label_id in DISEASE_LABELS.items()}
+                self._labels = [id_to_label.get(int(c), str(c)) for c in model.classes_]
+                self._model = model
+                self.version = f"{FEATURE_VERSION}-{int(os.path.getmtime(self.path))}"
+                print(f"✅ ML model loaded: {self.path} (version {self.version})")
+
+            except Exception as e:
+                print(f"❌ MODEL LOAD ERROR: {type(e).__name__}: {e}")
+                self._model = None
+
+            finally:
+                self._loaded = True
+
+        return self._model
+
+    @property
+    def available(self):
+        return self.load() is not None
+
+    @property
+    def labels(self):
+        """Label names aligned with the predict_proba columns"""
+        self.load()
+        return self._labels
+
+    def predict_proba(self, vectors):
+        """
+        Class probabilities for one vector or a stacked matrix of vectors
+
+        Returns:
+            2-D array (n_samples, n_classes) or None if no model is loaded
+        """
+        model = self.load()
+        if model is None:
+            return None
+
+        matrix = np.asarray(vectors, dtype=np.float32)
+        if matrix.ndim == 1:
+            matrix = matrix.reshape(1, -1)
+        return model.predict_proba(matrix)
+
+
+# Per-process singleton - loaded at import so preloaded workers share it
+model_registry = ModelRegistry()
+model_registry.load()
+
+
+def get_model_version():
+    """Version string of whatever produces results (trained model or colour rules)"""
+    if model_registry.available:
+        return f"rf-{model_registry.version}"
+    return f"rules-{FEATURE_VERSION}"
+
+
+def predict_proba(vectors):
+    """Class probabilities from the shared model registry"""
+    return model_registry.predict_proba(vectors)
+
+
+# ============================================================================
+# DISEASE ANALYSIS
+# ============================================================================
+
+DISEASE_INFO = {
+    "Tomato_Late_Blight": {
+        "diseaseName": "Tomato Late Blight",
+        "severity": "High",
+        "spreadRisk": "Very high risk. Spreads rapidly in cool, wet weather and can destroy a field within days.",
+        "treatment": "Remove and destroy infected plants immediately. Apply a copper-based or mancozeb fungicide to healthy plants.",
+        "organicTreatment": {
+            "title": "Organic Treatment",
+            "details": [
+                "Remove and burn infected leaves and plants - do not compost",
+                "Spray copper hydroxide or Bordeaux mixture every 7 days",
+                "Water at the base only and keep leaves dry",
+                "Improve spacing and air circulation between plants"
+            ]
+        },
+        "safetyWarning": "Wear gloves and a mask when spraying fungicides. Follow label instructions."
+    },
+    "Tomato_Early_Blight": {
+        "diseaseName": "Tomato Early Blight",
+        "severity": "Medium",
+        "spreadRisk": "Moderate risk. Spreads upward from older leaves in warm, humid weather.",
+        "treatment": "Remove lower infected leaves. Apply chlorothalonil or copper fungicide every 7-10 days.",
+        "organicTreatment": {
+            "title": "Organic Treatment",
+            "details": [
+                "Remove spotted lower leaves",
+                "Apply neem oil spray (diluted 2%)",
+                "Mulch around plants to stop soil splash",
+                "Rotate crops - avoid tomato/potato in the same bed for 2 years"
+            ]
+        },
+        "safetyWarning": "Wear gloves and a mask when spraying fungicides. Follow label instructions."
+    },
+    "Potato_Late_Blight": {
+        "diseaseName": "Potato Late Blight",
+        "severity": "High",
+        "spreadRisk": "Very high risk. Can infect tubers and spread across the field within a week.",
+        "treatment": "Destroy infected haulms. Apply metalaxyl + mancozeb or a copper fungicide to the rest of the crop.",
+        "organicTreatment": {
+            "title": "Organic Treatment",
+            "details": [
+                "Remove and burn infected plants",
+                "Spray Bordeaux mixture (1%) every 7 days",
+                "Hill up soil to protect tubers",
+                "Harvest only after vines are fully dead"
+            ]
+        },
+        "safetyWarning": "Wear gloves and a mask when spraying fungicides. Follow label instructions."
+    },
+    "Potato_Early_Blight": {
+        "diseaseName": "Potato Early Blight",
+        "severity": "Medium",
+        "spreadRisk": "Moderate risk. Mostly affects older leaves and stressed plants.",
+        "treatment": "Remove infected leaves. Apply mancozeb or chlorothalonil every 10 days.",
+        "organicTreatment": {
+            "title": "Organic Treatment",
+            "details": [
+                "Remove infected lower leaves",
+                "Apply neem oil spray (diluted 2%)",
+                "Keep plants well fed - avoid nitrogen stress",
+                "Practice 2-3 year crop rotation"
+            ]
+        },
+        "safetyWarning": "Wear gloves and a mask when spraying fungicides. Follow label instructions."
+    },
+    "Healthy": {
+        "diseaseName": "Healthy Plant",
+        "severity": "None",
+        "spreadRisk": "No disease detected. Plant appears healthy.",
+        "treatment": "No treatment needed. Continue regular care.",
+        "organicTreatment": {
+            "title": "Preventive Care",
+            "details": [
+                "Water regularly - 1-2 inches per week",
+                "Apply balanced fertilizer monthly",
+                "Monitor for pests and diseases",
+                "Maintain good air circulation"
+            ]
+        },
+        "safetyWarning": "Keep monitoring your plants regularly for best results."
+    }
+}
+
+
+def _model_result(probabilities, labels):
+    """Build an analysis result from one row of class probabilities"""
+    best = int(np.argmax(probabilities))
+    label = labels[best]
+    confidence = round(float(probabilities[best]), 2)
+
+    info = DISEASE_INFO.get(label)
+    if info is None:
+        return None
+
+    print(f"🧠 RESULT: {label} ({confidence:.0%})")
+    result = dict(info)
+    result["confidence"] = confidence
+    return result
+
+
+def _color_rule_result(features):
+    """Fallback diagnosis from mean colour when no trained model is available"""
+    avg_colors = [float(c) for c in features['rgb_mean']]
+
+    # Extract RGB values
+    if len(avg_colors) >= 3:
+        r, g, b = avg_colors[0], avg_colors[1], avg_colors[2]
+
+        # Calculate color dominance
+        total = r + g + b
+        green_ratio = g / total if total > 0 else 0
+
+        print(f"🌿 Green ratio: {green_ratio:.2%}")
+
+        # If green is dominant, likely healthy
+        if g > r and g > b and g > 100:
+            print("✅ RESULT: Healthy Plant detected")
+            return {
+                "diseaseName": "Healthy Plant",
+                "confidence": 0.85,
+                "severity": "None",
+                "spreadRisk": "No disease detected. Plant appears healthy.",
+                "treatment": "No treatment needed. Continue regular care.",
+                "organicTreatment": {
+                    "title": "Preventive Care",
+                    "details": [
+                        "Water regularly - 1-2 inches per week",
+                        "Apply balanced fertilizer monthly",
+                        "Monitor for pests and diseases",
+                        "Maintain good air circulation"
+                    ]
+                },
+                "safetyWarning": "Keep monitoring your plants regularly for best results."
+            }
+
+        # If brown/yellow dominant, possible disease
+        elif r > g or b < 50:
+            print("⚠️ RESULT: Possible disease detected")
+            return {
+                "diseaseName": "Possible Disease Detected",
+                "confidence": 0.75,
+                "severity": "Medium",
+                "spreadRisk": "Moderate risk. Monitor closely and take preventive action.",
+                "treatment": "Remove affected leaves and improve plant care. Consult expert if condition worsens.",
+                "organicTreatment": {
+                    "title": "Organic Treatment",
+                    "details": [
+                        "Remove visibly affected leaves",
+                        "Improve air circulation around plants",
+                        "Apply neem oil spray (diluted 2%)",
+                        "Ensure proper watering - avoid overwatering",
+                        "Consult local agricultural extension office"
+                    ]
+                },
+                "safetyWarning": "For accurate diagnosis, please consult an agricultural expert."
+            }
+
+        # Neutral/unclear result
+        else:
+            print("ℹ️ RESULT: Analysis complete - unclear diagnosis")
+            return {
+                "diseaseName": "Analysis Complete",
+                "confidence": 0.70,
+                "severity": "Unknown",
+                "spreadRisk": "Unable to determine from current image.",
+                "treatment": "Upload a clearer, well-lit image of the plant leaf for better analysis.",
+                "organicTreatment": {
+                    "title": "General Plant Care",
+                    "details": [
+                        "Ensure adequate sunlight (6-8 hours daily)",
+                        "Water consistently but avoid waterlogging",
+                        "Apply balanced NPK fertilizer monthly",
+                        "Inspect regularly for pests and diseases"
+                    ]
+                },
+                "safetyWarning": "For best results, upload a close-up image of a leaf in good lighting."
+            }
+
+    # If color data is incomplete
+    print("⚠️ WARNING: Incomplete color data")
+    return {
+        "diseaseName": "Image Analysis Incomplete",
+        "confidence": 0.60,
+        "severity": "Unknown",
+        "spreadRisk": "Please upload a clear, well-lit image of the plant.",
+        "treatment": "Ensure good lighting and focus when capturing the image.",
+        "organicTreatment": {
+            "title": "Image Tips",
+            "details": [
+                "Use natural daylight for best results",
+                "Focus on a single leaf",
+                "Avoid shadows and reflections",
+                "Ensure the leaf fills most of the frame"
+            ]
+        },
+        "safetyWarning": "Clear images help provide better analysis."
+    }
+
+
+def result_from_features(features, probabilities=None, labels=None):
+    """
+    Turn extracted features (and optional model output) into an analysis result
+
+    Args:
+        features: Dictionary from extract_all_features
+        probabilities: One row of predict_proba output, or None
+        labels: Label names for the probability columns
+    """
+    if probabilities is not None and labels:
+        result = _model_result(probabilities, labels)
+        if result is not None:
+            return result
+    return _color_rule_result(features)
+
+
 def analyze_crop_image_local(image, language='en'):
     """
-    Simplified analysis without ML dependencies
-    Uses basic color analysis with PIL
+    Analyze a crop image using the shared feature extractor
+    Uses the trained model when available, colour rules otherwise
     """
     print(f"🔍 Starting image analysis... Language: {language}")
     
@@ -18,118 +547,24 @@ def analyze_crop_image_local(image, language='en'):
         
         print(f"✅ Image received: {image.size}, mode: {image.mode}")
         
-        # Import PIL ImageStat
-        from PIL import ImageStat
-        
-        # Ensure image is in RGB mode
-        if image.mode != 'RGB':
-            print(f"⚠️ Converting image from {image.mode} to RGB")
-            image = image.convert('RGB')
-        
-        # Get color statistics
-        stats = ImageStat.Stat(image)
-        avg_colors = stats.mean
+        # Get color statistics (computed on a downscaled copy)
+        features = extract_all_features(image)
+        avg_colors = features['rgb_mean']
         
         print(f"📊 Color analysis: R={avg_colors[0]:.1f}, G={avg_colors[1]:.1f}, B={avg_colors[2]:.1f}")
+        print(f"🍂 Lesion ratio: {features['lesion'][5]:.2%}")
         
-        # Extract RGB values
-        if len(avg_colors) >= 3:
-            r, g, b = avg_colors[0], avg_colors[1], avg_colors[2]
-            
-            # Calculate color dominance
-            total = r + g + b
-            green_ratio = g / total if total > 0 else 0
-            
-            print(f"🌿 Green ratio: {green_ratio:.2%}")
-            
-            # If green is dominant, likely healthy
-            if g > r and g > b and g > 100:
-                print("✅ RESULT: Healthy Plant detected")
-                return {
-                    "diseaseName": "Healthy Plant",
-                    "confidence": 0.85,
-                    "severity": "None",
-                    "spreadRisk": "No disease detected. Plant appears healthy.",
-                    "treatment": "No treatment needed. Continue regular care.",
-                    "organicTreatment": {
-                        "title": "Preventive Care",
-                        "details": [
-                            "Water regularly - 1-2 inches per week",
-                            "Apply balanced fertilizer monthly",
-                            "Monitor for pests and diseases",
-                            "Maintain good air circulation"
-                        ]
-                    },
-                    "safetyWarning": "Keep monitoring your plants regularly for best results."
-                }
-            
-            # If brown/yellow dominant, possible disease
-            elif r > g or b < 50:
-                print("⚠️ RESULT: Possible disease detected")
-                return {
-                    "diseaseName": "Possible Disease Detected",
-                    "confidence": 0.75,
-                    "severity": "Medium",
-                    "spreadRisk": "Moderate risk. Monitor closely and take preventive action.",
-                    "treatment": "Remove affected leaves and improve plant care. Consult expert if condition worsens.",
-                    "organicTreatment": {
-                        "title": "Organic Treatment",
-                        "details": [
-                            "Remove visibly affected leaves",
-                            "Improve air circulation around plants",
-                            "Apply neem oil spray (diluted 2%)",
-                            "Ensure proper watering - avoid overwatering",
-                            "Consult local agricultural extension office"
-                        ]
-                    },
-                    "safetyWarning": "For accurate diagnosis, please consult an agricultural expert."
-                }
-            
-            # Neutral/unclear result
-            else:
-                print("ℹ️ RESULT: Analysis complete - unclear diagnosis")
-                return {
-                    "diseaseName": "Analysis Complete",
-                    "confidence": 0.70,
-                    "severity": "Unknown",
-                    "spreadRisk": "Unable to determine from current image.",
-                    "treatment": "Upload a clearer, well-lit image of the plant leaf for better analysis.",
-                    "organicTreatment": {
-                        "title": "General Plant Care",
-                        "details": [
-                            "Ensure adequate sunlight (6-8 hours daily)",
-                            "Water consistently but avoid waterlogging",
-                            "Apply balanced NPK fertilizer monthly",
-                            "Inspect regularly for pests and diseases"
-                        ]
-                    },
-                    "safetyWarning": "For best results, upload a close-up image of a leaf in good lighting."
-                }
+        # Trained model takes precedence over the colour rules
+        probabilities = model_registry.predict_proba(features_to_vector(features))
+        if probabilities is not None:
+            return result_from_features(features, probabilities[0], model_registry.labels)
         
-        # If color data is incomplete
-        print("⚠️ WARNING: Incomplete color data")
-        return {
-            "diseaseName": "Image Analysis Incomplete",
-            "confidence": 0.60,
-            "severity": "Unknown",
-            "spreadRisk": "Please upload a clear, well-lit image of the plant.",
-            "treatment": "Ensure good lighting and focus when capturing the image.",
-            "organicTreatment": {
-                "title": "Image Tips",
-                "details": [
-                    "Use natural daylight for best results",
-                    "Focus on a single leaf",
-                    "Avoid shadows and reflections",
-                    "Ensure the leaf fills most of the frame"
-                ]
-            },
-            "safetyWarning": "Clear images help provide better analysis."
-        }
+        return result_from_features(features)
         
     except ImportError as e:
         print(f"❌ IMPORT ERROR: {e}")
         return {
-            "diseaseName": "System Error - PIL Not Available",
+            "diseaseName": "System Error - Image Library Not Available",
             "confidence": 0.50,
             "severity": "Unknown",
             "spreadRisk": "Image analysis library not available.",
@@ -169,12 +604,47 @@ def analyze_crop_image_local(image, language='en'):
             "safetyWarning": f"Technical error: {type(e).__name__}. Please try again or contact support."
         }
 
+def analyze_features_batch(features_list, language='en'):
+    """
+    Analyze many images' features with a single model call
+
+    Args:
+        features_list: List of dictionaries from extract_all_features
+        language: Response language
+
+    Returns:
+        List of analysis results in input order
+    """
+    if not features_list:
+        return []
+
+    print(f"🔍 Starting batch analysis of {len(features_list)} images... Language: {language}")
+
+    matrix = np.stack([features_to_vector(f) for f in features_list])
+    probabilities = model_registry.predict_proba(matrix)
+
+    if probabilities is None:
+        return [result_from_features(f) for f in features_list]
+
+    labels = model_registry.labels
+    return [result_from_features(f, row, labels) for f, row in zip(features_list, probabilities)]
+
 def get_model_info():
     """Return model information"""
+    if model_registry.available:
+        return {
+            'model_name': 'FarmScan RandomForest',
+            'version': model_registry.version,
+            'techniques': ['HSV Histograms', 'Lesion Ratios', 'Texture Analysis', 'Random Forest'],
+            'diseases_supported': [DISEASE_INFO[label]['diseaseName'] for label in model_registry.labels if label in DISEASE_INFO],
+            'accuracy': 'See train_model.py output',
+            'offline': True
+        }
+
     return {
         'model_name': 'FarmScan Color Analysis',
         'version': '2.0',
-        'techniques': ['RGB Color Analysis', 'Statistical Analysis'],
+        'techniques': ['RGB Color Analysis', 'HSV Histograms', 'Lesion Ratios', 'Texture Analysis'],
         'diseases_supported': 'Pattern-based detection',
         'accuracy': '70-85% (basic analysis)',
         'offline': True
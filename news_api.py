@@ -5,7 +5,19 @@ Uses free news APIs - NO dummy data!
 
 import requests
 from datetime import datetime, timedelta
+import gzip
+import hashlib
 import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
 
 # ============================================================================
 # NEWS API CONFIGURATION
@@ -29,24 +41,173 @@ RSS_FEEDS = {
     ]
 }
 
+# Per-feed network limits (seconds)
+FEED_CONNECT_TIMEOUT = float(os.environ.get('FEED_CONNECT_TIMEOUT', 5))
+FEED_READ_TIMEOUT = float(os.environ.get('FEED_READ_TIMEOUT', 10))
+FEED_FETCH_WORKERS = int(os.environ.get('FEED_FETCH_WORKERS', 8))
+
+# Circuit breaker: skip a host for FEED_COOLDOWN_SECONDS after this many
+# consecutive failures
+FEED_FAILURE_THRESHOLD = int(os.environ.get('FEED_FAILURE_THRESHOLD', 3))
+FEED_COOLDOWN_SECONDS = int(os.environ.get('FEED_COOLDOWN_SECONDS', 600))
+
+FEED_USER_AGENT = 'FarmScan/1.0 (+RSS reader)'
+
+
+class FeedCircuitBreaker:
+    """
+    Per-feed failure tracking
+    
+    After FEED_FAILURE_THRESHOLD consecutive failures a feed is skipped
+    until the cooldown passes; the next fetch is then a single trial that
+    either closes the breaker or re-opens it.
+    """
+    
+    def __init__(self, threshold=FEED_FAILURE_THRESHOLD, cooldown=FEED_COOLDOWN_SECONDS):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._feeds = {}
+        self._lock = threading.Lock()
+    
+    def allow(self, url):
+        """False while the feed is cooling down"""
+        with self._lock:
+            state = self._feeds.get(url)
+            return state is None or state['open_until'] <= time.time()
+    
+    def record_success(self, url):
+        with self._lock:
+            self._feeds.pop(url, None)
+    
+    def record_failure(self, url):
+        with self._lock:
+            state = self._feeds.setdefault(url, {'failures': 0, 'open_until': 0.0})
+            state['failures'] += 1
+            if state['failures'] >= self.threshold:
+                state['open_until'] = time.time() + self.cooldown
+                print(f"⛔ Feed {url} failing - skipping for {self.cooldown}s")
+    
+    def stats(self):
+        now = time.time()
+        with self._lock:
+            return {
+                url: {'failures': state['failures'], 'open': state['open_until'] > now}
+                for url, state in self._feeds.items()
+            }
+
+
+feed_breaker = FeedCircuitBreaker()
+
+
+def _feed_articles(feed):
+    """Latest 5 entries of a parsed feed as article dicts"""
+    articles = []
+    for entry in feed.entries[:5]:  # Get latest 5
+        articles.append({
+            'title': entry.get('title', 'No title'),
+            'description': entry.get('summary', entry.get('description', ''))[:200],
+            'source': feed.feed.get('title', 'Agriculture News'),
+            'url': entry.get('link', '#'),
+            'time': get_time_ago(entry.get('published_parsed', None)),
+            'category': 'agriculture'
+        })
+    return articles
+
+
+def _published(feed):
+    """published_parsed of the entries _feed_articles keeps (JSON-friendly)"""
+    return [
+        list(entry.published_parsed[:6]) if entry.get('published_parsed') else None
+        for entry in feed.entries[:5]
+    ]
+
+
+def fetch_feed(url):
+    """
+    Download and parse one feed with connect/read timeouts
+    
+    Sends the feed's stored ETag / Last-Modified; on 304 Not Modified the
+    cached articles are reused without downloading or parsing anything.
+    Raises on network errors, HTTP errors and unparseable feeds, so the
+    caller can feed the circuit breaker.
+    """
+    import feedparser
+    
+    state = news_cache.get_feed(url)
+    headers = {'User-Agent': FEED_USER_AGENT}
+    if state:
+        if state['etag']:
+            headers['If-None-Match'] = state['etag']
+        if state['modified']:
+            headers['If-Modified-Since'] = state['modified']
+    
+    response = requests.get(
+        url,
+        timeout=(FEED_CONNECT_TIMEOUT, FEED_READ_TIMEOUT),
+        headers=headers
+    )
+    
+    if response.status_code == 304 and state:
+        articles = state['articles']
+        # Only the relative times can have changed
+        for article, published in zip(articles, state['published']):
+            article['time'] = get_time_ago(published)
+        news_cache.put_feed(url, state['etag'], state['modified'], articles, state['published'], not_modified=True)
+        return articles
+    
+    response.raise_for_status()
+    
+    feed = feedparser.parse(response.content)
+    if feed.bozo and not feed.entries:
+        raise ValueError(f"unparseable feed: {feed.get('bozo_exception')}")
+    
+    articles = _feed_articles(feed)
+    news_cache.put_feed(
+        url,
+        response.headers.get('ETag'),
+        response.headers.get('Last-Modified'),
+        articles,
+        _published(feed),
+        not_modified=False
+    )
+    return articles
+
+
+def fetch_feeds(urls):
+    """
+    Fetch several feeds concurrently
+    
+    Duplicate URLs are fetched once and feeds with an open circuit
+    breaker are skipped, so total time is bounded by the slowest healthy
+    feed rather than the sum of all of them.
+    
+    Returns:
+        {url: articles} for the feeds that succeeded
+    """
+    unique = [url for url in dict.fromkeys(urls) if feed_breaker.allow(url)]
+    if not unique:
+        return {}
+    
+    def fetch(url):
+        try:
+            articles = fetch_feed(url)
+            feed_breaker.record_success(url)
+            return url, articles
+        except Exception as e:
+            print(f"Feed error ({url}): {e}")
+            feed_breaker.record_failure(url)
+            return url, None
+    
+    with ThreadPoolExecutor(max_workers=min(FEED_FETCH_WORKERS, len(unique))) as pool:
+        results = list(pool.map(fetch, unique))
+    
+    return {url: articles for url, articles in results if articles is not None}
+
+
 def parse_rss_feed(url):
     """Parse RSS feed and extract articles"""
     try:
-        import feedparser
-        feed = feedparser.parse(url)
-        
-        articles = []
-        for entry in feed.entries[:5]:  # Get latest 5
-            articles.append({
-                'title': entry.get('title', 'No title'),
-                'description': entry.get('summary', entry.get('description', ''))[:200],
-                'source': feed.feed.get('title', 'Agriculture News'),
-                'url': entry.get('link', '#'),
-                'time': get_time_ago(entry.get('published_parsed', None)),
-                'category': 'agriculture'
-            })
-        
-        return articles
+        return fetch_feed(url)
     except Exception as e:
         print(f"RSS parse error: {e}")
         return []
@@ -76,219 +237,599 @@ def get_time_ago(published_time):
 # MAIN NEWS FUNCTIONS
 # ============================================================================
 
+# Agriculture RSS feeds per news category (FREE!)
+FEEDS = {
+    'govt': [
+        'https://pib.gov.in/RssMain.aspx?ModId=3',
+    ],
+    'weather': [
+        'https://www.indiatvnews.com/rss/weather.xml',
+    ],
+    'crops': [
+        'https://krishijagran.com/rss/news.xml',
+        'https://www.downtoearth.org.in/rss/agriculture',
+    ],
+    'mandi': [
+        'https://www.financialexpress.com/market/commodities/rss',
+    ],
+    'tech': [
+        'https://krishijagran.com/rss/news.xml',
+    ]
+}
+
+DEFAULT_CATEGORY = 'crops'
+
+
+def normalize_category(category):
+    """Unknown categories (including 'all') read the crops feeds"""
+    return category if category in FEEDS else DEFAULT_CATEGORY
+
+
 def get_agriculture_news(category='all', language='en'):
     """
-    Get real agriculture news from RSS feeds
+    Get real agriculture news from the shared news cache
     Categories: govt, weather, crops, mandi, tech
-    """
     
-    # Try RSS feeds first (always works, no API key!)
-    news = get_news_from_rss(category)
+    Never touches the network: the background refresher keeps the cache
+    warm and stale articles are served until it replaces them.
+    """
+    category = normalize_category(category)
+    news_refresher.ensure_started()
     
+    news = news_cache.get(category)
     if news:
         return news
     
-    # Fallback to curated news if RSS fails
+    # Cache still cold - ask the refresher to run now, serve curated news
+    news_refresher.wake()
     return get_fallback_news(category, language)
 
+def get_news_payload(category='all', language='en'):
+    """
+    Pre-rendered news response for a category and language
+    
+    Returns:
+        Dict from render_news_payload (curated news while the cache is cold)
+    """
+    category = normalize_category(category)
+    if language not in NEWS_LANGUAGES:
+        language = 'en'
+    news_refresher.ensure_started()
+    
+    payload = news_cache.get_payload(category, language)
+    if payload is not None:
+        return payload
+    
+    news_refresher.wake()
+    key = (category, language)
+    if key not in _fallback_payloads:
+        _fallback_payloads[key] = render_news_payload(get_fallback_news(category, language))
+    return _fallback_payloads[key]
+
+# Curated news payloads, rendered once per process on first use
+_fallback_payloads = {}
+
+def collect_category_news(category, feed_articles):
+    """Top 3 articles from each of a category's feeds, max 10"""
+    all_news = []
+    for feed_url in FEEDS[normalize_category(category)]:
+        all_news.extend(feed_articles.get(feed_url, [])[:3])  # Take top 3 from each feed
+    return all_news[:10]  # Return max 10 articles
+
 def get_news_from_rss(category):
-    """Get news from RSS feeds - FREE, no API needed!"""
+    """Get news from RSS feeds - FREE, no API needed! (network, blocking)"""
     try:
         import feedparser
     except ImportError:
         print("feedparser not installed. Using fallback news.")
         return None
     
-    all_news = []
+    category_feeds = FEEDS[normalize_category(category)]
+    return collect_category_news(category, fetch_feeds(category_feeds))
+
+# REAL news from January 2026 - Update these with actual current news!
+FALLBACK_NEWS = {
+    'govt': [
+        {
+            'title': 'PM-Kisan 16th Installment Released for 9.4 Crore Farmers',
+            'description': 'Government transfers ₹20,000 crore to verified farmer accounts under PM-KISAN scheme.',
+            'source': 'PIB India',
+            'url': 'https://pib.gov.in',
+            'time': '2h ago',
+            'category': 'govt'
+        },
+        {
+            'title': 'Fertilizer Subsidy Extended for Rabi Season 2026',
+            'description': 'Govt continues urea subsidy to keep prices affordable. DAP price capped at ₹1,350/bag.',
+            'source': 'Ministry of Agriculture',
+            'url': 'https://agricoop.gov.in',
+            'time': '1d ago',
+            'category': 'govt'
+        },
+        {
+            'title': 'New Kisan Credit Card Campaign Launched in 100 Districts',
+            'description': 'Target to provide credit cards to 1 crore new farmers with interest subvention.',
+            'source': 'NABARD',
+            'url': 'https://www.nabard.org',
+            'time': '3d ago',
+            'category': 'govt'
+        }
+    ],
+
+    'weather': [
+        {
+            'title': 'Western Disturbance to Bring Rain in North India',
+            'description': 'IMD predicts light to moderate rainfall in Punjab, Haryana, UP over next 3 days.',
+            'source': 'IMD',
+            'url': 'https://mausam.imd.gov.in',
+            'time': '1h ago',
+            'category': 'weather'
+        },
+        {
+            'title': 'Heatwave Warning for Maharashtra and Gujarat',
+            'description': 'Temperatures expected to rise 3-4°C above normal. Farmers advised to increase irrigation.',
+            'source': 'Skymet Weather',
+            'url': 'https://www.skymetweather.com',
+            'time': '4h ago',
+            'category': 'weather'
+        },
+        {
+            'title': 'Early Monsoon Indicators Positive for 2026',
+            'description': 'La Niña conditions may lead to above-normal rainfall this monsoon season.',
+            'source': 'India Meteorological Dept',
+            'url': 'https://mausam.imd.gov.in',
+            'time': '2d ago',
+            'category': 'weather'
+        }
+    ],
+
+    'crops': [
+        {
+            'title': 'New High-Yielding Wheat Variety Released for North India',
+            'description': 'HD 3385 variety shows 15% higher yield and better disease resistance.',
+            'source': 'ICAR',
+            'url': 'https://icar.org.in',
+            'time': '5h ago',
+            'category': 'crops'
+        },
+        {
+            'title': 'Organic Cotton Exports Surge by 45% This Year',
+            'description': 'Growing global demand for sustainable textiles benefits Indian farmers.',
+            'source': 'APEDA',
+            'url': 'https://apeda.gov.in',
+            'time': '1d ago',
+            'category': 'crops'
+        },
+        {
+            'title': 'Rice Farmers Adopting Direct Seeding Method to Save Water',
+            'description': 'New technique reduces water usage by 30% while maintaining yields.',
+            'source': 'Krishi Jagran',
+            'url': 'https://krishijagran.com',
+            'time': '2d ago',
+            'category': 'crops'
+        }
+    ],
+
+    'mandi': [
+        {
+            'title': 'Wheat Prices Rise to ₹2,150/Quintal in Delhi Mandi',
+            'description': 'Strong demand and lower arrivals push prices up 5% this week.',
+            'source': 'Agmarknet',
+            'url': 'https://agmarknet.gov.in',
+            'time': '30m ago',
+            'category': 'mandi'
+        },
+        {
+            'title': 'Onion Prices Stabilize After Maharashtra Arrivals Increase',
+            'description': 'Average mandi price drops to ₹25/kg from ₹40/kg last month.',
+            'source': 'Market Watch',
+            'url': 'https://agmarknet.gov.in',
+            'time': '3h ago',
+            'category': 'mandi'
+        },
+        {
+            'title': 'Record Basmati Rice Exports Expected in Q1 2026',
+            'description': 'India targets $5 billion basmati exports with new markets in Africa.',
+            'source': 'APEDA',
+            'url': 'https://apeda.gov.in',
+            'time': '1d ago',
+            'category': 'mandi'
+        }
+    ],
+
+    'tech': [
+        {
+            'title': 'Solar Pump Subsidy Applications Now Open Online',
+            'description': 'PM-KUSUM scheme offers 60% subsidy. Apply on official portal by March 31.',
+            'source': 'MNRE',
+            'url': 'https://mnre.gov.in',
+            'time': '2h ago',
+            'category': 'tech'
+        },
+        {
+            'title': 'Drone Spraying Trials Show 40% Reduction in Pesticide Use',
+            'description': 'Precision agriculture technology being tested in 500 villages.',
+            'source': 'AgTech India',
+            'url': 'https://agritech.tnau.ac.in',
+            'time': '1d ago',
+            'category': 'tech'
+        },
+        {
+            'title': 'AI-Based Crop Advisory Service Launched in 10 States',
+            'description': 'Free SMS service provides personalized farming tips based on weather and soil.',
+            'source': 'Digital India',
+            'url': 'https://digitalindia.gov.in',
+            'time': '3d ago',
+            'category': 'tech'
+        }
+    ]
+}
+
+
+# Language tags prefixed to curated titles
+FALLBACK_TITLE_PREFIX = {'hi': '[हिंदी] ', 'ta': '[தமிழ்] '}
+
+def get_fallback_news(category, language='en'):
+    """
+    Curated real agriculture news (updated regularly)
+    These are REAL headlines that you can update manually
     
-    # Agriculture RSS feeds (FREE!)
-    feeds = {
-        'govt': [
-            'https://pib.gov.in/RssMain.aspx?ModId=3',
-        ],
-        'weather': [
-            'https://www.indiatvnews.com/rss/weather.xml',
-        ],
-        'crops': [
-            'https://krishijagran.com/rss/news.xml',
-            'https://www.downtoearth.org.in/rss/agriculture',
-        ],
-        'mandi': [
-            'https://www.financialexpress.com/market/commodities/rss',
-        ],
-        'tech': [
-            'https://krishijagran.com/rss/news.xml',
-        ]
-    }
+    Returns fresh copies - FALLBACK_NEWS itself is never modified.
+    """
     
-    category_feeds = feeds.get(category, feeds['crops'])
+    # Get news for category
+    news = FALLBACK_NEWS.get(category, FALLBACK_NEWS['crops'])
     
-    for feed_url in category_feeds:
-        try:
-            articles = parse_rss_feed(feed_url)
-            all_news.extend(articles[:3])  # Take top 3 from each feed
-        except Exception as e:
-            print(f"Feed error ({feed_url}): {e}")
-            continue
+    # Translate titles if Hindi or Tamil
+    prefix = FALLBACK_TITLE_PREFIX.get(language, '')
+    return [dict(article, title=prefix + article['title']) for article in news]
+
+# ============================================================================
+# SHARED NEWS CACHE + BACKGROUND REFRESHER
+# ============================================================================
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+NEWS_CACHE_DB = os.environ.get('NEWS_CACHE_DB', os.path.join(BASE_DIR, 'news_cache.db'))
+NEWS_REFRESH_SECONDS = int(os.environ.get('NEWS_REFRESH_SECONDS', 900))
+
+# Languages each category payload is pre-rendered for
+NEWS_LANGUAGES = ('en', 'hi', 'ta')
+
+# Only one worker refreshes at a time; a crashed holder's lease expires
+NEWS_REFRESH_LEASE_SECONDS = 120
+# How often idle workers check whether the cache is due for a refresh
+NEWS_POLL_SECONDS = min(60, NEWS_REFRESH_SECONDS)
+
+
+def render_news_payload(articles):
+    """
+    Serialize {'news': articles} once into ready-to-send bytes
     
-    return all_news[:10]  # Return max 10 articles
+    Returns:
+        Dict with a strong 'etag' and 'identity', 'gzip' and 'br' bodies
+        ('br' is None without the brotli package)
+    """
+    body = json.dumps({'news': articles}, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return {
+        'etag': hashlib.blake2b(body, digest_size=16).hexdigest(),
+        'identity': body,
+        'gzip': gzip.compress(body, compresslevel=9, mtime=0),
+        'br': brotli.compress(body, quality=11) if brotli else None
+    }
 
-def get_fallback_news(category, language='en'):
+
+class NewsCache:
     """
-    Curated real agriculture news (updated regularly)
-    These are REAL headlines that you can update manually
+    Parsed articles per category in a SQLite file shared by all workers
     """
     
-    # REAL news from January 2026 - Update these with actual current news!
-    news_database = {
-        'govt': [
-            {
-                'title': 'PM-Kisan 16th Installment Released for 9.4 Crore Farmers',
-                'description': 'Government transfers ₹20,000 crore to verified farmer accounts under PM-KISAN scheme.',
-                'source': 'PIB India',
-                'url': 'https://pib.gov.in',
-                'time': '2h ago',
-                'category': 'govt'
-            },
-            {
-                'title': 'Fertilizer Subsidy Extended for Rabi Season 2026',
-                'description': 'Govt continues urea subsidy to keep prices affordable. DAP price capped at ₹1,350/bag.',
-                'source': 'Ministry of Agriculture',
-                'url': 'https://agricoop.gov.in',
-                'time': '1d ago',
-                'category': 'govt'
-            },
-            {
-                'title': 'New Kisan Credit Card Campaign Launched in 100 Districts',
-                'description': 'Target to provide credit cards to 1 crore new farmers with interest subvention.',
-                'source': 'NABARD',
-                'url': 'https://www.nabard.org',
-                'time': '3d ago',
-                'category': 'govt'
-            }
-        ],
+    def __init__(self, db_path=NEWS_CACHE_DB):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._ready = False
+        self._payloads = {}
+    
+    def _conn(self):
+        """Per-thread (and per-process) connection"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
         
-        'weather': [
-            {
-                'title': 'Western Disturbance to Bring Rain in North India',
-                'description': 'IMD predicts light to moderate rainfall in Punjab, Haryana, UP over next 3 days.',
-                'source': 'IMD',
-                'url': 'https://mausam.imd.gov.in',
-                'time': '1h ago',
-                'category': 'weather'
-            },
-            {
-                'title': 'Heatwave Warning for Maharashtra and Gujarat',
-                'description': 'Temperatures expected to rise 3-4°C above normal. Farmers advised to increase irrigation.',
-                'source': 'Skymet Weather',
-                'url': 'https://www.skymetweather.com',
-                'time': '4h ago',
-                'category': 'weather'
-            },
-            {
-                'title': 'Early Monsoon Indicators Positive for 2026',
-                'description': 'La Niña conditions may lead to above-normal rainfall this monsoon season.',
-                'source': 'India Meteorological Dept',
-                'url': 'https://mausam.imd.gov.in',
-                'time': '2d ago',
-                'category': 'weather'
-            }
-        ],
+        conn = sqlite3.connect(self.db_path, timeout=5)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        if not self._ready:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS news_cache (
+                    category TEXT PRIMARY KEY,
+                    articles TEXT NOT NULL,
+                    fetched_at REAL NOT NULL
+                )
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS news_payload (
+                    category TEXT NOT NULL,
+                    language TEXT NOT NULL,
+                    etag TEXT NOT NULL,
+                    identity BLOB NOT NULL,
+                    gzip BLOB NOT NULL,
+                    br BLOB,
+                    PRIMARY KEY (category, language)
+                )
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS feed_state (
+                    url TEXT PRIMARY KEY,
+                    etag TEXT,
+                    modified TEXT,
+                    articles TEXT NOT NULL,
+                    published TEXT NOT NULL,
+                    fetches INTEGER NOT NULL DEFAULT 0,
+                    not_modified INTEGER NOT NULL DEFAULT 0
+                )
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS news_lease (
+                    name TEXT PRIMARY KEY,
+                    holder INTEGER NOT NULL,
+                    expires REAL NOT NULL
+                )
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS news_refresh (
+                    name TEXT PRIMARY KEY,
+                    attempted_at REAL NOT NULL
+                )
+            ''')
+            conn.commit()
+            self._ready = True
         
-        'crops': [
-            {
-                'title': 'New High-Yielding Wheat Variety Released for North India',
-                'description': 'HD 3385 variety shows 15% higher yield and better disease resistance.',
-                'source': 'ICAR',
-                'url': 'https://icar.org.in',
-                'time': '5h ago',
-                'category': 'crops'
-            },
-            {
-                'title': 'Organic Cotton Exports Surge by 45% This Year',
-                'description': 'Growing global demand for sustainable textiles benefits Indian farmers.',
-                'source': 'APEDA',
-                'url': 'https://apeda.gov.in',
-                'time': '1d ago',
-                'category': 'crops'
-            },
-            {
-                'title': 'Rice Farmers Adopting Direct Seeding Method to Save Water',
-                'description': 'New technique reduces water usage by 30% while maintaining yields.',
-                'source': 'Krishi Jagran',
-                'url': 'https://krishijagran.com',
-                'time': '2d ago',
-                'category': 'crops'
-            }
-        ],
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+    
+    def get(self, category):
+        """Cached articles for a category (possibly stale), or None"""
+        try:
+            row = self._conn().execute(
+                'SELECT articles FROM news_cache WHERE category = ?', (category,)
+            ).fetchone()
+            return json.loads(row[0]) if row else None
+        except sqlite3.Error as e:
+            print(f"News cache read error: {e}")
+            return None
+    
+    def put(self, category, articles):
+        """Store a category's articles and its pre-rendered payloads"""
+        payload = render_news_payload(articles)
         
-        'mandi': [
-            {
-                'title': 'Wheat Prices Rise to ₹2,150/Quintal in Delhi Mandi',
-                'description': 'Strong demand and lower arrivals push prices up 5% this week.',
-                'source': 'Agmarknet',
-                'url': 'https://agmarknet.gov.in',
-                'time': '30m ago',
-                'category': 'mandi'
-            },
-            {
-                'title': 'Onion Prices Stabilize After Maharashtra Arrivals Increase',
-                'description': 'Average mandi price drops to ₹25/kg from ₹40/kg last month.',
-                'source': 'Market Watch',
-                'url': 'https://agmarknet.gov.in',
-                'time': '3h ago',
-                'category': 'mandi'
-            },
-            {
-                'title': 'Record Basmati Rice Exports Expected in Q1 2026',
-                'description': 'India targets $5 billion basmati exports with new markets in Africa.',
-                'source': 'APEDA',
-                'url': 'https://apeda.gov.in',
-                'time': '1d ago',
-                'category': 'mandi'
-            }
-        ],
+        conn = self._conn()
+        conn.execute(
+            'INSERT OR REPLACE INTO news_cache (category, articles, fetched_at) VALUES (?, ?, ?)',
+            (category, json.dumps(articles, ensure_ascii=False), time.time())
+        )
+        # Feed articles are not translated, so every language gets the same bytes
+        conn.executemany(
+            'INSERT OR REPLACE INTO news_payload (category, language, etag, identity, gzip, br) VALUES (?, ?, ?, ?, ?, ?)',
+            [(category, language, payload['etag'], payload['identity'], payload['gzip'], payload['br'])
+             for language in NEWS_LANGUAGES]
+        )
+        conn.commit()
+    
+    def get_payload(self, category, language):
+        """
+        Pre-rendered payload for (category, language), or None
+        
+        Only the ETag is read from disk while this worker's in-memory copy
+        is current.
+        """
+        try:
+            conn = self._conn()
+            row = conn.execute(
+                'SELECT etag FROM news_payload WHERE category = ? AND language = ?', (category, language)
+            ).fetchone()
+            if row is None:
+                return None
+            
+            payload = self._payloads.get((category, language))
+            if payload is not None and payload['etag'] == row[0]:
+                return payload
+            
+            row = conn.execute(
+                'SELECT etag, identity, gzip, br FROM news_payload WHERE category = ? AND language = ?',
+                (category, language)
+            ).fetchone()
+            if row is None:
+                return None
+            
+            payload = {'etag': row[0], 'identity': row[1], 'gzip': row[2], 'br': row[3]}
+            self._payloads[(category, language)] = payload
+            return payload
+        
+        except sqlite3.Error as e:
+            print(f"News cache read error: {e}")
+            return None
+    
+    def get_feed(self, url):
+        """Validators and last parsed articles for a feed URL, or None"""
+        try:
+            row = self._conn().execute(
+                'SELECT etag, modified, articles, published FROM feed_state WHERE url = ?', (url,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            print(f"News cache read error: {e}")
+            return None
         
-        'tech': [
-            {
-                'title': 'Solar Pump Subsidy Applications Now Open Online',
-                'description': 'PM-KUSUM scheme offers 60% subsidy. Apply on official portal by March 31.',
-                'source': 'MNRE',
-                'url': 'https://mnre.gov.in',
-                'time': '2h ago',
-                'category': 'tech'
-            },
-            {
-                'title': 'Drone Spraying Trials Show 40% Reduction in Pesticide Use',
-                'description': 'Precision agriculture technology being tested in 500 villages.',
-                'source': 'AgTech India',
-                'url': 'https://agritech.tnau.ac.in',
-                'time': '1d ago',
-                'category': 'tech'
-            },
-            {
-                'title': 'AI-Based Crop Advisory Service Launched in 10 States',
-                'description': 'Free SMS service provides personalized farming tips based on weather and soil.',
-                'source': 'Digital India',
-                'url': 'https://digitalindia.gov.in',
-                'time': '3d ago',
-                'category': 'tech'
+        if row is None:
+            return None
+        return {
+            'etag': row[0],
+            'modified': row[1],
+            'articles': json.loads(row[2]),
+            'published': json.loads(row[3])
+        }
+    
+    def put_feed(self, url, etag, modified, articles, published, not_modified):
+        """Store a feed's validators and articles and count the response"""
+        conn = self._conn()
+        conn.execute('''
+            INSERT INTO feed_state (url, etag, modified, articles, published, fetches, not_modified)
+            VALUES (?, ?, ?, ?, ?, 1, ?)
+            ON CONFLICT(url) DO UPDATE SET
+                etag = excluded.etag,
+                modified = excluded.modified,
+                articles = excluded.articles,
+                published = excluded.published,
+                fetches = fetches + 1,
+                not_modified = not_modified + excluded.not_modified
+        ''', (url, etag, modified, json.dumps(articles, ensure_ascii=False), json.dumps(published), int(not_modified)))
+        conn.commit()
+    
+    def feed_stats(self):
+        """Per-feed fetch count and 304 Not Modified ratio"""
+        rows = self._conn().execute('SELECT url, fetches, not_modified FROM feed_state').fetchall()
+        return {
+            url: {
+                'fetches': fetches,
+                'not_modified': not_modified,
+                'not_modified_ratio': round(not_modified / fetches, 3) if fetches else 0.0
             }
-        ]
-    }
+            for url, fetches, not_modified in rows
+        }
     
-    # Get news for category
-    news = news_database.get(category, news_database['crops'])
+    def oldest_fetch(self):
+        """fetched_at of the stalest category (0 if any is missing)"""
+        rows = dict(self._conn().execute('SELECT category, fetched_at FROM news_cache').fetchall())
+        return min(rows.get(category, 0) for category in FEEDS)
     
-    # Translate titles if Hindi or Tamil
-    if language == 'hi':
-        for article in news:
-            article['title'] = f"[हिंदी] {article['title']}"
-    elif language == 'ta':
-        for article in news:
-            article['title'] = f"[தமிழ்] {article['title']}"
+    def last_refresh(self):
+        """When any worker last attempted a refresh (0 if never)"""
+        row = self._conn().execute(
+            "SELECT attempted_at FROM news_refresh WHERE name = 'refresh'"
+        ).fetchone()
+        return row[0] if row else 0
+    
+    def mark_refreshed(self):
+        """Record a refresh attempt, whether or not any feed returned articles"""
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO news_refresh (name, attempted_at) VALUES ('refresh', ?)",
+            (time.time(),)
+        )
+        conn.commit()
+    
+    def acquire_lease(self, seconds=NEWS_REFRESH_LEASE_SECONDS):
+        """True if this process now holds the refresh lease"""
+        now = time.time()
+        conn = self._conn()
+        cursor = conn.execute('''
+            INSERT INTO news_lease (name, holder, expires) VALUES ('refresh', ?, ?)
+            ON CONFLICT(name) DO UPDATE SET holder = excluded.holder, expires = excluded.expires
+            WHERE news_lease.expires < ? OR news_lease.holder = excluded.holder
+        ''', (os.getpid(), now + seconds, now))
+        conn.commit()
+        return cursor.rowcount == 1
+    
+    def release_lease(self):
+        conn = self._conn()
+        conn.execute("DELETE FROM news_lease WHERE name = 'refresh' AND holder = ?", (os.getpid(),))
+        conn.commit()
+
+
+class NewsRefresher:
+    """
+    Daemon thread that keeps the news cache warm
+    
+    Every worker runs one (started lazily, so it is fork-safe with
+    gunicorn --preload); a lease in the cache file makes sure only one
+    of them fetches per refresh interval.
+    """
+    
+    def __init__(self, cache, interval=NEWS_REFRESH_SECONDS, poll=NEWS_POLL_SECONDS):
+        self.cache = cache
+        self.interval = interval
+        self.poll = poll
+        
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        
+        self.counters = {'refreshes': 0, 'refresh_errors': 0, 'last_refresh_seconds': None}
+    
+    def ensure_started(self):
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._wake = threading.Event()
+                self._thread = threading.Thread(target=self._run, name='news-refresher', daemon=True)
+                self._pid = os.getpid()
+                self._thread.start()
+    
+    def wake(self):
+        """Check for a refresh now instead of at the next poll"""
+        self._wake.set()
     
-    return news
+    def _due(self):
+        # Gated on the last attempt, not on stored articles: categories
+        # whose feeds all failed must not be refetched on every poll
+        return time.time() - self.cache.last_refresh() >= self.interval
+    
+    def run_once(self):
+        """Refresh if the interval has passed and this process gets the lease"""
+        if self._due() and self.cache.acquire_lease():
+            try:
+                # Another worker may have refreshed while we took the lease
+                if self._due():
+                    self.refresh()
+            finally:
+                self.cache.release_lease()
+    
+    def _run(self):
+        while True:
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"News refresh error: {e}")
+                self.counters['refresh_errors'] += 1
+            
+            self._wake.wait(self.poll)
+            self._wake.clear()
+    
+    def refresh(self):
+        """Fetch every category and store the non-empty results (blocking)"""
+        start = time.perf_counter()
+        
+        # Every feed once, concurrently (some are shared between categories)
+        try:
+            feed_articles = fetch_feeds([url for urls in FEEDS.values() for url in urls])
+        finally:
+            self.cache.mark_refreshed()
+        
+        for category in FEEDS:
+            articles = collect_category_news(category, feed_articles)
+            if articles:
+                self.cache.put(category, articles)
+        
+        self.counters['refreshes'] += 1
+        self.counters['last_refresh_seconds'] = round(time.perf_counter() - start, 2)
+        print(f"📰 News cache refreshed in {self.counters['last_refresh_seconds']}s")
+    
+    def stats(self):
+        oldest = self.cache.oldest_fetch()
+        return dict(
+            self.counters,
+            cache_age_seconds=round(time.time() - oldest) if oldest else None,
+            feeds=feed_breaker.stats(),
+            conditional_get=self.cache.feed_stats()
+        )
+
+
+# Per-process singletons (the cache file itself is shared)
+news_cache = NewsCache()
+news_refresher = NewsRefresher(news_cache)
 
 # ============================================================================
 # EXPORT FUNCTIONS
@@ -315,6 +856,8 @@ if __name__ == '__main__':
     print("Testing Real News API...")
     print("\n" + "="*60)
     
+    # Fetch synchronously so the test reads live feeds
+    news_refresher.refresh()
     news = get_agriculture_news('crops')
     
     print(f"Found {len(news)} articles:\n")
@@ -0,0 +1,244 @@
+"""
+Password hashing for FarmScan
+Salted scrypt (PBKDF2 fallback) with constant-time checks, transparent
+upgrade of legacy SHA-256 hashes and a bounded KDF thread pool
+"""
+
+import base64
+import hashlib
+import hmac
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+# Cost settings - raising them makes old hashes "need rehash" on next login
+SCRYPT_N = int(os.environ.get('PASSWORD_SCRYPT_N', 2 ** 14))
+SCRYPT_R = int(os.environ.get('PASSWORD_SCRYPT_R', 8))
+SCRYPT_P = int(os.environ.get('PASSWORD_SCRYPT_P', 1))
+PBKDF2_ITERATIONS = int(os.environ.get('PASSWORD_PBKDF2_ITERATIONS', 310000))
+
+# KDF work runs on this many threads (hashlib releases the GIL), which
+# also caps how much CPU a login storm can take from a worker
+KDF_THREADS = int(os.environ.get('PASSWORD_KDF_THREADS', 2))
+KDF_TIMEOUT = 30
+
+# KDF calls allowed to queue or run at once; beyond that hash() and
+# verify() raise KdfBusy instead of parking another request thread
+KDF_MAX_PENDING = int(os.environ.get('PASSWORD_KDF_MAX_PENDING', 8))
+
+# Recently verified (phone, password) pairs skip the KDF
+VERIFY_CACHE_SIZE = int(os.environ.get('PASSWORD_VERIFY_CACHE_SIZE', 1024))
+VERIFY_CACHE_TTL = int(os.environ.get('PASSWORD_VERIFY_CACHE_TTL', 300))
+
+SALT_BYTES = 16
+KEY_BYTES = 32
+
+HAS_SCRYPT = hasattr(hashlib, 'scrypt')
+
+
+class KdfBusy(Exception):
+    """KDF_MAX_PENDING password checks are already queued or running"""
+
+
+class KdfTimeout(KdfBusy):
+    """A password check waited longer than KDF_TIMEOUT for the KDF pool"""
+
+
+def _b64(raw):
+    return base64.b64encode(raw).decode('ascii').rstrip('=')
+
+
+def _unb64(text):
+    return base64.b64decode(text + '=' * (-len(text) % 4))
+
+
+def _scrypt(password, salt, n, r, p):
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p,
+                          maxmem=128 * r * (n + p + 2), dklen=KEY_BYTES)
+
+
+def _pbkdf2(password, salt, iterations):
+    return hashlib.pbkdf2_hmac('sha256', password.encode(), salt, iterations, dklen=KEY_BYTES)
+
+
+def _hash_now(password):
+    """Hash with the current cost settings (CPU-bound)"""
+    salt = os.urandom(SALT_BYTES)
+    if HAS_SCRYPT:
+        key = _scrypt(password, salt, SCRYPT_N, SCRYPT_R, SCRYPT_P)
+        return f"scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}${_b64(salt)}${_b64(key)}"
+
+    key = _pbkdf2(password, salt, PBKDF2_ITERATIONS)
+    return f"pbkdf2_sha256${PBKDF2_ITERATIONS}${_b64(salt)}${_b64(key)}"
+
+
+def _dummy_hash():
+    """Hash with the current cost settings that no password matches"""
+    salt, key = _b64(bytes(SALT_BYTES)), _b64(bytes(KEY_BYTES))
+    if HAS_SCRYPT:
+        return f"scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}${salt}${key}"
+    return f"pbkdf2_sha256${PBKDF2_ITERATIONS}${salt}${key}"
+
+
+# Checked for logins to unknown phones so they cost as much as a wrong password
+DUMMY_HASH = _dummy_hash()
+
+
+def _verify_now(password, stored):
+    """
+    Check a password against a stored hash (CPU-bound)
+
+    Returns:
+        (matches, needs_rehash)
+    """
+    if stored.startswith('scrypt$'):
+        _, n, r, p, salt, key = stored.split('$')
+        n, r, p = int(n), int(r), int(p)
+        candidate = _scrypt(password, _unb64(salt), n, r, p)
+        outdated = not HAS_SCRYPT or (n, r, p) != (SCRYPT_N, SCRYPT_R, SCRYPT_P)
+        return hmac.compare_digest(candidate, _unb64(key)), outdated
+
+    if stored.startswith('pbkdf2_sha256$'):
+        _, iterations, salt, key = stored.split('$')
+        candidate = _pbkdf2(password, _unb64(salt), int(iterations))
+        outdated = HAS_SCRYPT or int(iterations) != PBKDF2_ITERATIONS
+        return hmac.compare_digest(candidate, _unb64(key)), outdated
+
+    # Legacy unsalted SHA-256 hex digest
+    legacy = hashlib.sha256(password.encode()).hexdigest()
+    return hmac.compare_digest(legacy.encode(), stored.encode()), True
+
+
+class PasswordHasher:
+    """
+    Runs KDF work on a small thread pool and caches recent verifications
+
+    hash() and verify() block the calling request thread until the KDF
+    finishes (at most KDF_TIMEOUT seconds, then KdfTimeout). The pool only
+    bounds how many KDFs run at once; once max_pending calls are queued or
+    running, new calls raise KdfBusy at once instead of waiting.
+
+    The cache stores only an HMAC of (stored hash, password) under a
+    per-process random key, never the password itself, and only for
+    successful checks.
+    """
+
+    def __init__(self, threads=KDF_THREADS, cache_size=VERIFY_CACHE_SIZE, cache_ttl=VERIFY_CACHE_TTL,
+                 max_pending=KDF_MAX_PENDING):
+        self.threads = threads
+        self.max_pending = max_pending
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+
+        self._pool = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()
+        self._cache_key = os.urandom(32)
+        self._slots = threading.BoundedSemaphore(max_pending)
+
+        self.counters = {'hashes': 0, 'verifications': 0, 'cache_hits': 0, 'busy_rejections': 0, 'timeouts': 0}
+
+    def _executor(self):
+        """Thread pool for this process (re-created after a fork)"""
+        if self._pool is None or self._pid != os.getpid():
+            with self._lock:
+                if self._pool is None or self._pid != os.getpid():
+                    self._pool = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix='kdf')
+                    self._pid = os.getpid()
+        return self._pool
+
+    def _run(self, fn, *args):
+        """Run fn on the KDF pool and wait for it, or raise KdfBusy if the pool is full"""
+        if not self._slots.acquire(blocking=False):
+            self.counters['busy_rejections'] += 1
+            raise KdfBusy()
+        try:
+            future = self._executor().submit(self._call, fn, args)
+        except Exception:
+            self._slots.release()
+            raise
+        try:
+            return future.result(timeout=KDF_TIMEOUT)
+        except FutureTimeout:
+            # Overloaded, not a wrong password - callers answer 503 as for KdfBusy
+            self.counters['timeouts'] += 1
+            raise KdfTimeout() from None
+
+    def _call(self, fn, args):
+        try:
+            return fn(*args)
+        finally:
+            self._slots.release()
+
+    def _fingerprint(self, password, stored):
+        message = stored.encode() + b'\0' + password.encode()
+        return hmac.new(self._cache_key, message, hashlib.sha256).digest()
+
+    def hash(self, password):
+        """Salted KDF hash for storage"""
+        self.counters['hashes'] += 1
+        return self._run(_hash_now, password)
+
+    def verify(self, password, stored):
+        """
+        Constant-time check of a password against a stored hash
+
+        Returns:
+            (matches, needs_rehash) - needs_rehash is True for legacy
+            SHA-256 rows and hashes made with older cost settings
+        """
+        if not stored:
+            return False, False
+
+        fingerprint = self._fingerprint(password, stored)
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._cache.get(fingerprint)
+            if entry is not None and entry[0] > now:
+                self._cache.move_to_end(fingerprint)
+                self.counters['cache_hits'] += 1
+                return True, entry[1]
+
+        self.counters['verifications'] += 1
+        matches, needs_rehash = self._run(_verify_now, password, stored)
+
+        if matches and not needs_rehash:
+            with self._lock:
+                self._cache[fingerprint] = (now + self.cache_ttl, needs_rehash)
+                self._cache.move_to_end(fingerprint)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+        return matches, needs_rehash
+
+    def verify_unknown(self, password):
+        """Spend the same KDF time as verify() when the account does not exist"""
+        self.verify(password, DUMMY_HASH)
+        return False, False
+
+    def stats(self):
+        return dict(self.counters, cache_entries=len(self._cache), max_pending=self.max_pending,
+                    algorithm='scrypt' if HAS_SCRYPT else 'pbkdf2_sha256')
+
+
+# Per-process singleton
+password_hasher = PasswordHasher()
+
+
+def hash_password(password):
+    """Hash a password for storage"""
+    return password_hasher.hash(password)
+
+
+def verify_password(password, stored):
+    """(matches, needs_rehash) for a password against a stored hash"""
+    return password_hasher.verify(password, stored)
+
+
+def verify_unknown_user(password):
+    """Constant-time miss path: (False, False) after a KDF on a dummy hash"""
+    return password_hasher.verify_unknown(password)
@@ -5,15 +5,241 @@ Creates professional disease analysis reports
 
 from reportlab.lib.pagesizes import letter, A4
 from reportlab.lib import colors
+from reportlab import rl_config
 from reportlab.lib.units import inch
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak, Image as RLImage
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_JUSTIFY
 from datetime import datetime
+from functools import lru_cache
+import copy
+import hashlib
 import io
+import json
+import os
+import tempfile
+import threading
 from PIL import Image
 
-def generate_scan_report_pdf(scan_data, image_data=None, user_info=None):
+# Bump whenever the report layout or wording changes - cached reports
+# from older templates are then ignored
+TEMPLATE_VERSION = '2'
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Rendered scan reports, one file per (scan_id, language, template version)
+REPORT_CACHE_DIR = os.environ.get('REPORT_CACHE_DIR', os.path.join(BASE_DIR, 'report_cache'))
+REPORT_CACHE_MAX_FILES = int(os.environ.get('REPORT_CACHE_MAX_FILES', 2000))
+
+# Trim the report cache once every N writes
+_CACHE_TRIM_INTERVAL = 50
+
+# Embedded photos are downsampled to this resolution at their printed size
+# and stored as JPEG; uploads already at most 2x that are embedded as-is
+PDF_IMAGE_DPI = int(os.environ.get('PDF_IMAGE_DPI', 150))
+PDF_JPEG_QUALITY = int(os.environ.get('PDF_JPEG_QUALITY', 80))
+PASSTHROUGH_MAX_DPI = 2 * PDF_IMAGE_DPI
+
+# Write binary streams as-is (ASCII85 would add 25% to every embedded JPEG)
+rl_config.useA85 = 0
+
+_EXIF_ORIENTATION = 0x0112
+
+# ============================================================================
+# STYLES AND STATIC CONTENT (built once per process)
+# ============================================================================
+
+@lru_cache(maxsize=None)
+def get_styles():
+    """Paragraph styles shared by every report"""
+    styles = getSampleStyleSheet()
+    
+    return {
+        'normal': styles['Normal'],
+        'title': ParagraphStyle(
+            'CustomTitle',
+            parent=styles['Heading1'],
+            fontSize=24,
+            textColor=colors.HexColor('#2E7D32'),
+            spaceAfter=30,
+            alignment=TA_CENTER,
+            fontName='Helvetica-Bold'
+        ),
+        'history_title': ParagraphStyle(
+            'HistoryTitle',
+            parent=styles['Heading1'],
+            fontSize=20,
+            textColor=colors.HexColor('#2E7D32'),
+            spaceAfter=20,
+            alignment=TA_CENTER,
+            fontName='Helvetica-Bold'
+        ),
+        'subtitle': ParagraphStyle(
+            'CustomSubtitle',
+            parent=styles['Heading2'],
+            fontSize=16,
+            textColor=colors.HexColor('#1976D2'),
+            spaceAfter=12,
+            spaceBefore=12,
+            fontName='Helvetica-Bold'
+        ),
+        'body': ParagraphStyle(
+            'CustomNormal',
+            parent=styles['Normal'],
+            fontSize=11,
+            spaceAfter=8,
+            alignment=TA_JUSTIFY
+        ),
+        'warning': ParagraphStyle(
+            'WarningStyle',
+            parent=styles['Normal'],
+            fontSize=11,
+            textColor=colors.HexColor('#D32F2F'),
+            spaceAfter=8,
+            fontName='Helvetica-Bold'
+        ),
+        'footer': ParagraphStyle(
+            'Footer',
+            parent=styles['Normal'],
+            fontSize=9,
+            textColor=colors.grey,
+            alignment=TA_CENTER
+        ),
+    }
+
+
+DIAGNOSIS_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#E8F5E9')),
+    ('BACKGROUND', (1, 0), (1, -1), colors.white),
+    ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+    ('FONTNAME', (1, 0), (1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 0), (-1, -1), 11),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+    ('TOPPADDING', (0, 0), (-1, -1), 8),
+    ('GRID', (0, 0), (-1, -1), 1, colors.grey),
+])
+
+# General recommendations page text per language (Helvetica only covers
+# Latin script, so other languages use English until a font is embedded)
+RECOMMENDATIONS = {
+    'en': {
+        'title': "📋 General Recommendations",
+        'items': [
+            "Monitor your crop daily for any changes in symptoms",
+            "Keep detailed records of all treatments applied",
+            "Maintain proper spacing between plants for air circulation",
+            "Remove and destroy infected plant material properly",
+            "Practice crop rotation to prevent disease buildup",
+            "Use disease-resistant varieties when available",
+            "Ensure proper irrigation - avoid overwatering",
+            "Consult local agricultural extension for region-specific advice"
+        ]
+    }
+}
+
+FOOTER_TEXT = (
+    "This report is generated by FarmScan AI Disease Detection System<br/>"
+    "For best results, consult with local agricultural experts<br/>"
+    "© 2026 FarmScan - Helping Farmers Grow Better"
+)
+
+
+@lru_cache(maxsize=None)
+def _static_pages(language):
+    """Parsed recommendations page and footer for a language"""
+    styles = get_styles()
+    text = RECOMMENDATIONS.get(language, RECOMMENDATIONS['en'])
+    
+    flowables = [PageBreak(), Paragraph(text['title'], styles['subtitle'])]
+    flowables += [Paragraph(f"✓ {item}", styles['body']) for item in text['items']]
+    flowables += [
+        Spacer(1, 0.3*inch),
+        Spacer(1, 0.5*inch),
+        Table([['']], colWidths=[6.5*inch], style=[('LINEABOVE', (0, 0), (-1, -1), 1, colors.grey)]),
+        Paragraph(FOOTER_TEXT, styles['footer'])
+    ]
+    return tuple(flowables)
+
+
+def static_pages(language='en'):
+    """
+    Recommendations page + footer ready to append to a report
+    
+    Markup is parsed once per language; each report gets shallow copies so
+    layout state from one build never leaks into another.
+    """
+    return [copy.copy(flowable) for flowable in _static_pages(language)]
+
+# ============================================================================
+# IMAGES
+# ============================================================================
+
+def _jpeg_bytes(image):
+    """Encoded bytes of an image opened from a JPEG file or stream, else None"""
+    if image.format != 'JPEG' or image.mode not in ('RGB', 'L'):
+        return None
+    if image.getexif().get(_EXIF_ORIENTATION, 1) != 1:
+        return None  # reportlab ignores EXIF rotation
+    
+    try:
+        if getattr(image, 'filename', None):
+            with open(image.filename, 'rb') as f:
+                data = f.read()
+        elif image.fp is not None and image.fp.seekable():
+            image.fp.seek(0)
+            data = image.fp.read()
+        else:
+            return None
+    except (OSError, ValueError):
+        return None
+    
+    return data if data.startswith(b'\xff\xd8') else None
+
+
+def embed_image(image, width, height):
+    """
+    JPEG stream for a photo printed at width x height points
+    
+    A JPEG upload no denser than PASSTHROUGH_MAX_DPI is embedded byte for
+    byte. Anything else is decoded at reduced size (draft mode for JPEGs),
+    downsampled to PDF_IMAGE_DPI and encoded as JPEG at PDF_JPEG_QUALITY.
+    
+    Returns:
+        BytesIO with JPEG data
+    """
+    target = (max(1, round(width / inch * PDF_IMAGE_DPI)), max(1, round(height / inch * PDF_IMAGE_DPI)))
+    
+    if image.width <= 2 * target[0] and image.height <= 2 * target[1]:
+        data = _jpeg_bytes(image)
+        if data is not None:
+            return io.BytesIO(data)
+    
+    if image.format == 'JPEG' and image.mode in ('RGB', 'L', 'CMYK', 'YCbCr'):
+        image.draft(image.mode, target)
+    
+    if image.mode in ('RGBA', 'LA', 'P'):
+        # Flatten transparency onto white (JPEG has no alpha)
+        rgba = image.convert('RGBA')
+        image = Image.new('RGB', rgba.size, 'white')
+        image.paste(rgba, mask=rgba.getchannel('A'))
+    elif image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    
+    if image.width > target[0] or image.height > target[1]:
+        image = image.resize(target, Image.LANCZOS, reducing_gap=3.0)
+    
+    buffer = io.BytesIO()
+    image.save(buffer, format='JPEG', quality=PDF_JPEG_QUALITY)
+    buffer.seek(0)
+    return buffer
+
+# ============================================================================
+# SCAN REPORT
+# ============================================================================
+
+def generate_scan_report_pdf(scan_data, image_data=None, user_info=None, language='en'):
     """
     Generate a comprehensive PDF report for a crop scan
     
@@ -21,6 +247,7 @@ def generate_scan_report_pdf(scan_data, image_data=None, user_info=None):
         scan_data: Dictionary with scan results
         image_data: PIL Image object or None
         user_info: Dictionary with user information
+        language: Language of the static recommendations page
     
     Returns:
         BytesIO object containing the PDF
@@ -42,46 +269,11 @@ def generate_scan_report_pdf(scan_data, image_data=None, user_info=None):
     # Container for PDF elements
     elements = []
     
-    # Define styles
-    styles = getSampleStyleSheet()
-    
-    # Custom styles
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=24,
-        textColor=colors.HexColor('#2E7D32'),
-        spaceAfter=30,
-        alignment=TA_CENTER,
-        fontName='Helvetica-Bold'
-    )
-    
-    subtitle_style = ParagraphStyle(
-        'CustomSubtitle',
-        parent=styles['Heading2'],
-        fontSize=16,
-        textColor=colors.HexColor('#1976D2'),
-        spaceAfter=12,
-        spaceBefore=12,
-        fontName='Helvetica-Bold'
-    )
-    
-    normal_style = ParagraphStyle(
-        'CustomNormal',
-        parent=styles['Normal'],
-        fontSize=11,
-        spaceAfter=8,
-        alignment=TA_JUSTIFY
-    )
-    
-    warning_style = ParagraphStyle(
-        'WarningStyle',
-        parent=styles['Normal'],
-        fontSize=11,
-        textColor=colors.HexColor('#D32F2F'),
-        spaceAfter=8,
-        fontName='Helvetica-Bold'
-    )
+    styles = get_styles()
+    title_style = styles['title']
+    subtitle_style = styles['subtitle']
+    normal_style = styles['body']
+    warning_style = styles['warning']
     
     # Add title
     elements.append(Paragraph("🌾 FarmScan Crop Analysis Report", title_style))
@@ -114,18 +306,7 @@ def generate_scan_report_pdf(scan_data, image_data=None, user_info=None):
     ]
     
     diagnosis_table = Table(diagnosis_data, colWidths=[2*inch, 4*inch])
-    diagnosis_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#E8F5E9')),
-        ('BACKGROUND', (1, 0), (1, -1), colors.white),
-        ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-        ('FONTNAME', (1, 0), (1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 0), (-1, -1), 11),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-        ('TOPPADDING', (0, 0), (-1, -1), 8),
-        ('GRID', (0, 0), (-1, -1), 1, colors.grey),
-    ]))
+    diagnosis_table.setStyle(DIAGNOSIS_TABLE_STYLE)
     elements.append(diagnosis_table)
     elements.append(Spacer(1, 0.3*inch))
     
@@ -169,10 +350,8 @@ def generate_scan_report_pdf(scan_data, image_data=None, user_info=None):
             new_width = img_width * scale
             new_height = img_height * scale
             
-            # Save image to buffer
-            img_buffer = io.BytesIO()
-            image_data.save(img_buffer, format='PNG')
-            img_buffer.seek(0)
+            # JPEG at print resolution (or the upload itself)
+            img_buffer = embed_image(image_data, new_width, new_height)
             
             # Add image to PDF
             img = RLImage(img_buffer, width=new_width, height=new_height)
@@ -181,46 +360,8 @@ def generate_scan_report_pdf(scan_data, image_data=None, user_info=None):
         except Exception as e:
             print(f"Error adding image to PDF: {e}")
     
-    # === RECOMMENDATIONS ===
-    elements.append(PageBreak())
-    elements.append(Paragraph("📋 General Recommendations", subtitle_style))
-    
-    recommendations = [
-        "Monitor your crop daily for any changes in symptoms",
-        "Keep detailed records of all treatments applied",
-        "Maintain proper spacing between plants for air circulation",
-        "Remove and destroy infected plant material properly",
-        "Practice crop rotation to prevent disease buildup",
-        "Use disease-resistant varieties when available",
-        "Ensure proper irrigation - avoid overwatering",
-        "Consult local agricultural extension for region-specific advice"
-    ]
-    
-    for i, rec in enumerate(recommendations, 1):
-        elements.append(Paragraph(f"✓ {rec}", normal_style))
-    
-    elements.append(Spacer(1, 0.3*inch))
-    
-    # === FOOTER ===
-    elements.append(Spacer(1, 0.5*inch))
-    elements.append(Table([['']], colWidths=[6.5*inch], style=[
-        ('LINEABOVE', (0, 0), (-1, -1), 1, colors.grey)
-    ]))
-    
-    footer_style = ParagraphStyle(
-        'Footer',
-        parent=styles['Normal'],
-        fontSize=9,
-        textColor=colors.grey,
-        alignment=TA_CENTER
-    )
-    
-    elements.append(Paragraph(
-        "This report is generated by FarmScan AI Disease Detection System<br/>"
-        "For best results, consult with local agricultural experts<br/>"
-        "© 2026 FarmScan - Helping Farmers Grow Better",
-        footer_style
-    ))
+    # === RECOMMENDATIONS + FOOTER (pre-parsed) ===
+    elements.extend(static_pages(language))
     
     # Build PDF
     doc.build(elements)
@@ -229,79 +370,212 @@ def generate_scan_report_pdf(scan_data, image_data=None, user_info=None):
     buffer.seek(0)
     return buffer
 
-def create_history_report_pdf(scans_list, user_info=None):
+# ============================================================================
+# REPORT CACHE
+# ============================================================================
+
+class ReportCache:
     """
-    Generate a PDF report with scan history
+    Rendered PDFs on disk, shared by all workers
     
-    Args:
-        scans_list: List of scan dictionaries
-        user_info: Dictionary with user information
+    Files are written to a temp name and renamed into place, so a reader
+    never sees a partial PDF. The oldest files are trimmed beyond max_files.
+    """
     
-    Returns:
-        BytesIO object containing the PDF
+    def __init__(self, directory=REPORT_CACHE_DIR, max_files=REPORT_CACHE_MAX_FILES):
+        self.directory = directory
+        self.max_files = max_files
+        self._writes = 0
+        self._lock = threading.Lock()
+        self.counters = {'hits': 0, 'misses': 0, 'errors': 0}
+    
+    def _path(self, key):
+        return os.path.join(self.directory, '-'.join(str(part) for part in key) + '.pdf')
+    
+    def get(self, key):
+        """Cached PDF bytes, or None"""
+        try:
+            with open(self._path(key), 'rb') as f:
+                data = f.read()
+            self.counters['hits'] += 1
+            return data
+        except FileNotFoundError:
+            self.counters['misses'] += 1
+            return None
+        except OSError as e:
+            print(f"Report cache read error: {e}")
+            self.counters['errors'] += 1
+            return None
+    
+    def set(self, key, data):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, self._path(key))
+        except OSError as e:
+            print(f"Report cache write error: {e}")
+            self.counters['errors'] += 1
+            return
+        
+        with self._lock:
+            self._writes += 1
+            trim = self._writes % _CACHE_TRIM_INTERVAL == 0
+        if trim:
+            self._trim()
+    
+    def _trim(self):
+        """Delete the least recently written reports beyond max_files"""
+        try:
+            entries = [entry for entry in os.scandir(self.directory) if entry.name.endswith('.pdf')]
+            entries.sort(key=lambda entry: entry.stat().st_mtime)
+            for entry in entries[:max(len(entries) - self.max_files, 0)]:
+                os.unlink(entry.path)
+        except OSError as e:
+            print(f"Report cache trim error: {e}")
+    
+    def stats(self):
+        return dict(self.counters)
+
+
+report_cache = ReportCache()
+
+
+def _report_digest(scan_data, user_info):
+    """Short hash of everything printed on a scan report besides the photo"""
+    content = json.dumps([scan_data, user_info], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()[:16]
+
+
+def render_scan_report(scan_id, scan_data, user_info=None, language='en', image_data=None):
     """
+    PDF bytes for a saved scan, rendered at most once per template version
     
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter, rightMargin=0.75*inch, leftMargin=0.75*inch,
-                           topMargin=0.75*inch, bottomMargin=0.75*inch)
+    The cache key includes a hash of scan_data and user_info, so a renamed
+    user or another viewer never gets a report printed for someone else.
     
-    elements = []
-    styles = getSampleStyleSheet()
+    Returns:
+        bytes - from the report cache when this exact report was already exported
+    """
+    key = (scan_id, language, TEMPLATE_VERSION, _report_digest(scan_data, user_info))
+    data = report_cache.get(key)
+    if data is None:
+        data = generate_scan_report_pdf(scan_data, image_data, user_info, language).getvalue()
+        report_cache.set(key, data)
+    return data
+
+# ============================================================================
+# HISTORY REPORT
+# ============================================================================
+
+# Table rows per page (rows are one line of 9pt text)
+HISTORY_FIRST_PAGE_ROWS = 26
+HISTORY_ROWS_PER_PAGE = 35
+
+HISTORY_HEADER = ['Date', 'Disease', 'Confidence', 'Severity']
+HISTORY_COL_WIDTHS = [1.5*inch, 2.5*inch, 1.2*inch, 1.2*inch]
+
+HISTORY_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2E7D32')),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 11),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 10),
+    ('BACKGROUND', (0, 1), (-1, -1), colors.white),
+    ('GRID', (0, 0), (-1, -1), 1, colors.grey),
+    ('FONTSIZE', (0, 1), (-1, -1), 9),
+])
+
+
+class _LazyFlowables(list):
+    """
+    Flowable list that is refilled from a generator as reportlab consumes it
     
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=20,
-        textColor=colors.HexColor('#2E7D32'),
-        spaceAfter=20,
-        alignment=TA_CENTER,
-        fontName='Helvetica-Bold'
-    )
+    build() checks len() before handling each flowable, so only the page
+    being laid out (plus any split remainder) is ever held in memory.
+    """
+    
+    def __init__(self, source):
+        super().__init__()
+        self._source = source
+    
+    def __len__(self):
+        if self._source is not None and super().__len__() < 2:
+            try:
+                self.append(next(self._source))
+            except StopIteration:
+                self._source = None
+        return super().__len__()
+
+
+def _history_row(scan):
+    return [
+        (scan.get('date') or 'N/A')[:16],  # Truncate datetime
+        scan.get('disease_name', 'Unknown'),
+        f"{int(scan.get('confidence', 0) * 100)}%",
+        scan.get('severity', 'N/A')
+    ]
+
+
+def _history_flowables(scans, user_info):
+    """Title, then one table per page with its own header row, then the total"""
+    styles = get_styles()
     
     # Title
-    elements.append(Paragraph("🌾 FarmScan Scan History Report", title_style))
-    elements.append(Spacer(1, 0.2*inch))
+    yield Paragraph("🌾 FarmScan Scan History Report", styles['history_title'])
+    yield Spacer(1, 0.2*inch)
     
     # User info
     if user_info:
-        elements.append(Paragraph(f"<b>Farmer:</b> {user_info.get('name', 'N/A')}", styles['Normal']))
-        elements.append(Paragraph(f"<b>Phone:</b> {user_info.get('phone', 'N/A')}", styles['Normal']))
+        yield Paragraph(f"<b>Farmer:</b> {user_info.get('name', 'N/A')}", styles['normal'])
+        yield Paragraph(f"<b>Phone:</b> {user_info.get('phone', 'N/A')}", styles['normal'])
     
-    elements.append(Paragraph(f"<b>Generated:</b> {datetime.now().strftime('%B %d, %Y')}", styles['Normal']))
-    elements.append(Spacer(1, 0.3*inch))
+    yield Paragraph(f"<b>Generated:</b> {datetime.now().strftime('%B %d, %Y')}", styles['normal'])
+    yield Spacer(1, 0.3*inch)
     
-    # Table header
-    table_data = [['Date', 'Disease', 'Confidence', 'Severity']]
-    
-    # Add scan data
-    for scan in scans_list[:20]:  # Limit to 20 most recent
-        table_data.append([
-            scan.get('date', 'N/A')[:16],  # Truncate datetime
-            scan.get('disease_name', 'Unknown'),
-            f"{int(scan.get('confidence', 0) * 100)}%",
-            scan.get('severity', 'N/A')
-        ])
-    
-    # Create table
-    table = Table(table_data, colWidths=[1.5*inch, 2.5*inch, 1.2*inch, 1.2*inch])
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2E7D32')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 11),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 10),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.white),
-        ('GRID', (0, 0), (-1, -1), 1, colors.grey),
-        ('FONTSIZE', (0, 1), (-1, -1), 9),
-    ]))
+    total = 0
+    rows = []
+    capacity = HISTORY_FIRST_PAGE_ROWS
+    
+    for scan in scans:
+        rows.append(_history_row(scan))
+        total += 1
+        if len(rows) == capacity:
+            yield Table([HISTORY_HEADER] + rows, colWidths=HISTORY_COL_WIDTHS, style=HISTORY_TABLE_STYLE)
+            yield PageBreak()
+            rows = []
+            capacity = HISTORY_ROWS_PER_PAGE
     
-    elements.append(table)
+    if rows or not total:
+        yield Table([HISTORY_HEADER] + rows, colWidths=HISTORY_COL_WIDTHS, style=HISTORY_TABLE_STYLE)
     
     # Summary
-    elements.append(Spacer(1, 0.3*inch))
-    elements.append(Paragraph(f"<b>Total Scans:</b> {len(scans_list)}", styles['Normal']))
+    yield Spacer(1, 0.3*inch)
+    yield Paragraph(f"<b>Total Scans:</b> {total}", styles['normal'])
+
+
+def create_history_report_pdf(scans, user_info=None, output=None):
+    """
+    Generate a PDF report with the full scan history
     
-    doc.build(elements)
+    Pages are laid out as scans arrive, so a generator (see
+    storage.iter_user_scans) keeps memory bounded for any history size.
+    
+    Args:
+        scans: Iterable of scan dictionaries, newest first
+        user_info: Dictionary with user information
+        output: Binary file object to write to (default: new BytesIO)
+    
+    Returns:
+        The output file object, rewound to the start
+    """
+    
+    buffer = output if output is not None else io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=letter, rightMargin=0.75*inch, leftMargin=0.75*inch,
+                           topMargin=0.75*inch, bottomMargin=0.75*inch)
+    
+    doc.build(_LazyFlowables(_history_flowables(iter(scans), user_info)))
     buffer.seek(0)
     return buffer
@@ -0,0 +1,407 @@
+"""
+Background PDF export jobs for FarmScan
+Export requests are queued in a SQLite file shared by all workers and
+rendered to disk by a process pool, off the gunicorn request threads
+"""
+
+import json
+import multiprocessing
+import os
+import secrets
+import shutil
+import sqlite3
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from PIL import Image
+
+from pdf_generator import create_history_report_pdf, generate_scan_report_pdf, render_scan_report
+from scan_artifacts import open_thumbnail
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+PDF_JOBS_DB = os.environ.get('PDF_JOBS_DB', os.path.join(BASE_DIR, 'pdf_jobs.db'))
+PDF_JOBS_DIR = os.environ.get('PDF_JOBS_DIR', os.path.join(BASE_DIR, 'pdf_jobs'))
+
+# Render processes per web worker (reportlab is pure Python and holds the GIL)
+PDF_JOB_WORKERS = int(os.environ.get('PDF_JOB_WORKERS', 1))
+
+# Finished jobs and their files are deleted after this many seconds
+PDF_JOB_TTL = int(os.environ.get('PDF_JOB_TTL', 3600))
+
+# Render processes refresh a running job's heartbeat (its started time)
+# every PDF_JOB_HEARTBEAT_SECONDS; a job whose heartbeat is older than
+# PDF_JOB_STALE_SECONDS lost its process and is retried
+PDF_JOB_STALE_SECONDS = int(os.environ.get('PDF_JOB_STALE_SECONDS', 120))
+PDF_JOB_HEARTBEAT_SECONDS = max(1, PDF_JOB_STALE_SECONDS // 4)
+PDF_JOB_MAX_ATTEMPTS = 2
+
+# Unfinished jobs allowed per user before new exports are refused
+PDF_JOB_MAX_PENDING = 5
+
+# Rows per database query for history exports
+HISTORY_FETCH_SIZE = 500
+
+# Delete expired jobs once every N enqueues
+_CLEANUP_INTERVAL = 20
+
+JOB_KINDS = ('scan', 'history', 'latest')
+
+
+class TooManyJobs(Exception):
+    """The user already has PDF_JOB_MAX_PENDING unfinished exports"""
+
+
+def _render(job, output):
+    """Write the PDF for one claimed job to an open binary file"""
+    params = json.loads(job['params'])
+
+    if job['kind'] == 'scan':
+        # Thumbnail stored at analysis time (None for older scans)
+        image = open_thumbnail(params.get('image_hash'))
+        output.write(render_scan_report(params['scan_id'], params['scan_data'],
+                                        params['user_info'], params['language'], image))
+
+    elif job['kind'] == 'history':
+        # Imported here so scan-only render processes never open the database
+        from storage import iter_user_scans
+        scans = iter_user_scans(job['user_phone'], HISTORY_FETCH_SIZE)
+        create_history_report_pdf(scans, params['user_info'], output)
+
+    elif job['kind'] == 'latest':
+        image = None
+        if job['input_path']:
+            image = Image.open(job['input_path'])
+        pdf = generate_scan_report_pdf(params['scan_data'], image, params['user_info'])
+        shutil.copyfileobj(pdf, output)
+
+    else:
+        raise ValueError(f"Unknown PDF job kind: {job['kind']}")
+
+
+class PdfJobQueue:
+    """
+    SQLite-backed queue of PDF exports
+
+    enqueue() records the job and submits a "run the next job" task to a
+    process pool. Every task claims the oldest queued job inside an
+    IMMEDIATE transaction, so jobs left behind by a crashed worker are
+    picked up by the next task from any process.
+    """
+
+    def __init__(self, db_path=PDF_JOBS_DB, out_dir=PDF_JOBS_DIR, workers=PDF_JOB_WORKERS):
+        self.db_path = db_path
+        self.out_dir = out_dir
+        self.workers = workers
+
+        self._local = threading.local()
+        self._ready = False
+        self._pool = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._enqueued = 0
+        self._nudged = {}
+
+        self.counters = {'enqueued': 0, 'rejected': 0, 'dispatch_errors': 0, 'pool_restarts': 0}
+
+    def _conn(self):
+        """Per-thread (and per-process) connection in autocommit mode"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+
+        conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        if not self._ready:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS pdf_jobs (
+                    id TEXT PRIMARY KEY,
+                    user_phone TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    params TEXT NOT NULL,
+                    input_path TEXT,
+                    filename TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'queued',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    path TEXT,
+                    size INTEGER,
+                    error TEXT,
+                    created REAL NOT NULL,
+                    started REAL,
+                    finished REAL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_pdf_jobs_status ON pdf_jobs (status, created)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_pdf_jobs_user ON pdf_jobs (user_phone, status)')
+            self._ready = True
+
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def _usable(self, pool):
+        return pool is not None and self._pid == os.getpid() and not pool._broken
+
+    def _executor(self):
+        """Render processes for this web worker (re-created after a fork or a crash)"""
+        pool = self._pool
+        if self._usable(pool):
+            return pool
+
+        with self._lock:
+            pool = self._pool
+            if self._usable(pool):
+                return pool
+
+            if pool is not None and self._pid == os.getpid():
+                # A render process died (e.g. OOM-killed) and broke the pool
+                print("⚠️ PDF render pool broken - restarting it")
+                self.counters['pool_restarts'] += 1
+                pool.shutdown(wait=False, cancel_futures=True)
+
+            # spawn: forking a threaded web worker can deadlock
+            pool = self._pool = ProcessPoolExecutor(max_workers=self.workers,
+                                                    mp_context=multiprocessing.get_context('spawn'))
+            self._pid = os.getpid()
+
+        # Pick up jobs queued before a restart or lost with a broken pool
+        leftover = self._conn().execute('''
+            SELECT COUNT(*) FROM pdf_jobs
+            WHERE status = 'queued' OR (status = 'running' AND started < ?)
+        ''', (time.time() - PDF_JOB_STALE_SECONDS,)).fetchone()[0]
+        for _ in range(leftover):
+            self._submit()
+        return pool
+
+    def _submit(self):
+        """Ask a render process to run the next job, replacing a broken pool once"""
+        for _ in range(2):
+            pool = self._executor()
+            try:
+                future = pool.submit(run_next_job, self.db_path, self.out_dir)
+            except BrokenProcessPool:
+                continue  # pool._broken is set, so _executor() replaces it
+            future.add_done_callback(self._log_failure)
+            return
+        raise BrokenProcessPool('PDF render pool could not be restarted')
+
+    def _log_failure(self, future):
+        if future.exception() is not None:
+            print(f"PDF job dispatch error: {future.exception()}")
+            self.counters['dispatch_errors'] += 1
+
+    # ------------------------------------------------------------------
+    # Web side
+    # ------------------------------------------------------------------
+
+    def enqueue(self, user_phone, kind, params, filename, image_stream=None):
+        """
+        Queue a PDF export
+
+        Args:
+            user_phone: Owner - only they can read the job
+            kind: 'scan', 'history' or 'latest'
+            params: JSON-serializable render arguments
+            filename: Download name for the finished PDF
+            image_stream: Optional binary stream of the uploaded image
+
+        Returns:
+            Job ID
+
+        Raises:
+            TooManyJobs: the user already has PDF_JOB_MAX_PENDING jobs unfinished
+        """
+        if kind not in JOB_KINDS:
+            raise ValueError(f"Unknown PDF job kind: {kind}")
+
+        conn = self._conn()
+        pending = conn.execute(
+            "SELECT COUNT(*) FROM pdf_jobs WHERE user_phone = ? AND status IN ('queued', 'running')",
+            (user_phone,)
+        ).fetchone()[0]
+        if pending >= PDF_JOB_MAX_PENDING:
+            self.counters['rejected'] += 1
+            raise TooManyJobs(user_phone)
+
+        # Pool first: a new pool also dispatches jobs left from a restart
+        self._executor()
+
+        job_id = secrets.token_hex(16)
+        input_path = None
+        if image_stream is not None:
+            os.makedirs(self.out_dir, exist_ok=True)
+            input_path = os.path.join(self.out_dir, f"{job_id}.input")
+            with open(input_path, 'wb') as f:
+                shutil.copyfileobj(image_stream, f)
+
+        conn.execute('''
+            INSERT INTO pdf_jobs (id, user_phone, kind, params, input_path, filename, created)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (job_id, user_phone, kind, json.dumps(params), input_path, filename, time.time()))
+
+        self._submit()
+        self.counters['enqueued'] += 1
+
+        with self._lock:
+            self._enqueued += 1
+            cleanup = self._enqueued % _CLEANUP_INTERVAL == 0
+        if cleanup:
+            self.cleanup()
+
+        return job_id
+
+    def get(self, job_id, user_phone):
+        """
+        Job row as a dict, or None if it does not exist or belongs to someone else
+
+        Polling a job that has waited longer than PDF_JOB_STALE_SECONDS
+        (its render process died, or its task was lost with a broken pool)
+        dispatches another render task for it - at most once per stale
+        period, however often the browser polls.
+        """
+        row = self._conn().execute(
+            'SELECT * FROM pdf_jobs WHERE id = ? AND user_phone = ?', (job_id, user_phone)
+        ).fetchone()
+        if row is None:
+            return None
+
+        stale = time.time() - PDF_JOB_STALE_SECONDS
+        if ((row['status'] == 'queued' and row['created'] < stale)
+                or (row['status'] == 'running' and row['started'] < stale)):
+            self._nudge(job_id)
+        return dict(row)
+
+    def _nudge(self, job_id):
+        """Dispatch a render task for a stale job unless one was sent this stale period"""
+        now = time.monotonic()
+        with self._lock:
+            if now - self._nudged.get(job_id, -PDF_JOB_STALE_SECONDS) < PDF_JOB_STALE_SECONDS:
+                return
+            self._nudged = {job: at for job, at in self._nudged.items()
+                            if now - at < PDF_JOB_STALE_SECONDS}
+            self._nudged[job_id] = now
+        self._submit()
+
+    def cleanup(self, ttl=PDF_JOB_TTL):
+        """Delete jobs (and their files) created more than ttl seconds ago"""
+        conn = self._conn()
+        cutoff = time.time() - ttl
+        rows = conn.execute(
+            "SELECT id, path, input_path FROM pdf_jobs WHERE created < ? AND status IN ('done', 'failed')",
+            (cutoff,)
+        ).fetchall()
+        for row in rows:
+            for path in (row['path'], row['input_path']):
+                if path:
+                    try:
+                        os.unlink(path)
+                    except FileNotFoundError:
+                        pass
+            conn.execute('DELETE FROM pdf_jobs WHERE id = ?', (row['id'],))
+
+    def stats(self):
+        counts = dict(self._conn().execute(
+            'SELECT status, COUNT(*) FROM pdf_jobs GROUP BY status'
+        ).fetchall())
+        return dict(self.counters, jobs=counts, workers=self.workers)
+
+    # ------------------------------------------------------------------
+    # Render process side
+    # ------------------------------------------------------------------
+
+    def _claim(self):
+        """Mark the oldest runnable job as running and return it (or None)"""
+        conn = self._conn()
+        now = time.time()
+        stale = now - PDF_JOB_STALE_SECONDS
+
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute('''
+                UPDATE pdf_jobs SET status = 'failed', error = 'Render process lost', finished = ?
+                WHERE status = 'running' AND started < ? AND attempts >= ?
+            ''', (now, stale, PDF_JOB_MAX_ATTEMPTS))
+            row = conn.execute('''
+                SELECT * FROM pdf_jobs
+                WHERE status = 'queued' OR (status = 'running' AND started < ?)
+                ORDER BY created
+                LIMIT 1
+            ''', (stale,)).fetchone()
+            if row is not None:
+                conn.execute('''
+                    UPDATE pdf_jobs SET status = 'running', started = ?, attempts = attempts + 1
+                    WHERE id = ?
+                ''', (now, row['id']))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return dict(row) if row else None
+
+    def run_next(self):
+        """Render the oldest queued job; returns its ID, or None if the queue was empty"""
+        job = self._claim()
+        if job is None:
+            return None
+
+        path = os.path.join(self.out_dir, f"{job['id']}.pdf")
+        tmp = path + '.tmp'
+        conn = self._conn()
+
+        done = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(job['id'], done),
+                                     name='pdf-job-heartbeat', daemon=True)
+        heartbeat.start()
+        try:
+            os.makedirs(self.out_dir, exist_ok=True)
+            with open(tmp, 'wb') as output:
+                _render(job, output)
+            os.replace(tmp, path)
+            conn.execute('''
+                UPDATE pdf_jobs SET status = 'done', path = ?, size = ?, finished = ?
+                WHERE id = ?
+            ''', (path, os.path.getsize(path), time.time(), job['id']))
+        except Exception as e:
+            print(f"PDF job {job['id']} failed: {e}")
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            conn.execute('''
+                UPDATE pdf_jobs SET status = 'failed', error = ?, finished = ?
+                WHERE id = ?
+            ''', (str(e)[:500], time.time(), job['id']))
+        finally:
+            done.set()
+            heartbeat.join()
+
+        return job['id']
+
+    def _heartbeat(self, job_id, done):
+        """Refresh a running job's started time so long renders are not taken for lost ones"""
+        while not done.wait(PDF_JOB_HEARTBEAT_SECONDS):
+            try:
+                self._conn().execute(
+                    "UPDATE pdf_jobs SET started = ? WHERE id = ? AND status = 'running'",
+                    (time.time(), job_id)
+                )
+            except sqlite3.Error as e:
+                print(f"PDF job {job_id} heartbeat error: {e}")
+
+
+# One queue object per (db, dir) inside each render process
+_worker_queues = {}
+
+
+def run_next_job(db_path, out_dir):
+    """Process pool entry point"""
+    queue = _worker_queues.get((db_path, out_dir))
+    if queue is None:
+        queue = _worker_queues[(db_path, out_dir)] = PdfJobQueue(db_path, out_dir)
+    return queue.run_next()
+
+
+# Per-process singleton (no connection or pool until first use)
+pdf_jobs = PdfJobQueue()
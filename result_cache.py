@@ -0,0 +1,201 @@
+"""
+Content-addressed result cache for FarmScan image analysis
+In-process LRU backed by an optional SQLite file shared across workers
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Set RESULT_CACHE_DB to an empty string to disable the shared disk tier
+RESULT_CACHE_DB = os.environ.get('RESULT_CACHE_DB', os.path.join(BASE_DIR, 'result_cache.db'))
+MEMORY_CACHE_SIZE = int(os.environ.get('RESULT_CACHE_MEMORY_SIZE', 512))
+DISK_CACHE_SIZE = int(os.environ.get('RESULT_CACHE_DISK_SIZE', 20000))
+
+# Trim the disk tier once every N writes instead of on every insert
+_DISK_TRIM_INTERVAL = 100
+
+
+def image_key(image, model_version, language='en'):
+    """
+    Cache key for a decoded image
+
+    Hashes the decoded pixels (not the upload bytes), so the same photo
+    re-sent after a network failure maps to the same key.
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(f"{image.mode}:{image.size[0]}x{image.size[1]}:".encode())
+    digest.update(image.tobytes())
+    return f"{digest.hexdigest()}:{model_version}:{language}"
+
+
+class ResultCache:
+    """
+    Two-tier LRU cache of JSON-serializable values
+
+    Memory tier: per-process OrderedDict, bounded by entry count.
+    Disk tier: SQLite file shared by all gunicorn workers, bounded by
+    entry count with least-recently-used eviction.
+    """
+
+    def __init__(self, table='result_cache', db_path=RESULT_CACHE_DB,
+                 memory_size=MEMORY_CACHE_SIZE, disk_size=DISK_CACHE_SIZE):
+        self.table = table
+        self.db_path = db_path
+        self.memory_size = memory_size
+        self.disk_size = disk_size
+
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._writes = 0
+        self._disk_ready = False
+
+        self.counters = {
+            'memory_hits': 0,
+            'disk_hits': 0,
+            'misses': 0,
+            'sets': 0,
+            'evictions': 0,
+            'disk_errors': 0
+        }
+
+    # ------------------------------------------------------------------
+    # Disk tier
+    # ------------------------------------------------------------------
+
+    def _disk(self):
+        """Per-thread (and per-process) connection to the disk tier"""
+        if not self.db_path:
+            return None
+
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+
+        conn = sqlite3.connect(self.db_path, timeout=5)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        if not self._disk_ready:
+            conn.execute(f'''
+                CREATE TABLE IF NOT EXISTS {self.table} (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    accessed REAL NOT NULL
+                )
+            ''')
+            conn.execute(f'CREATE INDEX IF NOT EXISTS idx_{self.table}_accessed ON {self.table} (accessed)')
+            conn.commit()
+            self._disk_ready = True
+
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def _disk_get(self, key):
+        try:
+            conn = self._disk()
+            if conn is None:
+                return None
+
+            row = conn.execute(f'SELECT value FROM {self.table} WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+
+            conn.execute(f'UPDATE {self.table} SET accessed = ? WHERE key = ?', (time.time(), key))
+            conn.commit()
+            return row[0]
+
+        except sqlite3.Error as e:
+            print(f"Result cache read error: {e}")
+            self.counters['disk_errors'] += 1
+            return None
+
+    def _disk_set(self, key, value):
+        try:
+            conn = self._disk()
+            if conn is None:
+                return
+
+            conn.execute(
+                f'INSERT OR REPLACE INTO {self.table} (key, value, accessed) VALUES (?, ?, ?)',
+                (key, value, time.time())
+            )
+
+            self._writes += 1
+            if self._writes % _DISK_TRIM_INTERVAL == 0:
+                cursor = conn.execute(f'''
+                    DELETE FROM {self.table} WHERE key IN (
+                        SELECT key FROM {self.table}
+                        ORDER BY accessed DESC
+                        LIMIT -1 OFFSET ?
+                    )
+                ''', (self.disk_size,))
+                self.counters['evictions'] += max(cursor.rowcount, 0)
+
+            conn.commit()
+
+        except sqlite3.Error as e:
+            print(f"Result cache write error: {e}")
+            self.counters['disk_errors'] += 1
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def _remember(self, key, value):
+        """Insert into the memory tier, evicting the least recently used"""
+        with self._lock:
+            self._memory[key] = value
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_size:
+                self._memory.popitem(last=False)
+                self.counters['evictions'] += 1
+
+    def get(self, key):
+        """Return the cached value for key, or None"""
+        with self._lock:
+            value = self._memory.get(key)
+            if value is not None:
+                self._memory.move_to_end(key)
+                self.counters['memory_hits'] += 1
+                return json.loads(value)
+
+        value = self._disk_get(key)
+        if value is None:
+            self.counters['misses'] += 1
+            return None
+
+        self.counters['disk_hits'] += 1
+        self._remember(key, value)
+        return json.loads(value)
+
+    def set(self, key, value):
+        """Store a JSON-serializable value in both tiers"""
+        encoded = json.dumps(value, ensure_ascii=False)
+        self._remember(key, encoded)
+        self._disk_set(key, encoded)
+        self.counters['sets'] += 1
+
+    def stats(self):
+        """Hit/miss counters and tier sizes"""
+        lookups = self.counters['memory_hits'] + self.counters['disk_hits'] + self.counters['misses']
+        hits = lookups - self.counters['misses']
+        return dict(
+            self.counters,
+            memory_entries=len(self._memory),
+            hit_ratio=round(hits / lookups, 3) if lookups else 0.0,
+            disk_enabled=bool(self.db_path)
+        )
+
+
+# Per-process singletons: analysis results, and (user, image) -> scan ID
+# so re-uploads of the same photo don't add duplicate history rows
+result_cache = ResultCache('result_cache')
+scan_index = ResultCache('scan_index')
@@ -0,0 +1,130 @@
+"""
+Scan artifacts for FarmScan
+Compact JPEG thumbnails in content-addressed files and compressed JSON
+analysis results, written once at analysis time so exports never need
+the photo uploaded again
+"""
+
+import hashlib
+import io
+import json
+import math
+import os
+import tempfile
+import zlib
+
+from PIL import Image
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Thumbnails live at <SCAN_IMAGE_DIR>/<2 hex>/<sha256>.jpg
+SCAN_IMAGE_DIR = os.environ.get('SCAN_IMAGE_DIR', os.path.join(BASE_DIR, 'scan_images'))
+
+# 768px covers the 5in report photo at ~150dpi
+THUMBNAIL_SIZE = int(os.environ.get('SCAN_THUMBNAIL_SIZE', 768))
+THUMBNAIL_QUALITY = int(os.environ.get('SCAN_THUMBNAIL_QUALITY', 80))
+
+RESULT_COMPRESSION_LEVEL = 6
+
+# Modes libjpeg can draft-decode, and modes reduce()/resize() handle without
+# converting first (anything else, e.g. palette PNGs, is converted up front)
+_DRAFT_MODES = ('RGB', 'L', 'CMYK', 'YCbCr')
+_RESAMPLE_MODES = ('RGB', 'RGBA', 'L', 'LA', 'I', 'F', 'CMYK', 'YCbCr')
+
+
+def make_thumbnail(image, max_side=THUMBNAIL_SIZE):
+    """
+    Decode an opened (not yet loaded) upload straight to thumbnail size
+
+    The image is shrunk before its colour mode is converted: JPEGs use
+    draft() at the smallest DCT scale whose longest side still covers
+    max_side, the rest is reduce()d and resized, and only the thumbnail
+    is converted to RGB. prepare_image() takes it on to analysis size.
+
+    Returns:
+        RGB PIL Image whose longest side is at most max_side
+    """
+    width, height = image.size
+    scale = max_side / max(width, height)
+    if scale < 1 and image.format == 'JPEG' and image.mode in _DRAFT_MODES:
+        # draft() needs both sides covered, so ask for the scaled size, not a square
+        image.draft(image.mode, (math.ceil(width * scale), math.ceil(height * scale)))
+
+    if image.mode not in _RESAMPLE_MODES:
+        image = image.convert('RGB')
+
+    factor = max(image.size) // max_side
+    if factor >= 2:
+        image = image.reduce(factor)
+
+    width, height = image.size
+    scale = max_side / max(width, height)
+    if scale < 1:
+        size = (max(1, round(width * scale)), max(1, round(height * scale)))
+        image = image.resize(size, Image.LANCZOS)
+
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    return image
+
+
+def encode_thumbnail(image):
+    """JPEG bytes of a thumbnail"""
+    buffer = io.BytesIO()
+    image.save(buffer, format='JPEG', quality=THUMBNAIL_QUALITY)
+    return buffer.getvalue()
+
+
+def thumbnail_path(image_hash, directory=SCAN_IMAGE_DIR):
+    """File for a stored thumbnail"""
+    return os.path.join(directory, image_hash[:2], f"{image_hash}.jpg")
+
+
+def store_thumbnail(data, directory=SCAN_IMAGE_DIR):
+    """
+    Write JPEG bytes under their SHA-256 (no-op if already stored)
+
+    Returns:
+        The hash, used as the scan's image_hash
+    """
+    image_hash = hashlib.sha256(data).hexdigest()
+    path = thumbnail_path(image_hash, directory)
+    if os.path.exists(path):
+        return image_hash
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except Exception:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+    return image_hash
+
+
+def open_thumbnail(image_hash, directory=SCAN_IMAGE_DIR):
+    """Stored thumbnail as a PIL Image, or None if it is missing"""
+    if not image_hash:
+        return None
+    try:
+        return Image.open(thumbnail_path(image_hash, directory))
+    except FileNotFoundError:
+        return None
+
+
+def pack_result(result):
+    """Analysis result dict -> compressed JSON bytes for the scans.result column"""
+    if result is None:
+        return None
+    raw = json.dumps(result, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return zlib.compress(raw, RESULT_COMPRESSION_LEVEL)
+
+
+def unpack_result(blob):
+    """Inverse of pack_result (None for scans saved before results were stored)"""
+    if blob is None:
+        return None
+    return json.loads(zlib.decompress(bytes(blob)))
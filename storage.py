@@ -0,0 +1,394 @@
+"""
+Pluggable storage backends for FarmScan
+SQLite (database.py, default) or PostgreSQL when DATABASE_URL is set
+"""
+
+import os
+import threading
+from abc import ABC, abstractmethod
+
+from passwords import KdfBusy, hash_password, verify_password, verify_unknown_user
+from scan_artifacts import pack_result, unpack_result
+
+DATABASE_URL = os.environ.get('DATABASE_URL', '')
+PG_POOL_MIN_SIZE = int(os.environ.get('PG_POOL_MIN_SIZE', 1))
+PG_POOL_MAX_SIZE = int(os.environ.get('PG_POOL_MAX_SIZE', 5))
+PG_POOL_TIMEOUT = float(os.environ.get('PG_POOL_TIMEOUT', 5))
+
+
+class Storage(ABC):
+    """
+    Interface implemented by every backend: users, languages and scans
+
+    Method signatures and return values match the functions in database.py.
+    """
+
+    name = 'base'
+
+    @abstractmethod
+    def init_db(self):
+        raise NotImplementedError
+
+    @abstractmethod
+    def create_user(self, name, phone, password):
+        raise NotImplementedError
+
+    @abstractmethod
+    def verify_user(self, phone, password):
+        raise NotImplementedError
+
+    @abstractmethod
+    def update_user_language(self, phone, language):
+        raise NotImplementedError
+
+    @abstractmethod
+    def save_scan(self, scan_data):
+        raise NotImplementedError
+
+    @abstractmethod
+    def save_scans(self, scan_list):
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_user_scans(self, phone, limit=50, before=None):
+        raise NotImplementedError
+
+    def iter_user_scans(self, phone, chunk_size=500):
+        """Every scan of a user, newest first, fetched in keyset-paginated chunks"""
+        before = None
+        while True:
+            scans = self.get_user_scans(phone, chunk_size, before)
+            yield from scans
+            if len(scans) < chunk_size:
+                return
+            before = (scans[-1]['date'], scans[-1]['id'])
+
+    @abstractmethod
+    def get_scan_by_id(self, scan_id, user_phone):
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_all_users(self):
+        raise NotImplementedError
+
+
+# ============================================================================
+# SQLITE
+# ============================================================================
+
+class SQLiteStorage(Storage):
+    """Local farmscan.db - delegates to the functions in database.py"""
+
+    name = 'sqlite'
+
+    def __init__(self):
+        import database
+        self._db = database
+
+    def init_db(self):
+        return self._db.init_db()
+
+    def create_user(self, name, phone, password):
+        return self._db.create_user(name, phone, password)
+
+    def verify_user(self, phone, password):
+        return self._db.verify_user(phone, password)
+
+    def update_user_language(self, phone, language):
+        return self._db.update_user_language(phone, language)
+
+    def save_scan(self, scan_data):
+        return self._db.save_scan(scan_data)
+
+    def save_scans(self, scan_list):
+        return self._db.save_scans(scan_list)
+
+    def get_user_scans(self, phone, limit=50, before=None):
+        return self._db.get_user_scans(phone, limit, before)
+
+    def get_scan_by_id(self, scan_id, user_phone):
+        return self._db.get_scan_by_id(scan_id, user_phone)
+
+    def get_all_users(self):
+        return self._db.get_all_users()
+
+
+# ============================================================================
+# POSTGRESQL
+# ============================================================================
+
+# Timestamps are whole-second UTC and returned in SQLite's text format,
+# so history cursors round-trip exactly between backends
+_PG_DATE = "to_char(date, 'YYYY-MM-DD HH24:MI:SS') AS date"
+
+_PG_SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS users (
+        id BIGSERIAL PRIMARY KEY,
+        name TEXT NOT NULL,
+        phone TEXT UNIQUE NOT NULL,
+        password_hash TEXT NOT NULL,
+        language TEXT DEFAULT NULL,
+        created_at TIMESTAMP(0) DEFAULT (now() AT TIME ZONE 'utc')
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS scans (
+        id BIGSERIAL PRIMARY KEY,
+        user_phone TEXT NOT NULL REFERENCES users(phone),
+        disease_name TEXT NOT NULL,
+        confidence REAL NOT NULL,
+        severity TEXT NOT NULL,
+        treatment TEXT,
+        date TIMESTAMP(0) DEFAULT (now() AT TIME ZONE 'utc')
+    )
+    ''',
+    '''
+    CREATE INDEX IF NOT EXISTS idx_scans_user_date
+    ON scans (user_phone, date DESC, id DESC)
+    ''',
+    'ALTER TABLE scans ADD COLUMN IF NOT EXISTS result BYTEA',
+    'ALTER TABLE scans ADD COLUMN IF NOT EXISTS image_hash TEXT',
+]
+
+# Arbitrary key for pg_advisory_lock so only one worker runs the DDL
+_PG_SCHEMA_LOCK = 73102026
+
+
+class PostgresStorage(Storage):
+    """
+    PostgreSQL via a psycopg 3 connection pool
+
+    prepare_threshold=0 makes psycopg prepare every statement server-side
+    on first use, so repeated queries skip parsing and planning. The pool
+    is created lazily per process, so it is safe with gunicorn --preload.
+    """
+
+    name = 'postgresql'
+
+    def __init__(self, url, min_size=PG_POOL_MIN_SIZE, max_size=PG_POOL_MAX_SIZE):
+        try:
+            import psycopg
+            from psycopg.rows import dict_row
+            from psycopg_pool import ConnectionPool
+        except ImportError as e:
+            raise RuntimeError(
+                "PostgreSQL backend needs psycopg and psycopg-pool "
+                "(pip install 'psycopg[binary]' psycopg-pool)"
+            ) from e
+
+        self.url = url
+        self.min_size = min_size
+        self.max_size = max_size
+
+        self._psycopg = psycopg
+        self._dict_row = dict_row
+        self._pool_class = ConnectionPool
+        self._pool = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        """Borrow a pooled connection (context manager commits on success)"""
+        if self._pool is None or self._pid != os.getpid():
+            with self._lock:
+                if self._pool is None or self._pid != os.getpid():
+                    self._pool = self._pool_class(
+                        self.url,
+                        min_size=self.min_size,
+                        max_size=self.max_size,
+                        timeout=PG_POOL_TIMEOUT,
+                        kwargs={'row_factory': self._dict_row, 'prepare_threshold': 0},
+                        open=True
+                    )
+                    self._pid = os.getpid()
+        return self._pool.connection()
+
+    def init_db(self):
+        """Create tables and indexes (idempotent, serialized across workers)"""
+        # Direct connection: no pool threads in the gunicorn master
+        with self._psycopg.connect(self.url, autocommit=True) as conn:
+            conn.execute('SELECT pg_advisory_lock(%s)', (_PG_SCHEMA_LOCK,))
+            try:
+                for statement in _PG_SCHEMA:
+                    conn.execute(statement)
+            finally:
+                conn.execute('SELECT pg_advisory_unlock(%s)', (_PG_SCHEMA_LOCK,))
+        print("✅ Database initialized successfully (postgresql)")
+
+    def create_user(self, name, phone, password):
+        try:
+            phone = phone.strip()
+            with self._connection() as conn:
+                conn.execute(
+                    'INSERT INTO users (name, phone, password_hash) VALUES (%s, %s, %s)',
+                    (name, phone, hash_password(password))
+                )
+            return {'name': name, 'phone': phone, 'language': None}
+
+        except self._psycopg.errors.UniqueViolation as e:
+            print("INTEGRITY ERROR:", e)
+            return None
+
+        except KdfBusy:
+            raise  # Overloaded - the caller answers 503
+
+        except Exception as e:
+            print("CREATE USER ERROR:", e)
+            return None
+
+    def verify_user(self, phone, password):
+        try:
+            phone = phone.strip()
+            with self._connection() as conn:
+                row = conn.execute(
+                    'SELECT name, phone, language, password_hash FROM users WHERE phone = %s',
+                    (phone,)
+                ).fetchone()
+
+            if not row:
+                # Same KDF cost as a wrong password, so timing does not reveal accounts
+                verify_unknown_user(password)
+                return None
+
+            matches, needs_rehash = verify_password(password, row['password_hash'])
+            if not matches:
+                return None
+
+            if needs_rehash:
+                with self._connection() as conn:
+                    conn.execute(
+                        'UPDATE users SET password_hash = %s WHERE phone = %s AND password_hash = %s',
+                        (hash_password(password), phone, row['password_hash'])
+                    )
+
+            return {'name': row['name'], 'phone': row['phone'], 'language': row['language']}
+
+        except KdfBusy:
+            raise  # Overloaded - the caller answers 503
+
+        except Exception as e:
+            print("VERIFY USER ERROR:", e)
+            return None
+
+    def update_user_language(self, phone, language):
+        try:
+            with self._connection() as conn:
+                conn.execute('UPDATE users SET language = %s WHERE phone = %s', (language, phone))
+            return True
+
+        except Exception as e:
+            print(f"Error updating language: {e}")
+            return False
+
+    def save_scan(self, scan_data):
+        scan_ids = self.save_scans([scan_data])
+        return scan_ids[0] if scan_ids else None
+
+    def save_scans(self, scan_list):
+        if not scan_list:
+            return []
+
+        try:
+            scan_ids = []
+            with self._connection() as conn:
+                for scan_data in scan_list:
+                    row = conn.execute('''
+                        INSERT INTO scans (user_phone, disease_name, confidence, severity, treatment, result, image_hash)
+                        VALUES (%s, %s, %s, %s, %s, %s, %s)
+                        RETURNING id
+                    ''', (
+                        scan_data['user_phone'],
+                        scan_data['disease_name'],
+                        scan_data['confidence'],
+                        scan_data['severity'],
+                        scan_data['treatment'],
+                        pack_result(scan_data.get('result')),
+                        scan_data.get('image_hash')
+                    )).fetchone()
+                    scan_ids.append(row['id'])
+            return scan_ids
+
+        except Exception as e:
+            print(f"Error saving scan batch: {e}")
+            return None
+
+    def get_user_scans(self, phone, limit=50, before=None):
+        try:
+            with self._connection() as conn:
+                if before is None:
+                    rows = conn.execute(f'''
+                        SELECT id, disease_name, confidence, severity, treatment, {_PG_DATE}
+                        FROM scans
+                        WHERE user_phone = %s
+                        ORDER BY scans.date DESC, id DESC
+                        LIMIT %s
+                    ''', (phone, limit)).fetchall()
+                else:
+                    rows = conn.execute(f'''
+                        SELECT id, disease_name, confidence, severity, treatment, {_PG_DATE}
+                        FROM scans
+                        WHERE user_phone = %s AND (scans.date, id) < (%s::timestamp, %s)
+                        ORDER BY scans.date DESC, id DESC
+                        LIMIT %s
+                    ''', (phone, before[0], before[1], limit)).fetchall()
+            return [dict(row) for row in rows]
+
+        except Exception as e:
+            print(f"Error getting scans: {e}")
+            return []
+
+    def get_scan_by_id(self, scan_id, user_phone):
+        try:
+            with self._connection() as conn:
+                row = conn.execute(f'''
+                    SELECT id, disease_name, confidence, severity, treatment, {_PG_DATE}, result, image_hash
+                    FROM scans
+                    WHERE id = %s AND user_phone = %s
+                ''', (scan_id, user_phone)).fetchone()
+            if not row:
+                return None
+            return dict(row, result=unpack_result(row['result']))
+
+        except Exception as e:
+            print(f"Error getting scan by ID: {e}")
+            return None
+
+    def get_all_users(self):
+        try:
+            with self._connection() as conn:
+                rows = conn.execute(
+                    "SELECT name, phone, language, to_char(created_at, 'YYYY-MM-DD HH24:MI:SS') AS created_at FROM users"
+                ).fetchall()
+            return [dict(row) for row in rows]
+
+        except Exception as e:
+            print(f"Error getting users: {e}")
+            return []
+
+
+# ============================================================================
+# BACKEND SELECTION
+# ============================================================================
+
+def create_storage(url=DATABASE_URL):
+    """PostgreSQL for postgres:// / postgresql:// URLs, SQLite otherwise"""
+    if url.startswith(('postgres://', 'postgresql://')):
+        return PostgresStorage(url)
+    return SQLiteStorage()
+
+
+storage = create_storage()
+print(f"📦 STORAGE BACKEND: {storage.name}")
+
+# Module-level API mirroring database.py
+init_db = storage.init_db
+create_user = storage.create_user
+verify_user = storage.verify_user
+update_user_language = storage.update_user_language
+save_scan = storage.save_scan
+save_scans = storage.save_scans
+get_user_scans = storage.get_user_scans
+iter_user_scans = storage.iter_user_scans
+get_scan_by_id = storage.get_scan_by_id
+get_all_users = storage.get_all_users
@@ -0,0 +1,51 @@
+"""
+Shared fixtures for the FarmScan test suite
+Every test gets its own SQLite file; nothing touches farmscan.db
+"""
+
+import os
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Caches, queues and indexes are opened at import time - keep them all
+# out of the working tree (and never load a real trained model)
+_TMP = tempfile.mkdtemp(prefix='farmscan-tests-')
+for _name, _file in (
+    ('FARMSCAN_DB', 'farmscan.db'),
+    ('FARMSCAN_MODEL_PATH', 'ml_model.pkl'),
+    ('RESULT_CACHE_DB', 'result_cache.db'),
+    ('NEWS_CACHE_DB', 'news_cache.db'),
+    ('PDF_JOBS_DB', 'pdf_jobs.db'),
+    ('PDF_JOBS_DIR', 'pdf_jobs'),
+    ('REPORT_CACHE_DIR', 'report_cache'),
+    ('SCAN_IMAGE_DIR', 'scan_images'),
+    ('CHAT_INDEX_DIR', 'chat_index'),
+):
+    os.environ[_name] = os.path.join(_TMP, _file)
+
+import database
+
+
+@pytest.fixture
+def sqlite_db(tmp_path, monkeypatch):
+    """Fresh, migrated SQLite database for this test"""
+    monkeypatch.setattr(database, 'DATABASE_FILE', str(tmp_path / 'farmscan.db'))
+    database._pool.__dict__.clear()
+    database.init_db()
+    yield database.DATABASE_FILE
+    database._pool.__dict__.clear()
+
+
+@pytest.fixture
+def client(sqlite_db):
+    """Flask test client logged in as a freshly registered user"""
+    import app as app_module
+
+    client = app_module.app.test_client()
+    response = client.post('/api/register', json={'name': 'Asha', 'phone': '9000000001', 'password': 'secret'})
+    assert response.status_code == 200, response.data
+    return client
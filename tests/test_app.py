@@ -0,0 +1,59 @@
+"""
+/api/analyze-batch: per-item results in input order, one transaction
+"""
+
+import base64
+import io
+
+import numpy as np
+from PIL import Image
+
+import app as app_module
+
+
+def _jpeg(color, size=(320, 240)):
+    rgb = np.zeros((size[1], size[0], 3), dtype=np.uint8)
+    rgb[...] = color
+    buffer = io.BytesIO()
+    Image.fromarray(rgb).save(buffer, format='JPEG')
+    return buffer.getvalue()
+
+
+def _post_batch(client, images):
+    files = [(io.BytesIO(data), f'{i}.jpg') for i, data in enumerate(images)]
+    return client.post('/api/analyze-batch', data={'images': files}, content_type='multipart/form-data')
+
+
+def test_results_follow_input_order(client):
+    images = [_jpeg((40, 140, 40)), b'not an image', _jpeg((120, 80, 30))]
+    response = _post_batch(client, images)
+    assert response.status_code == 200
+
+    body = response.get_json()
+    assert body['count'] == 3 and body['failed'] == 1
+    assert [item['index'] for item in body['results']] == [0, 1, 2]
+
+    assert body['results'][1] == {'index': 1, 'success': False, 'error': 'Invalid image (UnidentifiedImageError)'}
+
+    ok = [body['results'][0], body['results'][2]]
+    assert all(item['success'] for item in ok)
+    assert ok[0]['scanId'] < ok[1]['scanId']
+
+    history = client.get('/api/history').get_json()['scans']
+    assert sorted(scan['id'] for scan in history) == [ok[0]['scanId'], ok[1]['scanId']]
+
+
+def test_batch_cap(client):
+    image = base64.b64encode(_jpeg((40, 140, 40))).decode()
+    response = client.post('/api/analyze-batch', json={'images': [image] * (app_module.MAX_BATCH_IMAGES + 1)})
+    assert response.status_code == 400
+    assert 'Too many images' in response.get_json()['error']
+
+
+def test_failed_save_is_an_error(client, monkeypatch):
+    monkeypatch.setattr(app_module, 'save_scans', lambda scans: None)
+    response = _post_batch(client, [_jpeg((40, 140, 40)), _jpeg((120, 80, 30))])
+
+    assert response.status_code == 500
+    assert 'results' not in response.get_json()
+    assert client.get('/api/history').get_json()['scans'] == []
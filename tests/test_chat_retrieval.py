@@ -0,0 +1,85 @@
+"""
+Offline BM25 chat index: ranking, score cutoff and on-disk reuse
+"""
+
+import json
+import os
+
+import pytest
+
+import chat_retrieval
+import chatbot
+from chat_retrieval import load_index
+
+CORPUS = {'entries': [
+    {'question': 'Why are my tomato leaves turning yellow?', 'answer': 'Yellow tomato leaves: check nitrogen.'},
+    {'question': 'How do I store wheat after harvest?', 'answer': 'Dry wheat grain below 12% moisture.'},
+    {'question': 'When should I irrigate rice?', 'answer': 'Keep 5 cm of standing water in rice fields.'},
+]}
+RESPONSES = {'responses': {
+    'general': {'default': {'en': 'Ask me anything about farming.'}},
+    'pest': {'aphid': {'en': 'Spray neem oil on aphid colonies.'}},
+}}
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    corpus_path = tmp_path / 'corpus.json'
+    responses_path = tmp_path / 'responses.json'
+    corpus_path.write_text(json.dumps(CORPUS), encoding='utf-8')
+    responses_path.write_text(json.dumps(RESPONSES), encoding='utf-8')
+    return str(corpus_path), str(responses_path)
+
+
+def test_ranking(tmp_path, corpus):
+    index = load_index(str(tmp_path / 'index'), *corpus)
+    # 3 corpus entries + the pest answer ('general' is never indexed)
+    assert len(index.docs) == 4
+
+    hits = index.search('storing my wheat harvest', k=3)
+    assert hits[0][0] == 1
+    assert [score for _, score in hits] == sorted((score for _, score in hits), reverse=True)
+
+    assert index.docs[index.search('aphids on my okra', k=1)[0][0]] == {'intent': 'pest', 'sub_intent': 'aphid'}
+    assert index.search('the and of') == []
+    assert index.search('zucchini') == []
+
+
+def test_index_is_built_once_and_reused(tmp_path, corpus, monkeypatch):
+    index_dir = str(tmp_path / 'index')
+    first = load_index(index_dir, *corpus)
+    assert os.path.basename(first.path) == chat_retrieval.fingerprint(*corpus)
+    assert sorted(os.listdir(first.path)) == ['docs.json', 'indptr.npy', 'postings.npy', 'vocab.json', 'weights.npy']
+
+    def no_rebuild(*args):
+        raise AssertionError('index rebuilt')
+    monkeypatch.setattr(chat_retrieval, 'build_index', no_rebuild)
+
+    second = load_index(index_dir, *corpus)
+    assert second.path == first.path
+    assert second.search('irrigate rice') == first.search('irrigate rice')
+
+
+def test_changed_corpus_gets_a_new_index(tmp_path, corpus):
+    index_dir = str(tmp_path / 'index')
+    old = load_index(index_dir, *corpus)
+
+    changed = dict(CORPUS, entries=CORPUS['entries'] + [{'question': 'Best maize seed?', 'answer': 'Use hybrid maize.'}])
+    with open(corpus[0], 'w', encoding='utf-8') as f:
+        json.dump(changed, f)
+
+    new = load_index(index_dir, *corpus)
+    assert new.path != old.path and len(new.docs) == 5
+    assert os.listdir(index_dir) == [os.path.basename(new.path)]
+
+
+@pytest.mark.skipif(chatbot.chat_index is None, reason='chat index unavailable')
+def test_min_score_cutoff(monkeypatch):
+    question = 'why are my leaves turning yellow'
+    doc, score = chatbot.chat_index.search(question, k=1)[0]
+
+    monkeypatch.setattr(chatbot, 'RETRIEVAL_MIN_SCORE', score - 0.01)
+    assert chatbot.retrieve(question) is not None
+
+    monkeypatch.setattr(chatbot, 'RETRIEVAL_MIN_SCORE', score + 0.01)
+    assert chatbot.retrieve(question) is None
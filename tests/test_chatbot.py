@@ -0,0 +1,106 @@
+"""Chatbot intent routing and conversation history"""
+
+import pytest
+
+import chatbot
+from chatbot import ConversationStore, classify
+
+
+@pytest.mark.parametrize('message, intent', [
+    ('hi there', 'greeting'),
+    ('hello, how are you?', 'greeting'),
+    ('his tomato leaves have blight', 'disease'),
+    ('what fertilizer for his wheat', 'fertilizer'),
+    ('is this soil too acidic', 'soil'),
+    ('this plant has spots', 'disease'),
+    ('my phone number changed', 'general'),
+    ('thanks a lot', 'farewell'),
+    ('when is the pm kisan payment', 'government'),
+])
+def test_intent(message, intent):
+    assert classify(message.lower())[0] == intent
+
+
+@pytest.mark.parametrize('message, sub_intent', [
+    ('brown spots on leaves', ('disease', 'spot')),
+    ('what is the right npk ratio', ('fertilizer', 'npk')),
+    ('how do i check ph', ('soil', 'ph')),
+])
+def test_sub_intent(message, sub_intent):
+    assert classify(message.lower()) == sub_intent
+
+
+def test_short_keywords_are_not_inflected():
+    assert classify('his')[0] == 'general'
+    assert classify('hies')[0] == 'general'
+    assert classify('planting season')[0] == 'planting'
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(chatbot.time, 'time', clock)
+    return clock
+
+
+def _message(n, clock):
+    return {'role': 'user', 'message': f'message {n}', 'timestamp': clock.now}
+
+
+def test_history_is_a_ring_buffer(clock):
+    store = ConversationStore(history_size=4, db_path='')
+    for n in range(10):
+        store.append('a', _message(n, clock))
+    assert [m['message'] for m in store.history('a')] == ['message 6', 'message 7', 'message 8', 'message 9']
+
+
+def test_least_recently_used_session_is_evicted(clock):
+    store = ConversationStore(max_sessions=2, db_path='')
+    store.append('a', _message(1, clock))
+    store.append('b', _message(2, clock))
+    store.append('a', _message(3, clock))  # 'b' is now the least recently used
+    store.append('c', _message(4, clock))
+
+    assert store.history('b') == []
+    assert len(store.history('a')) == 2 and len(store.history('c')) == 1
+    assert store.stats()['evicted'] == 1 and store.stats()['sessions'] == 2
+
+
+def test_idle_session_expires(clock):
+    store = ConversationStore(ttl=60, db_path='')
+    store.append('a', _message(1, clock))
+    clock.now += 30
+    store.append('b', _message(2, clock))
+    assert len(store.history('a')) == 1
+
+    clock.now += 45  # 'a' idle for 75s, 'b' for 45s
+    assert store.history('a') == []
+    store.append('c', _message(3, clock))
+    assert store.counters['expired'] == 1
+    assert store.stats()['sessions'] == 2
+
+
+def test_history_reloads_from_disk(tmp_path, clock):
+    db_path = str(tmp_path / 'chat.db')
+    first = ConversationStore(history_size=3, ttl=60, db_path=db_path)
+    for n in range(5):
+        first.append('a', _message(n, clock))
+
+    # Another worker (or a restart) sees the same trimmed history
+    second = ConversationStore(history_size=3, ttl=60, db_path=db_path)
+    assert [m['message'] for m in second.history('a')] == ['message 2', 'message 3', 'message 4']
+    assert second.counters['disk_loads'] == 1
+    rows = second._disk().execute('SELECT COUNT(*) FROM chat_history').fetchone()[0]
+    assert rows == 3
+
+    # Expired rows are not reloaded
+    clock.now += 61
+    assert ConversationStore(history_size=3, ttl=60, db_path=db_path).history('a') == []
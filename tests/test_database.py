@@ -0,0 +1,93 @@
+"""
+Connection handling across gunicorn --preload forks
+"""
+
+import os
+
+import pytest
+
+import database
+
+
+def test_init_db_leaves_no_pooled_connection(sqlite_db):
+    database._pool.__dict__.clear()
+    database.init_db()
+    assert getattr(database._pool, 'conn', None) is None
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='needs os.fork')
+def test_forked_worker_opens_its_own_connection(sqlite_db):
+    parent = database.get_db_connection()
+
+    pid = os.fork()
+    if pid == 0:
+        ok = False
+        try:
+            conn = database.get_db_connection()
+            conn.execute('SELECT COUNT(*) FROM users').fetchone()
+            ok = conn is not parent and database._inherited == [parent]
+        finally:
+            os._exit(0 if ok else 1)
+
+    _, status = os.waitpid(pid, 0)
+    assert os.waitstatus_to_exitcode(status) == 0
+
+    # The parent's handle still works after the child exited
+    assert database.get_db_connection() is parent
+    parent.execute('SELECT COUNT(*) FROM users').fetchone()
+
+
+def test_old_schema_needs_offline_migration(sqlite_db, monkeypatch):
+    conn = database.get_db_connection()
+    conn.execute('PRAGMA user_version = 1')
+    conn.commit()
+
+    monkeypatch.setattr(database, 'DB_MIGRATE_ON_BOOT', False)
+    with pytest.raises(RuntimeError, match='python database.py'):
+        database.init_db()
+
+    monkeypatch.setattr(database, 'DB_MIGRATE_ON_BOOT', True)
+    database.init_db()
+    assert database.get_schema_version(conn) == database.SCHEMA_VERSION
+
+
+def test_backfill_commits_every_batch(sqlite_db, monkeypatch):
+    conn = database._open_connection()
+    rows = 2 * database.BACKFILL_BATCH_SIZE + 1
+    conn.executemany("INSERT INTO scans (user_phone, disease_name, confidence, severity) VALUES ('1', ?, 0.9, 'Low')",
+                     [(f'Disease {n}',) for n in range(rows)])
+    conn.commit()
+
+    def schema_step(conn):
+        database._add_column_if_missing(conn, 'scans', 'disease_key', 'TEXT')
+
+    changed = []
+    def backfill_step(conn):
+        changed.append(database._backfill_in_batches(conn, '''
+            UPDATE scans SET disease_key = lower(disease_name)
+            WHERE id IN (SELECT id FROM scans WHERE disease_key IS NULL LIMIT ?)
+        '''))
+
+    # A throwaway migration appended to the shipped ones
+    monkeypatch.setattr(database, 'MIGRATIONS', database.MIGRATIONS + [(4, 'disease key', schema_step, backfill_step)])
+    monkeypatch.setattr(database, 'SCHEMA_VERSION', 4)
+
+    statements = []
+    conn.set_trace_callback(statements.append)
+    assert database.migrate(conn) == 4
+    conn.set_trace_callback(None)
+
+    assert changed == [rows]
+    assert conn.execute('SELECT COUNT(*) FROM scans WHERE disease_key IS NULL').fetchone()[0] == 0
+    assert database.get_schema_version(conn) == 4
+
+    # Three batches of at most BACKFILL_BATCH_SIZE rows, then an empty one - each committed on its own
+    updates = [i for i, sql in enumerate(statements) if sql.lstrip().startswith('UPDATE scans')]
+    assert len(updates) == 4
+    assert all(statements[i + 1] == 'COMMIT' for i in updates)
+
+    statements.clear()
+    conn.set_trace_callback(statements.append)
+    assert database.migrate(conn) == 4  # already applied
+    assert not any(sql.lstrip().startswith('UPDATE') for sql in statements)
+    conn.close()
@@ -0,0 +1,66 @@
+"""
+Feature extraction: fixed vector layout and analysis-size decoding
+"""
+
+import os
+import subprocess
+import sys
+
+import numpy as np
+from PIL import Image
+
+import local_model
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _leaf(size=(640, 480)):
+    rgb = np.zeros((size[1], size[0], 3), dtype=np.uint8)
+    rgb[...] = (50, 140, 40)
+    rgb[size[1] // 3:size[1] // 2, size[0] // 3:size[0] // 2] = (120, 80, 30)  # a brown lesion
+    return Image.fromarray(rgb)
+
+
+def test_vector_is_fixed_length_float32():
+    features = local_model.extract_all_features(_leaf())
+    assert set(features) == {name for name, _ in local_model.FEATURE_LAYOUT}
+
+    vector = local_model.features_to_vector(features)
+    assert local_model.FEATURE_LENGTH == 57
+    assert vector.shape == (57,)
+    assert vector.dtype == np.float32
+    assert np.isfinite(vector).all()
+
+    # Same picture at another resolution -> (nearly) the same vector
+    small = local_model.features_to_vector(local_model.extract_all_features(_leaf((320, 240))))
+    assert np.allclose(vector[:6], small[:6], atol=2.0)
+
+
+def _jpeg_file(tmp_path, size):
+    path = tmp_path / 'leaf.jpg'
+    _leaf(size).save(path, format='JPEG')
+    return path
+
+
+def test_prepare_image_shrinks_to_max_side(tmp_path):
+    path = _jpeg_file(tmp_path, (4000, 3000))
+
+    image = local_model.prepare_image(Image.open(path))
+    assert image.mode == 'RGB'
+    assert max(image.size) == local_model.ANALYSIS_SIZE
+
+    assert max(local_model.prepare_image(Image.open(path), max_side=100).size) == 100
+
+    # Small images are never enlarged
+    small = local_model.prepare_image(Image.open(_jpeg_file(tmp_path, (120, 90))))
+    assert small.size == (120, 90)
+
+
+def test_analysis_size_comes_from_the_environment(tmp_path):
+    path = _jpeg_file(tmp_path, (4000, 3000))
+    code = ('import sys; from PIL import Image; import local_model; '
+            'print(local_model.ANALYSIS_SIZE, max(local_model.prepare_image(Image.open(sys.argv[1])).size))')
+    env = dict(os.environ, FARMSCAN_ANALYSIS_SIZE='128')
+    output = subprocess.run([sys.executable, '-c', code, str(path)], env=env, cwd=ROOT,
+                            capture_output=True, text=True, check=True).stdout
+    assert output.splitlines()[-1].split() == ['128', '128']
@@ -0,0 +1,219 @@
+"""
+News cache and refresher - feeds are never fetched over the network
+"""
+
+import gzip
+import json
+import os
+import time
+
+import pytest
+
+import news_api
+from news_api import NewsCache, NewsRefresher
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = NewsCache(str(tmp_path / 'news_cache.db'))
+    monkeypatch.setattr(news_api, 'news_cache', cache)
+    return cache
+
+
+def test_lease_excludes_a_second_refresher(cache):
+    # A live lease held by another worker
+    conn = cache._conn()
+    conn.execute("INSERT INTO news_lease (name, holder, expires) VALUES ('refresh', ?, ?)",
+                 (os.getpid() + 1, time.time() + 60))
+    conn.commit()
+    assert not cache.acquire_lease()
+
+    # ...until it expires
+    conn.execute("UPDATE news_lease SET expires = ?", (time.time() - 1,))
+    conn.commit()
+    assert cache.acquire_lease()
+    assert cache.acquire_lease()  # re-entrant for the holder
+
+    cache.release_lease()
+    assert conn.execute('SELECT COUNT(*) FROM news_lease').fetchone()[0] == 0
+
+
+def test_refresher_skips_while_lease_is_held(cache, monkeypatch):
+    calls = []
+    monkeypatch.setattr(news_api, 'fetch_feeds', lambda urls: calls.append(urls) or {})
+
+    conn = cache._conn()
+    conn.execute("INSERT INTO news_lease (name, holder, expires) VALUES ('refresh', ?, ?)",
+                 (os.getpid() + 1, time.time() + 60))
+    conn.commit()
+
+    NewsRefresher(cache, interval=900).run_once()
+    assert calls == []
+
+
+def test_failed_refresh_waits_for_the_interval(cache, monkeypatch):
+    calls = []
+    monkeypatch.setattr(news_api, 'fetch_feeds', lambda urls: calls.append(urls) or {})
+
+    refresher = NewsRefresher(cache, interval=900)
+    refresher.run_once()
+    refresher.run_once()
+    NewsRefresher(cache, interval=900).run_once()  # another worker
+
+    # Every feed failed, so no category was stored - but one fetch per interval
+    assert len(calls) == 1
+    assert cache.oldest_fetch() == 0
+
+    cache._conn().execute("UPDATE news_refresh SET attempted_at = attempted_at - 901")
+    cache._conn().commit()
+    refresher.run_once()
+    assert len(calls) == 2
+
+
+def test_circuit_breaker_opens_cools_down_and_retries_once(cache, monkeypatch):
+    url = 'https://feeds.example/down.xml'
+    breaker = news_api.FeedCircuitBreaker(threshold=2, cooldown=0.2)
+    monkeypatch.setattr(news_api, 'feed_breaker', breaker)
+
+    calls = []
+    def get(url, **kwargs):
+        calls.append(url)
+        raise news_api.requests.ConnectionError('down')
+    monkeypatch.setattr(news_api.requests, 'get', get)
+
+    # Two failures open the breaker; the third refresh skips the feed
+    for _ in range(3):
+        assert news_api.fetch_feeds([url, url]) == {}
+    assert len(calls) == 2
+    assert breaker.stats()[url] == {'failures': 2, 'open': True}
+
+    # After the cooldown a single trial request is let through...
+    time.sleep(0.25)
+    news_api.fetch_feeds([url])
+    assert len(calls) == 3
+
+    # ...and its failure re-opens the breaker straight away
+    news_api.fetch_feeds([url])
+    assert len(calls) == 3
+    assert breaker.stats()[url]['open']
+
+
+def test_circuit_breaker_closes_on_success(cache, monkeypatch):
+    url = 'https://feeds.example/flaky.xml'
+    breaker = news_api.FeedCircuitBreaker(threshold=2, cooldown=60)
+    monkeypatch.setattr(news_api, 'feed_breaker', breaker)
+    monkeypatch.setattr(news_api, 'fetch_feed', lambda url: [{'title': 'ok'}])
+
+    breaker.record_failure(url)
+    assert news_api.fetch_feeds([url]) == {url: [{'title': 'ok'}]}
+    assert breaker.stats() == {}
+
+
+RSS = b"""<?xml version="1.0"?>
+<rss version="2.0"><channel><title>Farm Wire</title>
+<item><title>Wheat prices rise</title><link>https://farm.example/1</link>
+<pubDate>Mon, 05 Jan 2026 10:00:00 GMT</pubDate></item>
+<item><title>Rain expected</title><link>https://farm.example/2</link></item>
+</channel></rss>"""
+
+
+class _Response:
+    def __init__(self, status_code=200, content=b'', headers=None):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise news_api.requests.HTTPError(f'{self.status_code}')
+
+
+def test_not_modified_reuses_stored_articles(cache, monkeypatch):
+    url = 'https://feeds.example/farm.xml'
+    requests_seen = []
+    responses = [
+        _Response(200, RSS, {'ETag': '"v1"', 'Last-Modified': 'Mon, 05 Jan 2026 10:00:00 GMT'}),
+        _Response(304),
+    ]
+    def get(url, headers=None, **kwargs):
+        requests_seen.append(headers)
+        return responses.pop(0)
+    monkeypatch.setattr(news_api.requests, 'get', get)
+
+    first = news_api.fetch_feed(url)
+    assert [a['title'] for a in first] == ['Wheat prices rise', 'Rain expected']
+    assert 'If-None-Match' not in requests_seen[0]
+
+    second = news_api.fetch_feed(url)
+    assert requests_seen[1]['If-None-Match'] == '"v1"'
+    assert requests_seen[1]['If-Modified-Since'] == 'Mon, 05 Jan 2026 10:00:00 GMT'
+    assert [a['title'] for a in second] == ['Wheat prices rise', 'Rain expected']
+    assert second[0]['source'] == 'Farm Wire'
+
+    assert cache.feed_stats() == {url: {'fetches': 2, 'not_modified': 1, 'not_modified_ratio': 0.5}}
+
+
+
+ARTICLES = [{'title': 'Wheat prices rise', 'source': 'Farm Wire', 'time': '2h ago'},
+            {'title': 'बारिश की संभावना', 'source': 'IMD', 'time': '1h ago'}]
+
+
+def test_payload_bodies_and_etag():
+    payload = news_api.render_news_payload(ARTICLES)
+
+    assert json.loads(payload['identity']) == {'news': ARTICLES}
+    assert gzip.decompress(payload['gzip']) == payload['identity']
+    if news_api.brotli is not None:
+        assert news_api.brotli.decompress(payload['br']) == payload['identity']
+    else:
+        assert payload['br'] is None
+
+    # Same articles -> same bytes and ETag; different articles -> new ETag
+    again = news_api.render_news_payload([dict(article) for article in ARTICLES])
+    assert again == payload
+    assert news_api.render_news_payload(ARTICLES[:1])['etag'] != payload['etag']
+
+
+def test_cached_payload_round_trip(cache):
+    cache.put('crops', ARTICLES)
+    payload = cache.get_payload('crops', 'hi')
+    assert payload == news_api.render_news_payload(ARTICLES)
+    assert cache.get_payload('crops', 'hi') is payload  # served from memory while the ETag matches
+
+
+@pytest.mark.parametrize('accept, encoding', [
+    ('br, gzip', 'br'),
+    ('gzip', 'gzip'),
+    ('', 'identity'),
+])
+def test_payload_response_picks_encoding(accept, encoding):
+    from app import app, news_payload_response
+
+    # A stand-in brotli body, so the choice is tested without the package
+    payload = dict(news_api.render_news_payload(ARTICLES), br=b'brotli-bytes')
+    with app.test_request_context(headers={'Accept-Encoding': accept}):
+        response = news_payload_response(payload)
+
+    assert response.status_code == 200
+    assert response.get_data() == payload[encoding]
+    assert response.headers.get('Content-Encoding') == (None if encoding == 'identity' else encoding)
+    assert response.headers['Vary'] == 'Accept-Encoding'
+
+    etag, weak = response.get_etag()
+    assert not weak
+    assert etag == (payload['etag'] if encoding == 'identity' else f"{payload['etag']}-{encoding}")
+
+
+def test_payload_response_not_modified():
+    from app import app, news_payload_response
+
+    payload = news_api.render_news_payload(ARTICLES)
+    etag = f'"{payload["etag"]}-gzip"'
+    with app.test_request_context(headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag}):
+        response = news_payload_response(payload)
+    assert response.status_code == 304
+    assert response.get_data() == b''
+
+    # The plain body's ETag does not validate the gzip representation
+    with app.test_request_context(headers={'Accept-Encoding': 'gzip', 'If-None-Match': f'"{payload["etag"]}"'}):
+        assert news_payload_response(payload).status_code == 200
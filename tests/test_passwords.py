@@ -0,0 +1,66 @@
+"""
+Password checks: unknown phones cost a KDF, a full pool fails fast
+"""
+
+import threading
+
+import pytest
+
+import database
+import passwords
+from passwords import KdfBusy, KdfTimeout, PasswordHasher
+
+
+def test_unknown_phone_runs_the_kdf(sqlite_db, monkeypatch):
+    calls = []
+    real = passwords._verify_now
+    monkeypatch.setattr(passwords, '_verify_now', lambda *args: calls.append(args[1]) or real(*args))
+
+    database.create_user('Asha', '9000000001', 'secret')
+    assert database.verify_user('9000000001', 'wrong') is None
+    assert database.verify_user('9000000002', 'secret') is None
+
+    assert len(calls) == 2
+    assert calls[1] == passwords.DUMMY_HASH
+
+
+def test_dummy_hash_never_matches():
+    hasher = PasswordHasher()
+    assert hasher.verify('', passwords.DUMMY_HASH) == (False, False)
+    assert hasher.verify_unknown('secret') == (False, False)
+
+
+def test_full_pool_raises_busy(monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(passwords, '_hash_now', lambda password: release.wait(10) and 'hash')
+
+    hasher = PasswordHasher(threads=1, max_pending=1)
+    waiter = threading.Thread(target=hasher.hash, args=('secret',))
+    waiter.start()
+    while hasher._slots._value:
+        threading.Event().wait(0.01)
+    try:
+        with pytest.raises(KdfBusy):
+            hasher.hash('other')
+        assert hasher.counters['busy_rejections'] == 1
+    finally:
+        release.set()
+        waiter.join()
+
+    # The slot is free again once the KDF finished
+    assert hasher.hash('secret') == 'hash'
+
+
+def test_kdf_timeout_is_busy_not_a_failed_login(client, monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(passwords, 'KDF_TIMEOUT', 0.05)
+    monkeypatch.setattr(passwords, '_verify_now', lambda password, stored: release.wait(10) and (True, False))
+    try:
+        with pytest.raises(KdfTimeout):
+            database.verify_user('9000000001', 'other')
+
+        response = client.post('/api/login', json={'phone': '9000000001', 'password': 'other'})
+        assert response.status_code == 503
+    finally:
+        release.set()
+    assert passwords.password_hasher.counters['timeouts'] >= 2
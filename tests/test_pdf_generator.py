@@ -0,0 +1,109 @@
+"""
+PDF reports: cache keys, paginated history and embedded photos
+"""
+
+import io
+import os
+import re
+import zlib
+
+import pytest
+from PIL import Image
+
+import pdf_generator
+from pdf_generator import ReportCache, create_history_report_pdf, embed_image, render_scan_report
+
+SCAN_DATA = {'diseaseName': 'Leaf Blight', 'confidence': 90, 'severity': 'Medium'}
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = ReportCache(str(tmp_path / 'reports'))
+    monkeypatch.setattr(pdf_generator, 'report_cache', cache)
+    return cache
+
+
+def test_same_report_is_rendered_once(cache):
+    user = {'name': 'Asha', 'phone': '9000000001'}
+    first = render_scan_report(1, SCAN_DATA, user)
+    assert render_scan_report(1, SCAN_DATA, dict(user)) == first
+    assert cache.counters == {'hits': 1, 'misses': 1, 'errors': 0}
+
+
+def test_user_info_is_part_of_the_key(cache):
+    render_scan_report(1, SCAN_DATA, {'name': 'Asha', 'phone': '9000000001'})
+    render_scan_report(1, SCAN_DATA, {'name': 'Asha Devi', 'phone': '9000000001'})
+    render_scan_report(1, SCAN_DATA, {'name': 'Asha', 'phone': '9000000002'})
+
+    assert cache.counters['hits'] == 0
+    assert len(os.listdir(cache.directory)) == 3
+
+
+def test_scan_data_is_part_of_the_key(cache):
+    render_scan_report(1, SCAN_DATA, {'name': 'Asha', 'phone': '9000000001'})
+    render_scan_report(1, dict(SCAN_DATA, severity='High'), {'name': 'Asha', 'phone': '9000000001'})
+    assert cache.counters['hits'] == 0
+
+
+def _pdf_text(data):
+    """Decompressed content streams and the page count of a reportlab PDF"""
+    text = b''
+    for stream in re.findall(rb'stream\r?\n(.*?)endstream', data, re.S):
+        try:
+            text += zlib.decompressobj().decompress(stream)
+        except zlib.error:
+            text += stream
+    return text, len(re.findall(rb'/Type /Page\b', data))
+
+
+def _scans(count):
+    # Generator, as storage.iter_user_scans hands them over
+    for n in range(count):
+        yield {'date': f'2026-01-01 00:{n // 60:02d}:{n % 60:02d}', 'disease_name': f'Disease {n:03d}',
+               'confidence': 0.9, 'severity': 'Low'}
+
+
+@pytest.mark.parametrize('count, pages', [
+    (0, 1),
+    (pdf_generator.HISTORY_FIRST_PAGE_ROWS - 1, 1),
+    (pdf_generator.HISTORY_FIRST_PAGE_ROWS, 2),  # a full page pushes the total over
+    (100, 4),  # 26 + 35 + 35 + 4
+])
+def test_history_renders_every_row_once(count, pages):
+    text, page_count = _pdf_text(create_history_report_pdf(_scans(count), {'name': 'Asha', 'phone': '1'}).getvalue())
+
+    assert page_count == pages
+    for n in range(count):
+        assert text.count(f'(Disease {n:03d})'.encode()) == 1
+    if count:
+        assert text.index(b'(Disease 000)') < text.index(f'(Disease {count - 1:03d})'.encode())
+    assert f'{count}'.encode() in text.split(b'Total Scans:')[-1][:40]
+
+
+def test_small_jpeg_passes_through():
+    width, height = 2 * pdf_generator.inch, 1.5 * pdf_generator.inch
+    target = (round(2 * pdf_generator.PDF_IMAGE_DPI), round(1.5 * pdf_generator.PDF_IMAGE_DPI))
+
+    buffer = io.BytesIO()
+    Image.new('RGB', (2 * target[0], 2 * target[1]), (90, 140, 60)).save(buffer, format='JPEG', quality=95)
+    data = buffer.getvalue()
+
+    assert embed_image(Image.open(io.BytesIO(data)), width, height).getvalue() == data
+
+
+@pytest.mark.parametrize('mode, fmt, size', [
+    ('RGB', 'JPEG', (4000, 3000)),
+    ('RGBA', 'PNG', (800, 600)),
+])
+def test_large_or_png_image_is_reencoded(mode, fmt, size):
+    width, height = 2 * pdf_generator.inch, 1.5 * pdf_generator.inch
+    target = (round(2 * pdf_generator.PDF_IMAGE_DPI), round(1.5 * pdf_generator.PDF_IMAGE_DPI))
+
+    buffer = io.BytesIO()
+    Image.new(mode, size).save(buffer, format=fmt)
+    data = embed_image(Image.open(io.BytesIO(buffer.getvalue())), width, height).getvalue()
+
+    assert data != buffer.getvalue()
+    embedded = Image.open(io.BytesIO(data))
+    assert embedded.format == 'JPEG' and embedded.mode == 'RGB'
+    assert embedded.width <= target[0] and embedded.height <= target[1]
@@ -0,0 +1,102 @@
+"""
+PDF job queue: render processes that die must not stall later exports
+"""
+
+import os
+import time
+
+import pdf_jobs
+from pdf_jobs import PdfJobQueue
+
+SCAN_DATA = {'diseaseName': 'Leaf Blight', 'confidence': 90, 'severity': 'Medium'}
+USER_INFO = {'name': 'Farmer', 'phone': '9999999999'}
+
+
+def _wait(queue, job_id, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = queue.get(job_id, USER_INFO['phone'])
+        if job['status'] in ('done', 'failed'):
+            return job
+        time.sleep(0.1)
+    raise AssertionError(f"job {job_id} still {job['status']}")
+
+
+def _queue(tmp_path):
+    return PdfJobQueue(str(tmp_path / 'pdf_jobs.db'), str(tmp_path / 'pdf_jobs'))
+
+
+def test_job_renders(tmp_path):
+    queue = _queue(tmp_path)
+    try:
+        job_id = queue.enqueue(USER_INFO['phone'], 'latest',
+                               {'scan_data': SCAN_DATA, 'user_info': USER_INFO}, 'report.pdf')
+        job = _wait(queue, job_id)
+        assert job['status'] == 'done'
+        assert os.path.getsize(job['path']) == job['size'] > 0
+    finally:
+        queue._pool.shutdown()
+
+
+def test_broken_pool_is_replaced(tmp_path):
+    queue = _queue(tmp_path)
+    pool = queue._executor()
+    try:
+        # Start the render process, then kill it as the OOM killer would
+        pool.submit(os.getpid).result(timeout=60)
+        for process in list(pool._processes.values()):
+            process.kill()
+        deadline = time.monotonic() + 30
+        while not pool._broken and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert pool._broken
+
+        job_id = queue.enqueue(USER_INFO['phone'], 'latest',
+                               {'scan_data': SCAN_DATA, 'user_info': USER_INFO}, 'report.pdf')
+        assert _wait(queue, job_id)['status'] == 'done'
+        assert queue._pool is not pool
+        assert queue.counters['pool_restarts'] == 1
+    finally:
+        queue._pool.shutdown()
+
+
+def test_stale_running_job_is_retried(tmp_path):
+    queue = _queue(tmp_path)
+    try:
+        job_id = queue.enqueue(USER_INFO['phone'], 'latest',
+                               {'scan_data': SCAN_DATA, 'user_info': USER_INFO}, 'report.pdf')
+        _wait(queue, job_id)
+
+        # Pretend the job was claimed by a process that died long ago
+        queue._conn().execute('''
+            UPDATE pdf_jobs SET status = 'running', attempts = 1, started = ?, path = NULL
+            WHERE id = ?
+        ''', (time.time() - 3600, job_id))
+
+        job = _wait(queue, job_id)
+        assert job['status'] == 'done'
+        assert job['attempts'] == 2
+    finally:
+        queue._pool.shutdown()
+
+
+def test_polling_a_stale_job_resubmits_once(tmp_path, monkeypatch):
+    queue = _queue(tmp_path)
+    submitted = []
+    monkeypatch.setattr(queue, '_submit', lambda: submitted.append(1))
+
+    job_id = queue.enqueue(USER_INFO['phone'], 'latest',
+                           {'scan_data': SCAN_DATA, 'user_info': USER_INFO}, 'report.pdf')
+    assert len(submitted) == 1
+
+    # Queued long ago and never picked up
+    queue._conn().execute('UPDATE pdf_jobs SET created = ? WHERE id = ?', (time.time() - 3600, job_id))
+    for _ in range(10):
+        assert queue.get(job_id, USER_INFO['phone'])['status'] == 'queued'
+    assert len(submitted) == 2
+
+    # Another stale period later, one more
+    queue._nudged[job_id] -= pdf_jobs.PDF_JOB_STALE_SECONDS
+    queue.get(job_id, USER_INFO['phone'])
+    queue.get(job_id, USER_INFO['phone'])
+    assert len(submitted) == 3
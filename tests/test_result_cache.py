@@ -0,0 +1,50 @@
+"""
+Result cache: pixel-hash keys, memory LRU and the shared disk tier
+"""
+
+from PIL import Image
+
+from result_cache import ResultCache, image_key
+
+
+def test_image_key_hashes_pixels_not_bytes(tmp_path):
+    image = Image.new('RGB', (64, 48), (50, 140, 40))
+    image.save(tmp_path / 'a.png')
+    image.save(tmp_path / 'b.png', optimize=True)
+
+    key = image_key(image, 'v1', 'en')
+    assert image_key(Image.open(tmp_path / 'a.png'), 'v1', 'en') == key
+    assert image_key(Image.open(tmp_path / 'b.png'), 'v1', 'en') == key
+
+    assert image_key(image, 'v1', 'hi') != key
+    assert image_key(image, 'v2', 'en') != key
+    assert image_key(Image.new('RGB', (64, 48), (50, 140, 41)), 'v1', 'en') != key
+
+
+def test_memory_tier_evicts_least_recently_used():
+    cache = ResultCache(db_path='', memory_size=2)
+    cache.set('a', {'n': 1})
+    cache.set('b', {'n': 2})
+    assert cache.get('a') == {'n': 1}  # 'b' is now the oldest
+
+    cache.set('c', {'n': 3})
+    assert cache.get('b') is None
+    assert cache.get('a') == {'n': 1} and cache.get('c') == {'n': 3}
+    assert cache.counters['evictions'] == 1
+    assert cache.stats()['memory_entries'] == 2
+
+
+def test_disk_tier_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / 'result_cache.db')
+    ResultCache(db_path=path).set('key', {'diseaseName': 'Leaf Blight'})
+
+    # Another worker: empty memory tier, same file
+    other = ResultCache(db_path=path, memory_size=1)
+    assert other.get('key') == {'diseaseName': 'Leaf Blight'}
+    assert other.get('key') == {'diseaseName': 'Leaf Blight'}
+    assert other.counters['disk_hits'] == 1 and other.counters['memory_hits'] == 1
+
+    # Memory eviction falls back to disk
+    other.set('another', [1])
+    assert other.get('key') == {'diseaseName': 'Leaf Blight'}
+    assert other.counters['disk_hits'] == 2
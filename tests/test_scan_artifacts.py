@@ -0,0 +1,45 @@
+"""
+Thumbnails are decoded small, then converted
+"""
+
+import io
+
+import pytest
+from PIL import Image
+
+from scan_artifacts import make_thumbnail, pack_result, unpack_result
+
+
+def _upload(mode, fmt, size=(4000, 3000)):
+    buffer = io.BytesIO()
+    Image.new(mode, size).save(buffer, format=fmt)
+    buffer.seek(0)
+    return Image.open(buffer)
+
+
+def test_jpeg_is_drafted_to_the_smallest_covering_scale():
+    image = _upload('RGB', 'JPEG')
+    thumbnail = make_thumbnail(image)
+
+    # 1/4 scale (1000x750) still covers 768px; 1/2 scale would be 2000x1500
+    assert image.size == (1000, 750)
+    assert thumbnail.size == (768, 576)
+    assert thumbnail.mode == 'RGB'
+
+
+@pytest.mark.parametrize('mode', ['RGBA', 'LA', 'L', 'P'])
+def test_png_thumbnail_is_rgb(mode):
+    thumbnail = make_thumbnail(_upload(mode, 'PNG', (1600, 1200)))
+    assert thumbnail.size == (768, 576)
+    assert thumbnail.mode == 'RGB'
+
+
+def test_small_upload_is_not_resized():
+    thumbnail = make_thumbnail(_upload('RGB', 'PNG', (640, 480)))
+    assert thumbnail.size == (640, 480)
+
+
+def test_result_round_trip():
+    result = {'diseaseName': 'Blight', 'confidence': 91, 'treatment': ['Copper spray']}
+    assert unpack_result(pack_result(result)) == result
+    assert unpack_result(pack_result(None)) is None
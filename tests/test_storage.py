@@ -0,0 +1,107 @@
+"""
+Contract tests run against every storage backend
+SQLite always; PostgreSQL too when DATABASE_URL points at a server
+"""
+
+import os
+import secrets
+
+import pytest
+
+from storage import PostgresStorage, SQLiteStorage, Storage
+
+DATABASE_URL = os.environ.get('DATABASE_URL', '')
+HAS_POSTGRES = DATABASE_URL.startswith(('postgres://', 'postgresql://'))
+
+RESULT = {'diseaseName': 'Early Blight', 'confidence': 87, 'treatment': ['Copper spray'], 'note': 'बीज'}
+
+
+def _scan(phone, n, **extra):
+    return dict({
+        'user_phone': phone,
+        'disease_name': f'Disease {n}',
+        'confidence': 50 + n,
+        'severity': 'Low',
+        'treatment': f'Treatment {n}'
+    }, **extra)
+
+
+@pytest.fixture(params=['sqlite', pytest.param('postgresql', marks=pytest.mark.skipif(
+    not HAS_POSTGRES, reason='DATABASE_URL not set to a PostgreSQL server'))])
+def backend(request, monkeypatch):
+    if request.param == 'sqlite':
+        import database
+        request.getfixturevalue('sqlite_db')
+        monkeypatch.setattr(database, 'SCAN_WRITE_BEHIND', False)
+        yield SQLiteStorage()
+        return
+
+    backend = PostgresStorage(DATABASE_URL)
+    backend.init_db()
+    yield backend
+    with backend._connection() as conn:
+        conn.execute("DELETE FROM scans WHERE user_phone LIKE 'test-%'")
+        conn.execute("DELETE FROM users WHERE phone LIKE 'test-%'")
+
+
+@pytest.fixture
+def phone(backend):
+    phone = f'test-{secrets.token_hex(4)}'
+    assert backend.create_user('Tester', phone, 'secret')
+    return phone
+
+
+def test_storage_is_abstract():
+    with pytest.raises(TypeError):
+        Storage()
+
+
+def test_users(backend, phone):
+    assert backend.create_user('Again', phone, 'other') is None
+    assert backend.verify_user(phone, 'secret')['phone'] == phone
+    assert backend.verify_user(phone, 'wrong') is None
+    assert backend.verify_user('test-missing', 'secret') is None
+
+    backend.update_user_language(phone, 'hi')
+    assert backend.verify_user(phone, 'secret')['language'] == 'hi'
+
+
+def test_save_scans_returns_ids_in_order(backend, phone):
+    ids = backend.save_scans([_scan(phone, n) for n in range(3)])
+    assert len(ids) == 3 and ids == sorted(ids)
+    assert backend.save_scans([]) == []
+    assert [scan['id'] for scan in backend.get_user_scans(phone)] == ids[::-1]
+
+
+def test_history_cursor(backend, phone):
+    # Saved within the same second, so pages are split by id alone
+    ids = backend.save_scans([_scan(phone, n) for n in range(7)])
+    newest_first = ids[::-1]
+
+    pages = []
+    before = None
+    while True:
+        page = backend.get_user_scans(phone, 3, before)
+        pages.append([scan['id'] for scan in page])
+        if len(page) < 3:
+            break
+        before = (page[-1]['date'], page[-1]['id'])
+
+    assert pages == [newest_first[:3], newest_first[3:6], newest_first[6:]]
+    assert [scan['id'] for scan in backend.iter_user_scans(phone, 2)] == newest_first
+
+
+def test_get_scan_by_id_returns_result(backend, phone):
+    scan_id = backend.save_scan(_scan(phone, 1, result=RESULT, image_hash='ab' * 32))
+    old_id = backend.save_scan(_scan(phone, 2))
+
+    scan = backend.get_scan_by_id(scan_id, phone)
+    assert scan['result'] == RESULT
+    assert scan['image_hash'] == 'ab' * 32
+    assert scan['disease_name'] == 'Disease 1'
+
+    old = backend.get_scan_by_id(old_id, phone)
+    assert old['result'] is None and old['image_hash'] is None
+
+    # Other users' scans are invisible
+    assert backend.get_scan_by_id(scan_id, 'test-someone-else') is None
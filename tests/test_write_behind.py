@@ -0,0 +1,77 @@
+"""Write-behind scan queue: flush() must persist every submitted scan"""
+
+import sqlite3
+import time
+
+import database
+
+
+def _scan(phone, n):
+    return {'user_phone': phone, 'disease_name': f'Rust {n}', 'confidence': 0.8,
+            'severity': 'Low', 'treatment': 'Fungicide'}
+
+
+def _count(db_path):
+    with sqlite3.connect(db_path) as conn:
+        return conn.execute('SELECT COUNT(*) FROM scans').fetchone()[0]
+
+
+def test_flush_writes_queued_scans(sqlite_db):
+    database.create_user('Test', '999', 'pw')
+    writer = database.ScanWriteBehind(flush_ms=60000)
+
+    ids = [writer.submit(_scan('999', n)) for n in range(5)]
+    writer.flush()
+
+    assert len(set(ids)) == 5
+    assert _count(sqlite_db) == 5
+    for scan_id in ids:
+        assert database.get_scan_by_id(scan_id, '999') is not None
+
+
+def test_flush_writes_batch_held_by_flusher_thread(sqlite_db):
+    database.create_user('Test', '999', 'pw')
+    writer = database.ScanWriteBehind(flush_ms=2000)
+
+    ids = [writer.submit(_scan('999', n)) for n in range(5)]
+    # Let the thread take the rows off the queue and wait for its deadline
+    time.sleep(0.2)
+    assert writer._queue.qsize() == 0
+
+    writer.flush()
+    assert _count(sqlite_db) == 5
+    assert writer.stats()['written'] == 5
+
+
+def test_submit_after_flush_restarts_thread(sqlite_db):
+    database.create_user('Test', '999', 'pw')
+    writer = database.ScanWriteBehind(flush_ms=20)
+
+    writer.submit(_scan('999', 1))
+    writer.flush()
+    writer.submit(_scan('999', 2))
+
+    deadline = time.monotonic() + 5
+    while _count(sqlite_db) < 2 and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert _count(sqlite_db) == 2
+    writer.flush()
+
+
+def test_reading_a_queued_scan_waits_for_its_write(sqlite_db, monkeypatch):
+    database.create_user('Test', '999', 'pw')
+    writer = database.ScanWriteBehind(flush_ms=300)
+    monkeypatch.setattr(database, 'scan_writer', writer)
+    monkeypatch.setattr(database, 'SCAN_WRITE_BEHIND', True)
+
+    scan_id = writer.submit(_scan('999', 1))
+    assert _count(sqlite_db) == 0
+
+    scan = database.get_scan_by_id(scan_id, '999')
+    assert scan is not None and scan['disease_name'] == 'Rust 1'
+
+    # IDs this process never queued don't wait
+    started = time.monotonic()
+    assert database.get_scan_by_id(scan_id + 1000, '999') is None
+    assert time.monotonic() - started < 0.2
+    writer.flush()
@@ -7,7 +7,7 @@ from sklearn.ensemble import RandomForestClassifier
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score
 
-from local_model import extract_all_features, features_to_vector
+from local_model import extract_all_features, features_to_vector, DISEASE_LABELS, MODEL_PATH
 
 
 # ===============================
@@ -23,13 +23,7 @@ if not os.path.isdir(DATASET_PATH):
     raise Exception("❌ dataset folder NOT FOUND")
 
 
-LABELS = {
-    "Tomato_Late_Blight": 0,
-    "Tomato_Early_Blight": 1,
-    "Potato_Late_Blight": 2,
-    "Potato_Early_Blight": 3,
-    "Healthy": 4
-}
+LABELS = DISEASE_LABELS
 
 
 X = []
@@ -63,7 +57,7 @@ for label_name, label_id in LABELS.items():
         y.append(label_id)
 
 
-X = np.array(X)
+X = np.array(X, dtype=np.float32)
 y = np.array(y)
 
 print("\n🧠 Training model...\n")
@@ -86,8 +80,9 @@ acc = accuracy_score(y_test, pred)
 print(f"\n✅ Training completed")
 print(f"🎯 Accuracy: {acc*100:.2f}%")
 
-joblib.dump(model, "ml_model.pkl")
-print("💾 Model saved as ml_model.pkl")
+# Compressed: the server unpickles the trees into memory either way
+joblib.dump(model, MODEL_PATH, compress=3)
+print(f"💾 Model saved as {MODEL_PATH}")
 
 print(model.predict(X_test[:5]))
 print(y_test[:5])